@@ -0,0 +1,59 @@
+"""Helpers shared by the benchmarks: a throwaway database and bulk seeding."""
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django against a fresh temporary SQLite database and migrate it."""
+    sys.path.insert(0, str(BACKEND))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_todo.settings")
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ["testserver"]
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tu", "sa", "vel", "dor", "pi", "na", "zu", "gen"]
+# ~1900 made-up words; text draws them Zipf-style, so a few words are in many
+# todos and most are in few, as with real text
+WORDS = [a + b for a in SYLLABLES for b in SYLLABLES] + [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+WEIGHTS = [1 / (i + 1) for i in range(len(WORDS))]
+
+
+def words(rnd, low, high):
+    return " ".join(rnd.choices(WORDS, WEIGHTS, k=rnd.randint(low, high)))
+
+
+def seed(count, batch_size=5000, rnd=random.Random(0)):
+    """Add ``count`` random todos with bulk_create."""
+    from django.db import transaction
+    from tasks.models import Todo, CATEGORY_CHOICES, PRIORITY_CHOICES
+
+    categories = [c for c, _ in CATEGORY_CHOICES]
+    priorities = [p for p, _ in PRIORITY_CHOICES]
+    today = date.today()
+    with transaction.atomic():
+        for start in range(0, count, batch_size):
+            Todo.objects.bulk_create(
+                Todo(
+                    title=words(rnd, 2, 6).capitalize(),
+                    description="" if rnd.random() < 0.3 else words(rnd, 5, 20),
+                    due_date=None if rnd.random() < 0.2 else today + timedelta(days=rnd.randint(-30, 90)),
+                    is_resolved=rnd.random() < 0.4,
+                    priority=rnd.choice(priorities),
+                    category=rnd.choice(categories),
+                )
+                for _ in range(min(batch_size, count - start))
+            )
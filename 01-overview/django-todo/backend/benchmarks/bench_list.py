@@ -0,0 +1,77 @@
+"""Todo list page latency as the table grows.
+
+Seeds a throwaway SQLite database at several sizes and times the list view
+(query and template), then the page query alone for a page 90% of the way
+into the table: by cursor, and by OFFSET for comparison. With keyset
+pagination and the list indexes, the view and the cursor pages should cost
+the same at every size while OFFSET grows with the table.
+
+Run from backend/: python -m benchmarks.bench_list [--sizes 10000 100000 300000]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django, seed
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from tasks.models import Todo
+    from tasks.pagination import KeysetPaginator
+    from tasks.views import TodoListView
+
+    factory = RequestFactory()
+    view = TodoListView.as_view()
+    ordering = ("is_resolved", "due_date", "id")
+
+    def page(**params):
+        return lambda: view(factory.get("/todos/", params)).render()
+
+    def cursor_page(cursor, **filters):
+        paginator = KeysetPaginator(ordering, TodoListView.paginate_by)
+        qs = Todo.objects.filter(**filters)
+        return lambda: paginator.paginate(qs, cursor)
+
+    def offset_page(n, **filters):
+        qs = Todo.objects.filter(**filters).order_by(*ordering)
+        return lambda: list(qs[n : n + TodoListView.paginate_by])
+
+    print("ms, median of", args.repeat, "- view: query and render; cursor/OFFSET: the page query alone")
+    print(f"{'rows':>9} {'view':>8} {'view, filtered':>15} {'deep cursor':>12} {'deep OFFSET':>12} {'work, cursor':>13} {'work, OFFSET':>13}")
+    for size in sorted(args.sizes):
+        seed(size - Todo.objects.count())
+        paginator = KeysetPaginator(ordering, TodoListView.paginate_by)
+        deep = int(size * 0.9)
+        cursor = paginator.encode(Todo.objects.order_by(*ordering)[deep])
+        work = Todo.objects.filter(category="work")
+        work_deep = int(work.count() * 0.9)
+        work_cursor = paginator.encode(work.order_by(*ordering)[work_deep])
+        results = [
+            timed(page(), args.repeat),
+            timed(page(category="work", status="active"), args.repeat),
+            timed(cursor_page(cursor), args.repeat),
+            timed(offset_page(deep), args.repeat),
+            timed(cursor_page(work_cursor, category="work"), args.repeat),
+            timed(offset_page(work_deep, category="work"), args.repeat),
+        ]
+        print(f"{size:>9,} " + " ".join(f"{r:>{w}.2f}" for r, w in zip(results, (8, 15, 12, 12, 13, 13))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Todo search latency: the FTS5 index against the old icontains scan.
+
+Seeds a throwaway SQLite database with made-up text in which a few words are
+common and most are rare, then times the first page of results (50 todos,
+in the list's default order) for words of different frequency, a prefix and
+two words. "index" is the FTS5 lookup alone (first 50 matching ids),
+"page" is the list query that joins it, "relevance" is the same page sorted
+by bm25, "icontains" is the LIKE scan the list used to run.
+
+Run from backend/: python -m benchmarks.bench_search [--sizes 100000 1000000]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import WORDS, seed, setup_django
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from tasks.models import Todo
+    from tasks.search import match_expression, search
+
+    page_size = 50
+    ordering = ("is_resolved", "due_date", "id")
+    queries = {
+        "rare": WORDS[1800],
+        "uncommon": WORDS[400],
+        "common": WORDS[5],
+        "prefix": WORDS[1800][:4],
+        "two words": f"{WORDS[5]} {WORDS[1800]}",
+    }
+
+    def index(q):
+        expression = match_expression(q)
+
+        def run():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT rowid FROM tasks_todo_fts WHERE tasks_todo_fts MATCH %s LIMIT %s", (expression, page_size))
+                cursor.fetchall()
+
+        return run
+
+    def page(q):
+        return lambda: list(search(Todo.objects.all(), q).order_by(*ordering)[:page_size])
+
+    def relevance(q):
+        return lambda: list(search(Todo.objects.all(), q, ranked=True).order_by("is_resolved", "rank", "id")[:page_size])
+
+    def icontains(q):
+        qs = Todo.objects.filter(title__icontains=q) | Todo.objects.filter(description__icontains=q)
+        return lambda: list(qs.order_by(*ordering)[:page_size])
+
+    print(f"ms, median of {args.repeat} (icontains: of 3)")
+    for size in sorted(args.sizes):
+        t = time.perf_counter()
+        seed(size - Todo.objects.count())
+        print(f"\n{size:,} todos (seeded in {time.perf_counter() - t:.0f} s)")
+        print(f"{'query':<24} {'matches':>8} {'index':>8} {'page':>8} {'relevance':>10} {'icontains':>10}")
+        for name, q in queries.items():
+            matches = search(Todo.objects.all(), q).count()
+            results = [
+                timed(index(q), args.repeat),
+                timed(page(q), args.repeat),
+                timed(relevance(q), args.repeat),
+                timed(icontains(q), 3),
+            ]
+            label = f"{name} ({q})"
+            print(f"{label:<24} {matches:>8,} " + " ".join(f"{r:>{w}.2f}" for r, w in zip(results, (8, 8, 10, 10))))
+
+
+if __name__ == "__main__":
+    main()
@@ -121,3 +121,18 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Cache
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# The stats page reads counters kept in the cache and updated by Todo signals
+# (tasks/stats.py) instead of counting the table on every hit. Each process
+# has its own local-memory cache, so another process's writes show up once
+# its counters expire.
+TASKS_STATS_CACHE = True
+TASKS_STATS_CACHE_TIMEOUT = 300  # seconds
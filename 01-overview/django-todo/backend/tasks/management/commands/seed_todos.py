@@ -1,8 +1,52 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+import random
+import time
 from datetime import timedelta
 
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from tasks import stats
 from tasks.models import Todo
+from tasks.search import deferred_index
+
+# what generated tasks are made of, per category: (verbs, objects)
+TOPICS = {
+    "work": (
+        ["Prepare", "Review", "Update", "Send", "Plan", "Fix", "Write", "Present"],
+        ["client presentation", "quarterly report", "pull requests", "release notes", "team roadmap",
+         "budget proposal", "onboarding docs", "incident postmortem", "sprint backlog", "API design"],
+    ),
+    "study": (
+        ["Read", "Revise", "Practice", "Finish", "Summarize", "Watch"],
+        ["Python chapter", "Django ORM notes", "algorithms course", "SQL exercises", "statistics lecture",
+         "English vocabulary", "linear algebra", "exam questions"],
+    ),
+    "personal": (
+        ["Book", "Call", "Pay", "Renew", "Schedule", "Organize", "Clean"],
+        ["dentist appointment", "utility bills", "passport", "car service", "gym membership",
+         "family dinner", "home office", "insurance"],
+    ),
+    "shopping": (
+        ["Buy", "Order", "Compare prices for", "Return", "Pick up"],
+        ["groceries for the week", "birthday gift", "running shoes", "printer ink", "coffee beans",
+         "winter jacket", "phone charger", "houseplants"],
+    ),
+    "other": (
+        ["Look into", "Sort out", "Think about", "Ask about", "Try"],
+        ["weekend trip", "photo backup", "volunteering", "new podcast", "recipe ideas", "garage sale"],
+    ),
+}
+DETAILS = [
+    "",
+    "",
+    "Don't forget to check with the team first",
+    "Keep it short, one page at most",
+    "Due before the end of the week",
+    "See notes from the last meeting",
+    "Low effort, can be done in the evening",
+    "Needs a second pair of eyes",
+]
 
 
 class Command(BaseCommand):
@@ -14,16 +58,40 @@ class Command(BaseCommand):
             action="store_true",
             help="Clear existing tasks and seed again",
         )
+        parser.add_argument(
+            "--count",
+            type=int,
+            help="Generate this many random tasks instead of the demo set",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk insert with --count (default 5000)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Random seed for --count, for a repeatable dataset",
+        )
 
     def handle(self, *args, **options):
+        for name in ("count", "batch_size"):
+            if options.get(name) is not None and options[name] <= 0:
+                raise CommandError(f"--{name.replace('_', '-')} must be greater than 0")
         if Todo.objects.exists() and not options.get("force"):
             self.stdout.write(self.style.WARNING("Tasks already exist — skipping seed (use --force to overwrite)"))
             return
         if options.get("force"):
-            Todo.objects.all().delete()
+            Todo.objects.all().delete_rows()
+            stats.invalidate()
 
         today = timezone.now().date()
 
+        if options.get("count") is not None:
+            self.generate(options["count"], options["batch_size"], random.Random(options.get("seed")), today)
+            return
+
         sample = [
             {
                 "title": "Prepare client presentation",
@@ -95,3 +163,30 @@ class Command(BaseCommand):
             Todo.objects.create(**item)
 
         self.stdout.write(self.style.SUCCESS(f"Created {len(sample)} tasks"))
+
+    def generate(self, count, batch_size, rnd, today):
+        started = time.perf_counter()
+        # the table is empty here, so one index rebuild beats a trigger per row
+        with transaction.atomic(), deferred_index():
+            for start in range(0, count, batch_size):
+                Todo.objects.bulk_create(random_todo(rnd, today) for _ in range(min(batch_size, count - start)))
+        # bulk_create sends no signals
+        transaction.on_commit(stats.invalidate)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Created {count} tasks in {elapsed:.1f} s ({count / max(elapsed, 1e-9):,.0f}/s)"))
+
+
+def random_todo(rnd, today):
+    category = rnd.choices(list(TOPICS), weights=[35, 20, 20, 15, 10])[0]
+    verbs, things = TOPICS[category]
+    due_date = None if rnd.random() < 0.2 else today + timedelta(days=int(rnd.triangular(-30, 90, 7)))
+    # most past-due tasks got done; few future ones are
+    done_chance = 0.75 if due_date is not None and due_date < today else 0.15
+    return Todo(
+        title=f"{rnd.choice(verbs)} {rnd.choice(things)}",
+        description=rnd.choice(DETAILS),
+        due_date=due_date,
+        is_resolved=rnd.random() < done_chance,
+        priority=rnd.choices(["low", "medium", "high"], weights=[25, 50, 25])[0],
+        category=category,
+    )
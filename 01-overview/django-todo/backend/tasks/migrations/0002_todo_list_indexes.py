@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="todo",
+            name="category",
+            field=models.CharField(
+                choices=[
+                    ("work", "Work"),
+                    ("study", "Study"),
+                    ("personal", "Personal"),
+                    ("shopping", "Shopping"),
+                    ("other", "Other"),
+                ],
+                default="work",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="todo",
+            name="priority",
+            field=models.CharField(
+                choices=[("low", "Low"), ("medium", "Medium"), ("high", "High")],
+                default="medium",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["is_resolved", "due_date", "id"], name="todo_status_due_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["is_resolved", "priority", "id"], name="todo_status_priority_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["category", "is_resolved", "due_date", "id"],
+                name="todo_category_due_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["priority", "is_resolved", "due_date", "id"],
+                name="todo_priority_due_idx",
+            ),
+        ),
+    ]
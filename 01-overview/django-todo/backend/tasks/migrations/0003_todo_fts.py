@@ -0,0 +1,104 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import tasks.search
+
+# External-content FTS5 index over Todo.title and Todo.description. Triggers
+# keep it in step with every insert, update and delete, including
+# bulk_create() and queryset.update()/delete(), which send no signals.
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE tasks_todo_fts USING fts5(
+        title, description,
+        content='tasks_todo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER tasks_todo_fts_insert AFTER INSERT ON tasks_todo BEGIN
+        INSERT INTO tasks_todo_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_todo_fts_delete AFTER DELETE ON tasks_todo BEGIN
+        INSERT INTO tasks_todo_fts(tasks_todo_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_todo_fts_update AFTER UPDATE OF title, description ON tasks_todo BEGIN
+        INSERT INTO tasks_todo_fts(tasks_todo_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_todo_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO tasks_todo_fts(tasks_todo_fts) VALUES ('rebuild')",
+]
+
+DROP = [
+    "DROP TRIGGER IF EXISTS tasks_todo_fts_insert",
+    "DROP TRIGGER IF EXISTS tasks_todo_fts_delete",
+    "DROP TRIGGER IF EXISTS tasks_todo_fts_update",
+    "DROP TABLE IF EXISTS tasks_todo_fts",
+]
+
+
+def fts5_available(connection):
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_index(apps, schema_editor):
+    # other databases search with icontains; see tasks.search
+    if not fts5_available(schema_editor.connection):
+        return
+    for sql in CREATE:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in DROP:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0002_todo_list_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TodoSearch",
+            fields=[
+                (
+                    "todo",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="tasks.todo",
+                    ),
+                ),
+                ("title", models.TextField()),
+                ("description", models.TextField()),
+                ("document", tasks.search.MatchField(db_column="tasks_todo_fts")),
+            ],
+            options={
+                "db_table": "tasks_todo_fts",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
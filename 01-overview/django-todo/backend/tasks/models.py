@@ -1,5 +1,7 @@
 from django.db import models
 
+from .search import MatchField
+
 
 PRIORITY_CHOICES = (
     ("low", "Low"),
@@ -16,6 +18,22 @@ CATEGORY_CHOICES = (
 )
 
 
+class TodoQuerySet(models.QuerySet):
+    def delete_rows(self):
+        """Delete with a single DELETE, returning the number of rows.
+
+        ``delete()`` loads every row first to send ``post_delete`` (which the
+        stats counters listen to). Callers refresh the counters with
+        ``tasks.stats.invalidate()`` instead.
+        """
+        # _raw_delete() is private Django API: it skips the collector, so no
+        # cascades and no signals. That is safe for Todo: no foreign key points
+        # at it (TodoSearch is an unmanaged view of the FTS5 table, which the
+        # delete trigger keeps in step), and the stats receivers are the only
+        # ones listening. Revisit if a model ever references Todo.
+        return self._raw_delete(self.db)
+
+
 class Todo(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -25,8 +43,49 @@ class Todo(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default="work")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TodoQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the values as loaded, so a save can tell what it changes (tasks.signals)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ["is_resolved", "due_date", "-priority", "-created_at"]
+        # the list view filters on status, category and priority and pages
+        # through (is_resolved, <due_date or priority>, id); see TodoListView
+        indexes = [
+            models.Index(fields=["is_resolved", "due_date", "id"], name="todo_status_due_idx"),
+            models.Index(fields=["is_resolved", "priority", "id"], name="todo_status_priority_idx"),
+            models.Index(fields=["category", "is_resolved", "due_date", "id"], name="todo_category_due_idx"),
+            models.Index(fields=["priority", "is_resolved", "due_date", "id"], name="todo_priority_due_idx"),
+        ]
+
+
+class TodoSearch(models.Model):
+    """A row of the FTS5 index over Todo's title and description.
+
+    SQLite only; the table and the triggers that keep it current are created
+    by migration 0003. Query it through ``tasks.search.search``.
+    """
+
+    todo = models.OneToOneField(
+        Todo,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_index",
+    )
+    title = models.TextField()
+    description = models.TextField()
+    document = MatchField(db_column="tasks_todo_fts")
+
+    class Meta:
+        managed = False
+        db_table = "tasks_todo_fts"
@@ -0,0 +1,107 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import Q, Value
+
+
+class KeysetPaginator:
+    """Cursor pagination over a fixed ordering, e.g. ``("is_resolved", "due_date", "id")``.
+
+    The next page starts right after the previous page's last row instead of
+    at an ``OFFSET``, so a page costs an index seek however deep it is. The
+    last field must be unique (``id``) so that ties are broken. A cursor is
+    the last row's ordering values, base64-encoded JSON.
+    """
+
+    def __init__(self, ordering, page_size):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    def paginate(self, queryset, cursor=None):
+        """Return ``(rows, next_cursor)``; ``next_cursor`` is None on the last page."""
+        qs = queryset.order_by(*self.ordering)
+        values = self.decode(queryset.model, cursor)
+        want = self.page_size + 1
+        if values is None:
+            rows = list(qs[:want])
+        else:
+            # "after (a, b, id)" is a > x, or a = x and b > y, or a = x and
+            # b = y and id > z. SQLite cannot seek an index on that OR, so
+            # each branch is its own query, taken in sort order (the last
+            # one first) until the page is full. Usually the first one fills it.
+            rows = []
+            for branch in self.after(values):
+                rows.extend(qs.filter(branch)[: want - len(rows)])
+                if len(rows) == want:
+                    break
+        if len(rows) < want:
+            return rows, None
+        rows = rows[: self.page_size]
+        return rows, self.encode(rows[-1])
+
+    def after(self, values):
+        """The ``Q`` for each branch of "sorts after ``values``", in sort order."""
+        fields = [(f.lstrip("-"), f.startswith("-"), v) for f, v in zip(self.ordering, values)]
+        for i in range(len(fields) - 1, -1, -1):
+            beyond = self._beyond(*fields[i])
+            if beyond is None:
+                continue
+            for name, _, value in fields[:i]:
+                beyond &= self._equal(name, value)
+            yield beyond
+
+    @staticmethod
+    def _equal(name, value):
+        if value is None:
+            return Q(**{f"{name}__isnull": True})
+        if isinstance(value, bool):
+            # "= true" rather than the bare column, which SQLite will not
+            # use to seek an index
+            value = Value(value)
+        return Q(**{name: value})
+
+    @staticmethod
+    def _beyond(name, descending, value):
+        """Rows strictly past ``value`` on one column, or None if there are none."""
+        # NULLs sort as the largest value on some backends (PostgreSQL) and the
+        # smallest on others (SQLite); follow the database so its index order is used
+        nulls_after = connection.features.nulls_order_largest != descending
+        if value is None:
+            return None if nulls_after else Q(**{f"{name}__isnull": False})
+        q = Q(**{f"{name}__lt" if descending else f"{name}__gt": value})
+        if nulls_after:
+            q |= Q(**{f"{name}__isnull": True})
+        return q
+
+    def encode(self, row):
+        values = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip("-"))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode(self, model, cursor):
+        """Ordering values from a cursor, or None for a missing or malformed one."""
+        if not cursor:
+            return None
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(raw, list) or len(raw) != len(self.ordering):
+                return None
+            return [self._to_python(model, field.lstrip("-"), value) for field, value in zip(self.ordering, raw)]
+        except (ValueError, ValidationError):
+            return None
+
+    @staticmethod
+    def _to_python(model, name, value):
+        if value is None:
+            return None
+        try:
+            return model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            # an annotation, e.g. the search rank
+            if not isinstance(value, (int, float, str)):
+                raise ValueError(name)
+            return value
@@ -0,0 +1,91 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connections, models, transaction
+from django.db.models import F, FloatField, Func, Q, Value
+
+
+class MatchField(models.TextField):
+    """The FTS5 column named after its table, which takes a whole-row ``MATCH``."""
+
+
+@MatchField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", (*lhs_params, *rhs_params)
+
+
+_fts_tables = {}  # database alias -> whether it has the FTS5 index
+INSERT_TRIGGER = "tasks_todo_fts_insert"
+
+
+def fts_enabled(using="default"):
+    """True if the database has the FTS5 index (SQLite, see migration 0003)."""
+    if using not in _fts_tables:
+        from .models import TodoSearch
+
+        connection = connections[using]
+        _fts_tables[using] = (
+            connection.vendor == "sqlite" and TodoSearch._meta.db_table in connection.introspection.table_names()
+        )
+    return _fts_tables[using]
+
+
+def match_expression(q):
+    """An FTS5 query for ``q``: every word must match; the last one may also
+    be the start of a word, as it may still be being typed.
+
+    Words are quoted, so FTS5 operators typed into the search box are matched
+    as plain text. Empty if ``q`` has no words.
+    """
+    words = [f'"{word}"' for word in re.findall(r"\w+", q)]
+    if words:
+        # a prefix expands to every matching term, so only where it helps
+        words[-1] += "*"
+    return " ".join(words)
+
+
+def search(queryset, q, ranked=False):
+    """Todos in ``queryset`` whose title or description match ``q``.
+
+    Uses the FTS5 index where there is one. Elsewhere, and for queries without
+    any words (e.g. "!!"), falls back to ``icontains``. ``ranked`` annotates
+    ``rank``: bm25, lower is more relevant (always 0 for the fallback).
+    """
+    expression = match_expression(q)
+    if not expression or not fts_enabled(queryset.db):
+        queryset = queryset.filter(Q(title__icontains=q) | Q(description__icontains=q))
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField())) if ranked else queryset
+    queryset = queryset.filter(search_index__document__match=expression)
+    # bm25() rather than the table's rank column: FTS5 reads "rank = ..." and
+    # "rank > ..." as ranking configuration, so keyset pages could not filter on it
+    rank = Func(F("search_index__document"), function="bm25", output_field=FloatField())
+    return queryset.annotate(rank=rank) if ranked else queryset
+
+
+@contextmanager
+def deferred_index(using="default"):
+    """Inserts made inside skip the index's insert trigger; the whole index is
+    rebuilt once on the way out, in the same transaction.
+
+    For bulk loads into an empty or small table: one rebuild is cheaper than
+    a trigger firing per row, but it reindexes every row, old ones included.
+    """
+    if not fts_enabled(using):
+        yield
+        return
+    connection = connections[using]
+    # SQLite DDL is transactional: if the load fails, the trigger comes back
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = %s", [INSERT_TRIGGER])
+            (create,) = cursor.fetchone()
+            cursor.execute(f"DROP TRIGGER {INSERT_TRIGGER}")
+        yield
+        with connection.cursor() as cursor:
+            cursor.execute(create)
+            cursor.execute("INSERT INTO tasks_todo_fts(tasks_todo_fts) VALUES ('rebuild')")
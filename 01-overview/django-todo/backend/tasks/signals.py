@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import stats
+from .models import Todo
+
+
+@receiver(pre_save, sender=Todo)
+def remember_stats_state(sender, instance, raw=False, **kwargs):
+    # what the row counted as before this save; fixtures (raw) skip the cache
+    instance._stats_before = None
+    if raw or instance.pk is None or not stats.cache_enabled():
+        return
+    loaded = getattr(instance, "_loaded_values", {})
+    if all(name in loaded for name in stats.FIELDS):
+        before = stats.values(loaded)
+        if before == stats.values(instance):
+            # no counted field changed since the row was loaded or saved, so
+            # no delta and no query (a concurrent update() in between is
+            # missed; the counters expire anyway, see stats._timeout)
+            instance._stats_before = before
+            return
+    instance._stats_before = Todo.objects.filter(pk=instance.pk).values(*stats.FIELDS).first()
+
+
+@receiver(post_save, sender=Todo)
+def count_saved_todo(sender, instance, raw=False, **kwargs):
+    if raw:
+        transaction.on_commit(stats.invalidate)
+        return
+    today = timezone.now().date()
+    delta = stats.contribution(instance, today)
+    before = getattr(instance, "_stats_before", None)
+    if before is not None:
+        delta.subtract(stats.contribution(before, today))
+    delta = {k: n for k, n in delta.items() if n}
+    transaction.on_commit(lambda: stats.apply(delta, today))
+    instance._loaded_values = {**getattr(instance, "_loaded_values", {}), **stats.values(instance)}
+
+
+@receiver(post_delete, sender=Todo)
+def count_deleted_todo(sender, instance, **kwargs):
+    today = timezone.now().date()
+    delta = {k: -n for k, n in stats.contribution(instance, today).items()}
+    transaction.on_commit(lambda: stats.apply(delta, today))
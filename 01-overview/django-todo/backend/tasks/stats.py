@@ -0,0 +1,134 @@
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import CATEGORY_CHOICES, PRIORITY_CHOICES, Todo
+
+# Counters are flat keys: "total", "done", "overdue", "category:work",
+# "category:work:done", "priority:high", "priority:high:done", ...
+GROUPS = (("category", CATEGORY_CHOICES), ("priority", PRIORITY_CHOICES))
+# the Todo fields the counters depend on
+FIELDS = ("category", "priority", "is_resolved", "due_date")
+
+_lock = threading.Lock()
+
+
+def cache_enabled():
+    return getattr(settings, "TASKS_STATS_CACHE", True)
+
+
+def _timeout():
+    # a bound on how stale other processes' counters get: each process has its
+    # own local-memory cache and only sees its own signals
+    return getattr(settings, "TASKS_STATS_CACHE_TIMEOUT", 300)
+
+
+def _cache_key(today):
+    # "overdue" depends on the date, so a new day starts from a fresh count
+    return f"tasks:stats:{today.isoformat()}"
+
+
+def count(today):
+    """Every counter, from a single conditional-aggregate query."""
+    aggregates = {
+        "total": Count("pk"),
+        "done": Count("pk", filter=Q(is_resolved=True)),
+        "overdue": Count("pk", filter=Q(is_resolved=False, due_date__lt=today)),
+    }
+    for field, choices in GROUPS:
+        for value, _ in choices:
+            aggregates[f"{field}:{value}"] = Count("pk", filter=Q(**{field: value}))
+            aggregates[f"{field}:{value}:done"] = Count("pk", filter=Q(**{field: value, "is_resolved": True}))
+    return Todo.objects.aggregate(**aggregates)
+
+
+def values(todo):
+    """The counted fields of ``todo`` (a Todo or a dict of its values) as Python
+    values: a Todo being saved may still hold what was assigned, e.g. a
+    due_date string."""
+    get = todo.get if isinstance(todo, dict) else lambda name: getattr(todo, name)
+    return {name: Todo._meta.get_field(name).to_python(get(name)) for name in FIELDS}
+
+
+def contribution(todo, today):
+    """The counters one todo adds to; ``todo`` may be a Todo or a dict of its values."""
+    get = values(todo).get
+    keys = ["total", f"category:{get('category')}", f"priority:{get('priority')}"]
+    if get("is_resolved"):
+        keys += ["done", f"category:{get('category')}:done", f"priority:{get('priority')}:done"]
+    elif get("due_date") is not None and get("due_date") < today:
+        keys.append("overdue")
+    return Counter(keys)
+
+
+def apply(delta, today=None):
+    """Add ``delta`` to the cached counters, if there are any for ``today``."""
+    if not delta or not cache_enabled():
+        return
+    key = _cache_key(today or timezone.now().date())
+    with _lock:
+        counters = cache.get(key)
+        if counters is None:
+            return  # the next read counts from the database anyway
+        for name, n in delta.items():
+            counters[name] = counters.get(name, 0) + n
+        cache.set(key, counters, _timeout())
+
+
+def record_toggle(todo, today=None):
+    """Count a todo whose is_resolved was just flipped by ``update()``; ``todo``
+    holds its values after the flip. Applied once the transaction commits."""
+    today = today or timezone.now().date()
+    delta = contribution(todo, today)
+    delta.subtract(contribution({**todo, "is_resolved": not todo["is_resolved"]}, today))
+    delta = {k: n for k, n in delta.items() if n}
+    transaction.on_commit(lambda: apply(delta, today))
+
+
+def invalidate():
+    """Drop the cached counters; for writes that send no signals (bulk_create, update())."""
+    cache.delete(_cache_key(timezone.now().date()))
+
+
+def counters(today=None):
+    today = today or timezone.now().date()
+    if not cache_enabled():
+        return count(today)
+    key = _cache_key(today)
+    result = cache.get(key)
+    if result is None:
+        # under the lock, so no apply() lands between the count and the set
+        with _lock:
+            result = cache.get(key)
+            if result is None:
+                result = count(today)
+                cache.set(key, result, _timeout())
+    return result
+
+
+def _breakdown(c, field, choices):
+    rows = []
+    for value, label in choices:
+        total, done = c.get(f"{field}:{value}", 0), c.get(f"{field}:{value}:done", 0)
+        rows.append({"value": value, "label": label, "total": total, "done": done, "active": total - done})
+    return rows
+
+
+def get_stats(today=None):
+    """Totals for the stats page, with breakdowns by category and priority."""
+    c = counters(today)
+    total, done = c["total"], c["done"]
+    return {
+        "total": total,
+        "active": total - done,
+        "done": done,
+        "overdue": c["overdue"],
+        "progress": int(round((done / total) * 100)) if total else 0,
+        "by_category": _breakdown(c, "category", CATEGORY_CHOICES),
+        "by_priority": _breakdown(c, "priority", PRIORITY_CHOICES),
+    }
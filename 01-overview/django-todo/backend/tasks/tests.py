@@ -1,6 +1,20 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from . import stats
 from .models import Todo
+from .pagination import KeysetPaginator
+from .search import fts_enabled, search
+from .views import TodoListView
 
 
 class TodoModelTest(TestCase):
@@ -86,4 +100,327 @@ class OrderingCompletedLastTest(TestCase):
         self.assertTrue(pos2 > pos1)
         self.assertTrue(pos2 > pos3)
 
-# Create your tests here.
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        today = date(2025, 1, 1)
+        for i in range(7):
+            Todo.objects.create(
+                title=f"T{i}",
+                is_resolved=i % 3 == 0,
+                due_date=None if i % 4 == 0 else today + timedelta(days=i % 3),
+                priority=["low", "medium", "high"][i % 3],
+            )
+
+    def walk(self, ordering, page_size=2, qs=None):
+        paginator = KeysetPaginator(ordering, page_size)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = paginator.paginate(qs if qs is not None else Todo.objects.all(), cursor)
+            seen.extend(t.id for t in rows)
+            if cursor is None:
+                return seen
+
+    def test_pages_match_a_full_ordered_scan(self):
+        for ordering in (
+            ("is_resolved", "due_date", "id"),
+            ("is_resolved", "-due_date", "id"),
+            ("is_resolved", "priority", "id"),
+            ("is_resolved", "-priority", "id"),
+        ):
+            with self.subTest(ordering=ordering):
+                expected = list(Todo.objects.order_by(*ordering).values_list("id", flat=True))
+                self.assertEqual(self.walk(ordering), expected)
+
+    def test_filters_apply_to_every_page(self):
+        qs = Todo.objects.filter(is_resolved=False)
+        expected = list(qs.order_by("is_resolved", "due_date", "id").values_list("id", flat=True))
+        self.assertEqual(self.walk(("is_resolved", "due_date", "id"), qs=qs), expected)
+
+    def test_malformed_cursor_starts_over(self):
+        paginator = KeysetPaginator(("is_resolved", "due_date", "id"), 2)
+        first, _ = paginator.paginate(Todo.objects.all())
+        for cursor in ("garbage", "WyJ4Il0=", paginator.encode(first[0])[:-4]):
+            rows, _ = paginator.paginate(Todo.objects.all(), cursor)
+            self.assertEqual(rows, first)
+
+    def test_list_view_links_to_next_page(self):
+        with mock.patch.object(TodoListView, "paginate_by", 3):
+            resp = self.client.get(reverse("tasks:list"), {"status": "all"})
+            self.assertEqual(len(resp.context["todos"]), 3)
+            cursor = resp.context["next_cursor"]
+            self.assertContains(resp, "Next page")
+            resp = self.client.get(reverse("tasks:list"), {"status": "all", "cursor": cursor})
+            self.assertEqual(len(resp.context["todos"]), 3)
+            self.assertContains(resp, "First page")
+            resp = self.client.get(reverse("tasks:list"), {"cursor": resp.context["next_cursor"]})
+            self.assertEqual(len(resp.context["todos"]), 1)
+            self.assertIsNone(resp.context["next_cursor"])
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.report = Todo.objects.create(title="Quarterly report", description="Numbers for the board")
+        self.groceries = Todo.objects.create(title="Buy groceries", description="Milk, bread, report card sleeve")
+        self.exam = Todo.objects.create(title="Prepare for Django exam", description="Review the ORM")
+
+    def titles(self, q, qs=None):
+        return sorted(t.title for t in search(qs if qs is not None else Todo.objects.all(), q))
+
+    def test_uses_fts_index_on_sqlite(self):
+        self.assertTrue(fts_enabled())
+
+    def test_words_match_whole_or_as_prefix(self):
+        self.assertEqual(self.titles("report"), ["Buy groceries", "Quarterly report"])
+        self.assertEqual(self.titles("quart"), ["Quarterly report"])
+        self.assertEqual(self.titles("django ORM"), ["Prepare for Django exam"])
+        self.assertEqual(self.titles("django milk"), [])
+        # FTS5 syntax is matched as text, not interpreted
+        self.assertEqual(self.titles('report" OR "milk'), [])
+        self.assertEqual(self.titles("NOT"), [])
+
+    def test_index_follows_saves_deletes_and_bulk_writes(self):
+        self.exam.title = "Prepare for Flask exam"
+        self.exam.save()
+        self.assertEqual(self.titles("django"), [])
+        self.assertEqual(self.titles("flask"), ["Prepare for Flask exam"])
+        self.report.delete()
+        self.assertEqual(self.titles("quarterly"), [])
+        Todo.objects.bulk_create([Todo(title="Quarterly taxes")])
+        Todo.objects.filter(title="Buy groceries").update(description="Eggs")
+        self.assertEqual(self.titles("quarterly"), ["Quarterly taxes"])
+        self.assertEqual(self.titles("milk"), [])
+
+    def test_ranks_better_matches_first(self):
+        Todo.objects.create(title="Report report report", description="report")
+        ranked = list(search(Todo.objects.all(), "report", ranked=True).order_by("rank").values_list("title", flat=True))
+        self.assertEqual(ranked[0], "Report report report")
+
+    def test_falls_back_to_icontains(self):
+        with mock.patch("tasks.search.fts_enabled", return_value=False):
+            self.assertEqual(self.titles("port"), ["Buy groceries", "Quarterly report"])
+        # no words to match: plain substring search
+        Todo.objects.create(title="Fix !! in docs")
+        self.assertEqual(self.titles("!!"), ["Fix !! in docs"])
+
+    def test_list_view_sorts_by_relevance_across_pages(self):
+        for i in range(4):
+            Todo.objects.create(title="report " * (i + 1), description="")
+        expected = list(
+            search(Todo.objects.all(), "report", ranked=True).order_by("is_resolved", "rank", "id").values_list("id", flat=True)
+        )
+        seen, params = [], {"q": "report", "order_by": "relevance"}
+        with mock.patch.object(TodoListView, "paginate_by", 2):
+            while True:
+                resp = self.client.get(reverse("tasks:list"), params)
+                seen.extend(t.id for t in resp.context["todos"])
+                if resp.context["next_cursor"] is None:
+                    break
+                params["cursor"] = resp.context["next_cursor"]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 6)
+
+
+class StatsCountersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+        Todo.objects.create(title="A", category="work", priority="high", due_date=self.today - timedelta(days=1))
+        Todo.objects.create(title="B", category="work", priority="low", is_resolved=True)
+        Todo.objects.create(title="C", category="study", priority="high", due_date=self.today + timedelta(days=1))
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            s = stats.get_stats()
+        self.assertEqual((s["total"], s["active"], s["done"], s["overdue"], s["progress"]), (3, 2, 1, 1, 33))
+        work = next(r for r in s["by_category"] if r["value"] == "work")
+        self.assertEqual((work["total"], work["done"], work["active"]), (2, 1, 1))
+        high = next(r for r in s["by_priority"] if r["value"] == "high")
+        self.assertEqual((high["total"], high["done"]), (2, 0))
+
+    def test_cached_page_runs_no_queries(self):
+        self.client.get(reverse("tasks:stats"))
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse("tasks:stats"))
+        self.assertContains(resp, "By category")
+
+    def test_signals_keep_cached_counters_exact(self):
+        stats.get_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            d = Todo.objects.create(title="D", category="shopping", due_date=self.today - timedelta(days=3))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("tasks:toggle", args=[d.id]))
+        a = Todo.objects.get(title="A")
+        a.category, a.due_date = "personal", None
+        with self.captureOnCommitCallbacks(execute=True):
+            a.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Todo.objects.get(title="B").delete()
+        self.assertEqual(stats.counters(), stats.count(self.today))
+
+    def test_due_date_may_be_a_string(self):
+        stats.get_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            todo = Todo.objects.create(title="D", due_date="2020-01-01")
+        todo.due_date = (self.today + timedelta(days=1)).isoformat()
+        with self.captureOnCommitCallbacks(execute=True):
+            todo.save()
+        self.assertEqual(stats.counters(), stats.count(self.today))
+
+    def test_saves_that_keep_the_counted_fields_read_nothing(self):
+        stats.get_stats()
+        a = Todo.objects.get(title="A")
+        a.title = "A, renamed"
+        with self.assertNumQueries(1):
+            a.save()
+        a.is_resolved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            a.save()
+        self.assertEqual(stats.counters(), stats.count(self.today))
+
+    def test_rolled_back_writes_are_not_counted(self):
+        stats.get_stats()
+        try:
+            with transaction.atomic():
+                Todo.objects.create(title="E")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(stats.counters()["total"], 3)
+
+    def test_bulk_writes_invalidate(self):
+        stats.get_stats()
+        Todo.objects.bulk_create([Todo(title="F"), Todo(title="G")])
+        stats.invalidate()
+        self.assertEqual(stats.get_stats()["total"], 5)
+
+    @override_settings(TASKS_STATS_CACHE=False)
+    def test_cache_can_be_turned_off(self):
+        stats.get_stats()
+        Todo.objects.create(title="H")
+        with self.assertNumQueries(1):
+            self.assertEqual(stats.get_stats()["total"], 4)
+
+
+class SeedTodosCommandTest(TestCase):
+    def seed(self, **options):
+        call_command("seed_todos", stdout=StringIO(), **options)
+        return list(Todo.objects.order_by("id").values_list("title", "category", "priority", "due_date", "is_resolved"))
+
+    def test_demo_set(self):
+        self.assertEqual(len(self.seed()), 8)
+        # existing tasks are kept unless --force
+        self.assertEqual(len(self.seed(count=5)), 8)
+
+    def test_generates_in_batches_repeatably(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.seed(count=70, batch_size=20, seed=7)
+        self.assertEqual(sum(q["sql"].startswith('INSERT INTO "tasks_todo"') for q in queries.captured_queries), 4)
+        self.assertEqual(len(first), 70)
+        self.assertEqual(first, self.seed(count=70, batch_size=20, seed=7, force=True))
+        self.assertNotEqual(first, self.seed(count=70, seed=8, force=True))
+        self.assertGreater(len({row[1] for row in first}), 3)
+        self.assertTrue(search(Todo.objects.all(), first[0][0]).exists())
+
+    def test_index_is_rebuilt_and_its_trigger_restored(self):
+        titles = [row[0] for row in self.seed(count=50, batch_size=20, seed=3)]
+        self.assertEqual(search(Todo.objects.all(), titles[-1]).count(), titles.count(titles[-1]))
+        Todo.objects.create(title="Xylophone lessons")
+        self.assertTrue(search(Todo.objects.all(), "xylophone").exists())
+
+    def test_rejects_non_positive_sizes(self):
+        for options in ({"count": 0}, {"count": -5}, {"count": 10, "batch_size": 0}):
+            with self.subTest(**options), self.assertRaises(CommandError):
+                self.seed(**options)
+        self.assertEqual(Todo.objects.count(), 0)
+
+    def test_refreshes_cached_stats(self):
+        cache.clear()
+        Todo.objects.create(title="Existing")
+        stats.get_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seed(count=30, force=True)
+        self.assertEqual(stats.get_stats()["total"], 30)
+
+
+class BulkActionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.a = Todo.objects.create(title="Write report", category="work")
+        self.b = Todo.objects.create(title="Read report", category="study", is_resolved=True)
+        self.c = Todo.objects.create(title="Buy milk", category="shopping", priority="high")
+
+    def bulk(self, **body):
+        return self.client.post(reverse("tasks:bulk"), json.dumps(body), content_type="application/json")
+
+    def test_resolve_by_ids_counts_changed_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.bulk(action="resolve", ids=[self.a.id, self.b.id])
+        self.assertEqual(resp.json(), {"action": "resolve", "affected": 1})
+        self.assertEqual(sum(q["sql"].startswith("UPDATE") for q in queries.captured_queries), 1)
+        self.assertEqual(Todo.objects.filter(is_resolved=True).count(), 2)
+
+    def test_filter_spec_matches_the_list_filters(self):
+        resp = self.bulk(action="recategorize", category="other", filter={"q": "report", "status": "active"})
+        self.assertEqual(resp.json()["affected"], 1)
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.category, self.b.category), ("other", "study"))
+        self.assertEqual(self.bulk(action="reopen", filter={"status": "done"}).json()["affected"], 1)
+
+    def test_delete_is_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.bulk(action="delete", filter={"priority": "high"})
+        self.assertEqual(resp.json()["affected"], 1)
+        self.assertEqual(sum(q["sql"].startswith("DELETE") for q in queries.captured_queries), 1)
+        self.assertFalse(Todo.objects.filter(pk=self.c.id).exists())
+        # the search index follows
+        self.assertFalse(search(Todo.objects.all(), "milk").exists())
+
+    def test_stats_are_refreshed(self):
+        stats.get_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bulk(action="delete", filter={"status": "all"})
+        self.assertEqual(stats.get_stats()["total"], 0)
+
+    def test_rejects_bad_requests(self):
+        for body in (
+            {"action": "explode", "ids": [1]},
+            {"action": "resolve"},
+            {"action": "resolve", "ids": [1], "filter": {}},
+            {"action": "resolve", "ids": ["1"]},
+            {"action": "resolve", "filter": "done"},
+            {"action": "recategorize", "category": "nope", "ids": [self.a.id]},
+            {"action": "delete", "filter": {"q": 5}},
+            {"action": "delete", "filter": {"categroy": "work"}},
+            {"action": "delete", "filter": {"status": 3}},
+            {"action": "delete", "filter": {"priority": "urgent"}},
+            {"action": "delete", "filter": {}},
+            {"action": "delete", "filter": {"q": ""}},
+            {"action": "resolve", "filter": {"q": "  "}},
+            {"action": "delete", "filter": {"category": "all", "priority": "all"}},
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.bulk(**body).status_code, 400)
+        resp = self.client.post(reverse("tasks:bulk"), "nope", content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Todo.objects.filter(category="work").count(), 1)
+        self.assertEqual(Todo.objects.count(), 3)
+
+
+class ToggleAtomicTest(TestCase):
+    def test_toggle_is_a_single_update_and_keeps_stats(self):
+        cache.clear()
+        todo = Todo.objects.create(title="T", due_date=timezone.now().date() - timedelta(days=1))
+        stats.get_stats()
+        for expected in (True, False):
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("tasks:toggle", args=[todo.id]))
+            writes = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+            self.assertEqual(len(writes), 1)
+            todo.refresh_from_db()
+            self.assertEqual(todo.is_resolved, expected)
+            self.assertEqual(stats.counters(), stats.count(timezone.now().date()))
+
+    def test_missing_todo_is_404(self):
+        self.assertEqual(self.client.post(reverse("tasks:toggle", args=[999])).status_code, 404)
@@ -5,6 +5,7 @@ from .views import (
     TodoUpdateView,
     TodoDeleteView,
     ToggleResolvedView,
+    BulkActionView,
     StatsView,
 )
 
@@ -17,5 +18,6 @@ urlpatterns = [
     path("todos/<int:pk>/edit/", TodoUpdateView.as_view(), name="edit"),
     path("todos/<int:pk>/delete/", TodoDeleteView.as_view(), name="delete"),
     path("todos/<int:pk>/toggle/", ToggleResolvedView.as_view(), name="toggle"),
+    path("todos/bulk/", BulkActionView.as_view(), name="bulk"),
     path("stats/", StatsView.as_view(), name="stats"),
 ]
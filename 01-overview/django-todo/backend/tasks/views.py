@@ -1,44 +1,96 @@
-from django.db.models import Q
-from django.http import HttpResponseRedirect
+import json
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView
 
-from .models import Todo
+from . import stats
+from .models import CATEGORY_CHOICES, PRIORITY_CHOICES, Todo
 from .forms import TodoForm
+from .pagination import KeysetPaginator
+from .search import search
+
+
+def filter_todos(params, ranked=False):
+    """Todos matching the list filters (status, category, priority, q) in ``params``."""
+    qs = Todo.objects.all()
+    status = params.get("status", "all")
+    category = params.get("category", "all")
+    priority = params.get("priority", "all")
+    q = params.get("q", "")
+
+    if q:
+        qs = search(qs, q, ranked=ranked)
+    if category != "all":
+        qs = qs.filter(category=category)
+    if priority != "all":
+        qs = qs.filter(priority=priority)
+    # Value() makes SQLite compare the column ("= false") and seek the
+    # list indexes; a plain boolean is rendered as "NOT is_resolved"
+    if status == "active":
+        qs = qs.filter(is_resolved=Value(False))
+    elif status == "done":
+        qs = qs.filter(is_resolved=Value(True))
+
+    return qs
+
+
+FILTER_CHOICES = {
+    "status": ("all", "active", "done"),
+    "category": ("all", *dict(CATEGORY_CHOICES)),
+    "priority": ("all", *dict(PRIORITY_CHOICES)),
+}
+
+
+def filter_errors(spec):
+    """Why ``spec`` is not a valid filter for ``filter_todos``, or None.
+
+    The list page can shrug off a bad query string; a bulk action cannot, as
+    a filter that silently matches everything would act on every row. So a
+    filter must narrow the todos down, or say ``"status": "all"`` outright.
+    """
+    for key, value in spec.items():
+        if key == "q":
+            if not isinstance(value, str) or not value.strip():
+                return "filter q must be a non-empty string"
+        elif key not in FILTER_CHOICES:
+            return f"Unknown filter {key!r}; filters are: {', '.join([*FILTER_CHOICES, 'q'])}"
+        elif value not in FILTER_CHOICES[key]:
+            return f"filter {key} must be one of: {', '.join(FILTER_CHOICES[key])}"
+    narrows = "q" in spec or any(value != "all" for key, value in spec.items() if key != "q")
+    if not narrows and spec.get("status") != "all":
+        return 'filter matches every todo; send {"status": "all"} to mean that'
+    return None
 
 
 class TodoListView(ListView):
     model = Todo
     template_name = "tasks/list.html"
     context_object_name = "todos"
+    paginate_by = 50
 
-    def get_queryset(self):
-        qs = Todo.objects.all()
-        status = self.request.GET.get("status", "all")
-        category = self.request.GET.get("category", "all")
-        priority = self.request.GET.get("priority", "all")
-        q = self.request.GET.get("q", "")
+    def get_ordering(self):
         order_by = self.request.GET.get("order_by", "due_date")
-
-        if q:
-            qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
-        if category != "all":
-            qs = qs.filter(category=category)
-        if priority != "all":
-            qs = qs.filter(priority=priority)
-        if status == "active":
-            qs = qs.filter(is_resolved=False)
-        elif status == "done":
-            qs = qs.filter(is_resolved=True)
-
         if order_by in {"due_date", "-due_date", "priority", "-priority"}:
-            qs = qs.order_by("is_resolved", order_by)
-        else:
-            qs = qs.order_by("is_resolved")
+            return ("is_resolved", order_by, "id")
+        if order_by == "relevance" and self.request.GET.get("q"):
+            return ("is_resolved", "rank", "id")
+        return ("is_resolved", "id")
+
+    def paginate_queryset(self, queryset, page_size):
+        # keyset pagination: ?cursor= carries the last row of the previous page
+        paginator = KeysetPaginator(self.get_ordering(), page_size)
+        cursor = self.request.GET.get("cursor")
+        rows, self.next_cursor = paginator.paginate(queryset, cursor)
+        return paginator, None, rows, bool(cursor or self.next_cursor)
 
-        return qs
+    def get_queryset(self):
+        ranked = self.get_ordering()[1] == "rank"
+        return filter_todos(self.request.GET, ranked=ranked).order_by(*self.get_ordering())
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -52,6 +104,8 @@ class TodoListView(ListView):
                     "order_by": self.request.GET.get("order_by", "due_date"),
                 },
                 "today": timezone.now().date(),
+                "cursor": self.request.GET.get("cursor", ""),
+                "next_cursor": self.next_cursor,
             }
         )
         return ctx
@@ -79,23 +133,86 @@ class TodoDeleteView(DeleteView):
 
 class ToggleResolvedView(View):
     def post(self, request, pk):
-        todo = Todo.objects.get(pk=pk)
-        todo.is_resolved = not todo.is_resolved
-        todo.save(update_fields=["is_resolved"])
+        # one UPDATE flips the flag in the database: two quick clicks toggle
+        # twice instead of both writing the same value
+        with transaction.atomic():
+            if not Todo.objects.filter(pk=pk).update(is_resolved=~F("is_resolved")):
+                raise Http404("No task with this id")
+            stats.record_toggle(Todo.objects.filter(pk=pk).values(*stats.FIELDS).get())
         return HttpResponseRedirect(request.META.get("HTTP_REFERER", reverse("tasks:list")))
 
 
+class BulkActionView(View):
+    """Resolve, reopen, delete or recategorize many todos with one statement.
+
+    POST a JSON body with an ``action`` and either ``ids`` or ``filter`` (the
+    list page's filters: status, category, priority, q)::
+
+        {"action": "resolve", "ids": [1, 2, 3]}
+        {"action": "delete", "filter": {"status": "done"}}
+        {"action": "recategorize", "category": "work", "filter": {"q": "report"}}
+
+    Answers ``{"action": ..., "affected": n}``: rows actually changed, so
+    resolving already-resolved todos counts nothing.
+    """
+
+    actions = ("resolve", "reopen", "delete", "recategorize")
+    max_ids = 10000
+
+    def post(self, request):
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return self.error("Body must be JSON")
+        if not isinstance(body, dict) or body.get("action") not in self.actions:
+            return self.error(f"action must be one of: {', '.join(self.actions)}")
+        action = body["action"]
+        if ("ids" in body) == ("filter" in body):
+            return self.error("Give either ids or filter")
+        category = body.get("category")
+        if action == "recategorize" and category not in dict(CATEGORY_CHOICES):
+            return self.error(f"category must be one of: {', '.join(dict(CATEGORY_CHOICES))}")
+
+        if "ids" in body:
+            ids = body["ids"]
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return self.error("ids must be a list of integers")
+            if len(ids) > self.max_ids:
+                return self.error(f"At most {self.max_ids} ids per request; use a filter")
+            qs = Todo.objects.filter(pk__in=ids)
+        else:
+            if not isinstance(body["filter"], dict):
+                return self.error("filter must be an object")
+            message = filter_errors(body["filter"])
+            if message:
+                return self.error(message)
+            qs = filter_todos(body["filter"])
+
+        with transaction.atomic():
+            if action == "delete":
+                affected = qs.delete_rows()
+            elif action == "resolve":
+                affected = qs.filter(is_resolved=Value(False)).update(is_resolved=True)
+            elif action == "reopen":
+                affected = qs.filter(is_resolved=Value(True)).update(is_resolved=False)
+            else:
+                affected = qs.exclude(category=category).update(category=category)
+            # update() and delete_rows() send no signals
+            if affected:
+                transaction.on_commit(stats.invalidate)
+        return JsonResponse({"action": action, "affected": affected})
+
+    @staticmethod
+    def error(message):
+        return JsonResponse({"error": message}, status=400)
+
+
 class StatsView(TemplateView):
     template_name = "tasks/stats.html"
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        todos = Todo.objects.all()
-        total = todos.count()
-        active = todos.filter(is_resolved=False).count()
-        done = todos.filter(is_resolved=True).count()
-        today = timezone.now().date()
-        overdue = todos.filter(is_resolved=False, due_date__lt=today).count()
-        progress = int(round((done / total) * 100)) if total else 0
-        ctx.update({"stats": {"total": total, "active": active, "done": done, "overdue": overdue, "progress": progress}})
+        counts = stats.get_stats()
+        ctx["stats"] = counts
+        ctx["breakdowns"] = [("By category", counts["by_category"]), ("By priority", counts["by_priority"])]
         return ctx
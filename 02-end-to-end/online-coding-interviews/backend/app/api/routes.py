@@ -1,5 +1,8 @@
+import json
+from datetime import datetime
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Literal, List
 from ..services.room_service import (
     create_room,
@@ -7,9 +10,15 @@ from ..services.room_service import (
     update_code,
     update_task,
     update_language,
-    get_participants,
 )
-from ..services.exec_service import execute_code
+from ..services.exec_service import ExecutorBusy, STDIN_LIMIT, exec_pool
+from ..services.exec_cache import result_cache
+from ..services.room_cache import room_cache
+from ..services.lifecycle import lifecycle
+from ..services.exec_jobs import exec_jobs, RoomBusy
+from ..services.backplane import backplane
+from ..services.room_state import room_state
+from ..services import history
 
 router = APIRouter()
 
@@ -29,6 +38,8 @@ class UpdateLanguageRequest(BaseModel):
 class ExecuteCodeRequest(BaseModel):
     code: str
     language: Literal["javascript", "python"]
+    stdin: str = Field(default="", max_length=STDIN_LIMIT)
+    cache: bool = True
 
 class Room(BaseModel):
     id: str
@@ -47,6 +58,22 @@ class CodeExecutionResult(BaseModel):
     output: str
     error: str | None
     executionTime: int
+    cached: bool = False
+
+class ExecutionJob(BaseModel):
+    id: str
+    roomId: str
+    language: Literal["javascript", "python"]
+    status: Literal["queued", "running", "completed", "cancelled"]
+    output: str | None = None
+    error: str | None = None
+    executionTime: int | None = None
+    cached: bool = False
+
+class Revision(BaseModel):
+    seq: int
+    createdAt: str
+    code: str
 
 @router.post("/rooms", response_model=Room, status_code=201)
 def api_create_room(body: CreateRoomRequest | None = None):
@@ -86,6 +113,8 @@ def api_root():
             "/rooms/{roomId}/language",
             "/rooms/{roomId}/participants",
             "/rooms/{roomId}/execute",
+            "/rooms/{roomId}/jobs",
+            "/rooms/{roomId}/revisions",
         ],
     }
 
@@ -97,9 +126,73 @@ def api_update_language(room_id: str, body: UpdateLanguageRequest):
     return r
 
 @router.get("/rooms/{room_id}/participants", response_model=List[Participant])
-def api_get_participants(room_id: str):
-    return get_participants(room_id)
+async def api_get_participants(room_id: str):
+    return await backplane.members(room_id)
 
 @router.post("/rooms/{room_id}/execute", response_model=CodeExecutionResult)
-def api_execute(room_id: str, body: ExecuteCodeRequest):
-    return execute_code(body.code, body.language)
+async def api_execute(room_id: str, body: ExecuteCodeRequest):
+    # same as submitting a job, but waits for the result
+    job = _submit(room_id, body)
+    return await job.done
+
+@router.post("/rooms/{room_id}/jobs", response_model=ExecutionJob, status_code=202)
+async def api_submit_job(room_id: str, body: ExecuteCodeRequest):
+    return _submit(room_id, body).to_dict()
+
+@router.get("/rooms/{room_id}/jobs/{job_id}", response_model=ExecutionJob)
+async def api_get_job(room_id: str, job_id: str):
+    job = exec_jobs.get(room_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return job.to_dict()
+
+@router.delete("/rooms/{room_id}/jobs/{job_id}", response_model=ExecutionJob, status_code=202)
+async def api_cancel_job(room_id: str, job_id: str):
+    job = exec_jobs.cancel(room_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return job.to_dict()
+
+@router.get("/rooms/{room_id}/revisions")
+def api_get_revisions(
+    room_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    format: Literal["delta", "full"] = "delta",
+):
+    # NDJSON, one revision per line; the first line always carries the full code
+    if get_room(room_id) is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    room_state.flush(room_id)  # include edits still in the write-behind buffer
+    revisions = history.iter_revisions(room_id, since, until, full=format == "full")
+    return StreamingResponse(
+        (json.dumps(r, separators=(",", ":")) + "\n" for r in revisions),
+        media_type="application/x-ndjson",
+    )
+
+@router.get("/rooms/{room_id}/revisions/{seq}", response_model=Revision)
+def api_get_revision(room_id: str, seq: int):
+    r = history.revision(room_id, seq)
+    if r is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return r
+
+@router.get("/room-state/stats")
+def api_room_state_stats():
+    return lifecycle.stats()
+
+@router.get("/room-cache/stats")
+def api_room_cache_stats():
+    return room_cache.stats()
+
+@router.get("/exec/stats")
+def api_exec_stats():
+    return {"pool": exec_pool.stats(), "cache": result_cache.stats()}
+
+def _submit(room_id: str, body: ExecuteCodeRequest):
+    try:
+        return exec_jobs.submit(room_id, body.code, body.language, body.stdin, body.cache)
+    except RoomBusy:
+        raise HTTPException(status_code=429, detail="Too many runs in this room")
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail="Execution queue is full")
@@ -1,3 +1,2 @@
 rooms: dict[str, dict] = {}
-participants: dict[str, list[dict]] = {}
 
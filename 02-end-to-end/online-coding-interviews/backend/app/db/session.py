@@ -1,15 +1,79 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-DATABASE_URL = "sqlite:///./rooms.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./rooms.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+# Room writes come from the room-db executor, the write-behind flusher and the
+# API threadpool, so the pool covers DB_WORKERS plus a few request threads.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", str(int(os.environ.get("DB_WORKERS", "4")) + 4)))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+# WAL lets readers run alongside the single writer; NORMAL only fsyncs at
+# checkpoints, which is safe in WAL mode (a crash can lose the last commits,
+# never corrupt the file). busy_timeout makes writers wait instead of failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.environ.get("SQLITE_CACHE_SIZE", "-16000"),  # negative = KiB
+    "busy_timeout": os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"),
+    "temp_store": "MEMORY",
+}
+
+
+def make_engine(
+    url: str = DATABASE_URL,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+    pragmas: dict | None = SQLITE_PRAGMAS,
+) -> Engine:
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
+    kwargs: dict = {"connect_args": {"check_same_thread": False}}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # one shared connection, otherwise every checkout sees an empty database
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=DB_POOL_TIMEOUT)
+    eng = create_engine(url, **kwargs)
+    if pragmas:
+        @event.listens_for(eng, "connect")
+        def _set_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+            cur.close()
+    return eng
+
+
+engine = make_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def init_db(Base) -> None:
-    Base.metadata.create_all(bind=engine)
+def init_db(Base, bind: Engine | None = None) -> None:
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    _add_missing_columns(Base, bind)
 
+def _add_missing_columns(Base, bind: Engine) -> None:
+    # create_all never alters existing tables; add new nullable columns and
+    # indexes so older databases keep working without a migration tool
+    insp = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing and c.nullable]
+        if missing:
+            with bind.begin() as conn:
+                for col in missing:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{col.name}" {col.type.compile(bind.dialect)}'))
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
@@ -1,14 +1,57 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routes import router as api_router
-from .services.room_service import update_code, update_task, add_participant, remove_participant, get_participants, update_language
+from .services.room_service import (
+    buffer_code,
+    buffer_task,
+    buffer_language,
+    persist_soon,
+    open_room_async,
+    hydrate_room_async,
+    release_room_async,
+)
+from .services.room_state import room_state
+from .services.room_cache import room_cache
+from .services.lifecycle import lifecycle
+from .services.archive import archiver
+from .services.broadcast import RoomHub, CLOSE_TRY_AGAIN
+from .services.heartbeat import Heartbeat
+from .services.metrics import registry, METRICS_ENABLED
+from .services.wire import dumps, negotiate
+from .services.resume import sessions, Session, CLOSE_SESSION_MOVED
+from .services.code_sync import code_sync, StaleRevision
+from .services.backplane import backplane
+from .services.exec_service import exec_pool, ExecutorBusy, STDIN_LIMIT, SUPPORTED as EXEC_SUPPORTED
+from .services.exec_jobs import exec_jobs, RoomBusy
+from contextlib import asynccontextmanager
 import json
+import time
 from datetime import datetime, timezone
 import os
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from .models.database import Base
 from .db.session import init_db, engine
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    room_state.start()
+    lifecycle.start()
+    archiver.start()
+    await backplane.start(_on_remote)
+    heartbeat.start(_reap)
+    if EXEC_SUPPORTED:
+        exec_pool.start()
+    exec_jobs.start(_fanout)
+    yield
+    exec_jobs.stop()
+    exec_pool.stop()
+    await heartbeat.stop()
+    await backplane.stop()
+    archiver.stop()
+    lifecycle.stop()
+    room_state.stop()
+
 app = FastAPI(
     title="CodeInterview API",
     description="API for the online technical interview platform",
@@ -16,6 +59,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -33,13 +77,33 @@ try:
 except Exception:
     pass
 
-rooms_ws: dict[str, set[WebSocket]] = {}
+hub = RoomHub()
+heartbeat = Heartbeat(hub)
+
+WS_MESSAGES = registry.counter("ws_messages_total", "WebSocket messages received, by type.", ("type",))
+WS_MESSAGE_SECONDS = registry.histogram("ws_message_seconds", "Time to handle a WebSocket message, by type.", ("type",))
+registry.gauge("rooms_active", "Rooms with a socket on this worker.", lambda: len(hub.rooms))
+registry.gauge("ws_connections", "Open room sockets on this worker.", lambda: sum(len(c) for c in hub.rooms.values()))
+registry.gauge("participants", "Joined participants on this worker.", lambda: len(ws_participant_map))
+registry.gauge("exec_queue_depth", "Runs waiting for an execution worker.", lambda: exec_pool.stats()["queued"])
+registry.gauge("exec_workers_busy", "Execution workers running code.", lambda: exec_pool.stats()["busy"])
 ws_participant_map: dict[WebSocket, tuple[str, str, str]] = {}
+ws_sessions: dict[WebSocket, str] = {}  # resume token per socket
+# participants by id per room with local sockets (for resync frames and legacy clients)
+rosters: dict[str, dict[str, dict]] = {}
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/ws/stats")
+def ws_stats():
+    return {"heartbeat": heartbeat.stats(), "coalescing": hub.stats(), "resume": sessions.stats()}
+
 @app.get("/api")
 def api_root_alias():
     return {
@@ -52,106 +116,320 @@ def api_root_alias():
             "/api/rooms/{roomId}/language",
             "/api/rooms/{roomId}/participants",
             "/api/rooms/{roomId}/execute",
+            "/api/rooms/{roomId}/jobs",
         ],
     }
 
 @app.websocket("/ws/rooms/{room_id}")
 async def room_ws(websocket: WebSocket, room_id: str):
     await websocket.accept()
-    if room_id not in rooms_ws:
-        rooms_ws[room_id] = set()
-    rooms_ws[room_id].add(websocket)
+    encoding = negotiate(websocket.query_params.get("encoding"))
+    conn = hub.join(room_id, websocket, resync=lambda: _snapshot_frames(room_id), encoding=encoding)
+    await open_room_async(room_id)
     try:
         while True:
             msg = await websocket.receive_text()
+            conn.last_seen = received = time.monotonic()  # any frame, "pong" included
             try:
                 data = json.loads(msg)
             except Exception:
                 continue
             t = data.get("type")
+            if t in _STATEFUL and not room_state.touch(room_id):
+                # evicted while idle: load it back before applying the change
+                await hydrate_room_async(room_id)
             if t == "code_update":
                 code = data.get("code", "")
-                update_code(room_id, code)
-                for ws in list(rooms_ws.get(room_id, set())):
-                    if ws is not websocket:
-                        try:
-                            await ws.send_text(json.dumps({"type": "code", "code": code}))
-                        except Exception:
-                            pass
+                buffer_code(room_id, code)
+                rev = code_sync.reset(room_id)
+                hub.broadcast(room_id, {"type": "code", "code": code, "rev": rev}, exclude=websocket, latest="code")
+                await _share_state(room_id, {"code": code})
+            elif t == "code_ops":
+                code = _apply_code_ops(room_id, websocket, data)
+                if code is not None:
+                    await _share_state(room_id, {"code": code})
             elif t == "task_update":
                 task = data.get("task", "")
                 title = data.get("title")
-                update_task(room_id, task, title)
-                for ws in list(rooms_ws.get(room_id, set())):
-                    if ws is not websocket:
-                        try:
-                            await ws.send_text(json.dumps({"type": "task", "task": task, "title": title}))
-                        except Exception:
-                            pass
+                buffer_task(room_id, task, title)
+                hub.broadcast(room_id, {"type": "task", "task": task, "title": title}, exclude=websocket, latest="task")
+                persist_soon(room_id)
+                await _share_state(room_id, {"task": task} if title is None else {"task": task, "taskTitle": title})
             elif t == "join":
                 name = data.get("name") or "Guest"
-                p = add_participant(room_id, name)
+                features = data.get("features")
+                if isinstance(features, list):
+                    conn.features.update(f for f in ("ops", "presence", "batch", "resume", "heartbeat") if f in features)
+                p = await backplane.join(room_id, name)
                 ws_participant_map[websocket] = (room_id, p["id"], p["name"]) 
-                plist = get_participants(room_id)
-                for ws in list(rooms_ws.get(room_id, set())):
-                    try:
-                        await ws.send_text(json.dumps({"type": "participants", "participants": plist}))
-                    except Exception:
-                        pass
-                try:
-                    await websocket.send_text(json.dumps({"type": "me", "id": p["id"], "name": p["name"]}))
-                except Exception:
-                    pass
+                conn.pid = p["id"]
+                me = {"type": "me", "id": p["id"], "name": p["name"]}
+                if "resume" in conn.features:
+                    s = sessions.issue(room_id, p["id"], p["name"], conn.features)
+                    ws_sessions[websocket] = s.token
+                    me.update(resumeToken=s.token, seq=hub.keep_log(room_id).seq)
+                await _presence_joined(room_id, websocket, p)
+                hub.send(room_id, websocket, me)
+                if _supports_ops(conn):
+                    _send_code_snapshot(room_id, websocket)
                 # system join message
-                join_payload = json.dumps({"type": "chat", "userName": p["name"], "text": "joined", "timestamp": _now()})
-                for ws in list(rooms_ws.get(room_id, set())):
-                    try:
-                        await ws.send_text(join_payload)
-                    except Exception:
-                        pass
+                await _fanout(room_id, {"type": "chat", "userName": p["name"], "text": "joined", "timestamp": _now()})
+            elif t == "resume":
+                await _resume(room_id, websocket, data)
             elif t == "chat_message":
                 text = data.get("text", "")
                 rid_pid_name = ws_participant_map.get(websocket)
                 userName = (rid_pid_name[2] if rid_pid_name else data.get("userName", "Guest"))
-                payload = json.dumps({"type": "chat", "userName": userName, "text": text, "timestamp": _now()})
-                for ws in list(rooms_ws.get(room_id, set())):
-                    try:
-                        await ws.send_text(payload)
-                    except Exception:
-                        pass
+                await _fanout(room_id, {"type": "chat", "userName": userName, "text": text, "timestamp": _now()}, batched=True)
             elif t == "output_update":
                 output = data.get("output", "")
                 error = data.get("error")
                 executionTime = data.get("executionTime", 0)
-                payload = json.dumps({"type": "output", "output": output, "error": error, "executionTime": executionTime})
-                for ws in list(rooms_ws.get(room_id, set())):
-                    if ws is not websocket:
-                        try:
-                            await ws.send_text(payload)
-                        except Exception:
-                            pass
+                await _fanout(room_id, {"type": "output", "output": output, "error": error, "executionTime": executionTime}, exclude=websocket, latest="output")
+            elif t == "run_code":
+                _run_code(room_id, websocket, data)
+            elif t == "cancel_job":
+                job_id = data.get("jobId")
+                if isinstance(job_id, str) and exec_jobs.cancel(room_id, job_id) is None:
+                    # accepted by another worker
+                    await backplane.publish({"kind": "cancel_job", "room": room_id, "job": job_id})
             elif t == "language_update":
                 lang = data.get("language")
                 if lang in ("javascript", "python"):
-                    update_language(room_id, lang)
-                    for ws in list(rooms_ws.get(room_id, set())):
-                        if ws is not websocket:
-                            try:
-                                await ws.send_text(json.dumps({"type": "language", "language": lang}))
-                            except Exception:
-                                pass
+                    buffer_language(room_id, lang)
+                    hub.broadcast(room_id, {"type": "language", "language": lang}, exclude=websocket, latest="language")
+                    persist_soon(room_id)
+                    await _share_state(room_id, {"language": lang})
+            if METRICS_ENABLED:
+                kind = t if t in _MESSAGE_TYPES else "other"
+                WS_MESSAGES.inc(kind)
+                WS_MESSAGE_SECONDS.observe(time.monotonic() - received, kind)
     except WebSocketDisconnect:
-        rooms_ws[room_id].discard(websocket)
-        rid_pid_name = ws_participant_map.pop(websocket, None)
-        if rid_pid_name and rid_pid_name[0] == room_id:
-            remove_participant(room_id, rid_pid_name[1])
-            plist = get_participants(room_id)
-            for ws in list(rooms_ws.get(room_id, set())):
-                try:
-                    await ws.send_text(json.dumps({"type": "participants", "participants": plist}))
-                except Exception:
-                    pass
+        await _disconnect(room_id, websocket)
+    except ConnectionError:
+        # the backplane is down; the client reconnects and tries again
+        await _reap(room_id, websocket)
+
+
+async def _disconnect(room_id: str, websocket: WebSocket) -> None:
+    if hub.get(room_id, websocket) is None:
+        return  # already reaped
+    await hub.leave(room_id, websocket)
+    rid_pid_name = ws_participant_map.pop(websocket, None)
+    token = ws_sessions.pop(websocket, None)
+    if rid_pid_name and rid_pid_name[0] == room_id:
+        # resumable sessions stay in the room for a grace period
+        if token is None or not sessions.park(token, _session_expired):
+            await _participant_left(room_id, rid_pid_name[1])
+    if room_id not in hub.rooms:
+        code_sync.drop(room_id)
+        rosters.pop(room_id, None)
+        if not sessions.parked(room_id):
+            hub.drop_log(room_id)
+    await release_room_async(room_id)
+
+
+async def _reap(room_id: str, websocket: WebSocket, code: int = CLOSE_TRY_AGAIN) -> None:
+    # dead for the heartbeat: clean up now rather than when a receive fails
+    await _disconnect(room_id, websocket)
+    try:
+        await websocket.close(code=code)
+    except Exception:
+        pass
+
+
+_STATEFUL = frozenset({"code_update", "code_ops", "task_update", "language_update", "join", "resume"})
+_MESSAGE_TYPES = _STATEFUL | {"chat_message", "output_update", "run_code", "cancel_job", "pong"}
+
+
+async def _participant_left(room_id: str, participant_id: str) -> None:
+    try:
+        await backplane.leave(room_id, participant_id)
+    except ConnectionError:
+        pass  # the broker drops a lost worker's participants itself
+    await _presence_left(room_id, participant_id)
+
+async def _session_expired(s: Session) -> None:
+    await _participant_left(s.room_id, s.pid)
+    if s.room_id not in hub.rooms and not sessions.parked(s.room_id):
+        hub.drop_log(s.room_id)
+
+async def _resume(room_id: str, websocket: WebSocket, data: dict) -> None:
+    token = data.get("token")
+    conn = hub.get(room_id, websocket)
+    s = sessions.resume(token, room_id) if isinstance(token, str) and websocket not in ws_participant_map else None
+    if s is None:
+        # expired or unknown: the client joins from scratch
+        hub.send(room_id, websocket, {"type": "resume_failed"})
+        return
+    old = next((ws for ws in hub.rooms.get(room_id, {}) if ws is not websocket and ws_sessions.get(ws) == s.token), None)
+    if old is not None:
+        # its drop has not been noticed yet: detach it without a leave
+        ws_participant_map.pop(old, None)
+        ws_sessions.pop(old, None)
+        await _reap(room_id, old, code=CLOSE_SESSION_MOVED)
+    conn.features.update(s.features)
+    conn.pid = s.pid
+    ws_participant_map[websocket] = (room_id, s.pid, s.name)
+    ws_sessions[websocket] = s.token
+    last = data.get("lastSeq")
+    replayed = hub.replay(room_id, websocket, last) if isinstance(last, int) else None
+    if replayed is None:
+        # missed more than the buffer holds
+        await _roster(room_id)
+        for frame in _snapshot_frames(room_id):
+            conn.offer(frame)
+    if _supports_ops(conn) and data.get("rev") != code_sync.revision(room_id):
+        _send_code_snapshot(room_id, websocket)
+    hub.send(room_id, websocket, {"type": "resumed", "seq": hub.keep_log(room_id).seq, "replayed": replayed or 0, "full": replayed is None})
+
+
+async def _fanout(
+    room_id: str,
+    message: dict,
+    exclude: WebSocket | None = None,
+    latest: str | None = None,
+    batched: bool = False,
+) -> None:
+    # local sockets directly, other workers through the backplane; encoded once
+    payload = dumps(message)
+    hub.broadcast_raw(room_id, payload, exclude, latest=latest, batched=batched)
+    event = {"kind": "frame", "room": room_id, "payload": payload}
+    if latest is not None or batched:
+        event.update(latest=latest, batched=batched)
+    await backplane.publish(event)
+
+async def _share_state(room_id: str, fields: dict) -> None:
+    await backplane.publish({"kind": "state", "room": room_id, "fields": fields})
+
+async def _roster(room_id: str) -> dict[str, dict]:
+    # local mirror of the room's participants, kept current by join/leave diffs
+    roster = rosters.get(room_id)
+    if roster is None:
+        roster = {p["id"]: p for p in await backplane.members(room_id)}
+        if room_id in hub.rooms:
+            rosters[room_id] = roster
+    return roster
+
+async def _presence_joined(room_id: str, websocket: WebSocket, p: dict) -> None:
+    roster = await _roster(room_id)
+    roster[p["id"]] = p
+    hub.send(room_id, websocket, {"type": "participants", "participants": list(roster.values())})
+    _announce_presence(room_id, {"type": "participant_joined", "participant": p}, exclude=websocket)
+    await backplane.publish({"kind": "presence", "room": room_id, "joined": p})
+
+async def _presence_left(room_id: str, participant_id: str) -> None:
+    roster = rosters.get(room_id)
+    if roster is not None:
+        roster.pop(participant_id, None)
+    _announce_presence(room_id, {"type": "participant_left", "id": participant_id})
+    await backplane.publish({"kind": "presence", "room": room_id, "left": participant_id})
+
+def _announce_presence(room_id: str, diff: dict, exclude: WebSocket | None = None) -> None:
+    # O(1) diff for clients that negotiated "presence"; legacy clients still
+    # get the whole roster, encoded once, and only if any are connected
+    hub.broadcast(room_id, diff, exclude=exclude, only=_supports_presence)
+    if any(not _supports_presence(c) and c.ws is not exclude for c in hub.connections(room_id)):
+        roster = list(rosters.get(room_id, {}).values())
+        hub.broadcast(room_id, {"type": "participants", "participants": roster},
+                      exclude=exclude, only=lambda c: not _supports_presence(c))
+
+def _on_remote(event: dict) -> None:
+    room_id = event.get("room")
+    kind = event.get("kind")
+    if kind == "cancel_job":
+        exec_jobs.cancel(room_id, event["job"])
+        return
+    if kind == "state":
+        room_cache.invalidate(room_id)
+    if room_id not in hub.rooms:
+        return
+    if kind == "frame":
+        hub.broadcast_raw(room_id, event["payload"], latest=event.get("latest"), batched=event.get("batched", False))
+    elif kind == "presence":
+        roster = rosters.get(room_id)
+        if "joined" in event:
+            if roster is not None:
+                roster[event["joined"]["id"]] = event["joined"]
+            _announce_presence(room_id, {"type": "participant_joined", "participant": event["joined"]})
+        else:
+            if roster is not None:
+                roster.pop(event["left"], None)
+            _announce_presence(room_id, {"type": "participant_left", "id": event["left"]})
+    elif kind == "roster":
+        rosters[room_id] = {p["id"]: p for p in event["participants"]}
+        hub.broadcast(room_id, {"type": "participants", "participants": event["participants"]})
+    elif kind == "state":
+        # the worker that accepted the change has it in its write-behind store
+        # and its flusher writes it; refresh() keeps ours clean so only one does
+        fields = event["fields"]
+        room_state.refresh(room_id, **fields)
+        if "code" in fields:
+            rev = code_sync.reset(room_id)
+            hub.broadcast(room_id, {"type": "code", "code": fields["code"], "rev": rev}, latest="code")
+        if "task" in fields:
+            hub.broadcast(room_id, {"type": "task", "task": fields["task"], "title": fields.get("taskTitle")}, latest="task")
+        if "language" in fields:
+            hub.broadcast(room_id, {"type": "language", "language": fields["language"]}, latest="language")
+
+
+def _supports_ops(conn) -> bool:
+    return "ops" in conn.features
+
+def _supports_presence(conn) -> bool:
+    return "presence" in conn.features
+
+def _send_code_snapshot(room_id: str, websocket: WebSocket) -> None:
+    room = room_state.get(room_id)
+    if room is not None:
+        hub.send(room_id, websocket, {"type": "code_snapshot", "rev": code_sync.revision(room_id), "code": room["code"]})
+
+def _apply_code_ops(room_id: str, websocket: WebSocket, data: dict) -> str | None:
+    room = room_state.get(room_id)
+    rev = data.get("rev")
+    if room is None or not isinstance(rev, int):
+        return None
+    try:
+        new_rev, ops, code = code_sync.submit(room_id, room["code"], rev, data.get("ops"))
+    except (StaleRevision, ValueError):
+        # too far behind or diverged: the client rebases on a fresh snapshot
+        _send_code_snapshot(room_id, websocket)
+        return None
+    buffer_code(room_id, code)
+    hub.send(room_id, websocket, {"type": "code_ack", "rev": new_rev})
+    # not replayed on resume: delta clients get a code_snapshot instead
+    hub.broadcast(room_id, {"type": "code_ops", "rev": new_rev, "ops": ops}, exclude=websocket, only=_supports_ops, replay=False)
+    hub.broadcast(room_id, {"type": "code", "code": code, "rev": new_rev}, exclude=websocket,
+                  only=lambda c: not _supports_ops(c), latest="code")
+    return code
+
+
+def _run_code(room_id: str, websocket: WebSocket, data: dict) -> None:
+    code = data.get("code")
+    language = data.get("language")
+    stdin = data.get("stdin") or ""
+    if not isinstance(code, str) or language not in ("javascript", "python") or not isinstance(stdin, str):
+        return
+    try:
+        exec_jobs.submit(room_id, code, language, stdin[:STDIN_LIMIT], data.get("cache") is not False)
+    except RoomBusy:
+        hub.send(room_id, websocket, {"type": "job_error", "error": "Too many runs in this room"})
+    except ExecutorBusy:
+        hub.send(room_id, websocket, {"type": "job_error", "error": "Execution queue is full"})
+
 
+def _snapshot_frames(room_id: str) -> list[str]:
+    # sent to a client whose send queue overflowed, replacing what it missed.
+    # The lifecycle may have evicted the room's state while its sockets only
+    # chatted; load it back here (the resync callback is synchronous, and this
+    # is one primary-key read on a rare path)
+    room = room_state.hydrate(room_id)
+    frames = [dumps({"type": "participants", "participants": list(rosters.get(room_id, {}).values())})]
+    if room is not None:
+        frames.append(dumps({"type": "language", "language": room["language"]}))
+        frames.append(dumps({"type": "task", "task": room["task"], "title": room["taskTitle"]}))
+        frames.append(dumps({"type": "code", "code": room["code"], "rev": code_sync.revision(room_id)}))
+    return frames
 
 def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Text, DateTime
+from sqlalchemy import String, Text, DateTime, LargeBinary, Integer, Boolean, Index
 from datetime import datetime
 
 class Base(DeclarativeBase):
@@ -12,5 +12,42 @@ class RoomModel(Base):
     language: Mapped[str] = mapped_column(String(16))
     task: Mapped[str] = mapped_column(Text, default="")
     taskTitle: Mapped[str] = mapped_column(String(256), default="")
+    createdAt: Mapped[datetime] = mapped_column(DateTime, index=True)
+    # nullable: added to existing databases by init_db, backfilled by the archiver
+    updatedAt: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "code": self.code,
+            "language": self.language,
+            "task": self.task,
+            "taskTitle": self.taskTitle,
+            "createdAt": self.createdAt.isoformat(),
+        }
+
+
+class ArchivedRoomModel(Base):
+    """Cold storage for rooms nobody touched in a while (see services/archive.py)."""
+    __tablename__ = "rooms_archive"
+    id: Mapped[str] = mapped_column(String(16), primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary)  # zlib-compressed JSON of to_dict()
     createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
+    archivedAt: Mapped[datetime] = mapped_column(DateTime, index=True)
+
 
+class CodeRevisionModel(Base):
+    """Append-only code history (see services/history.py): a full snapshot
+    every few revisions, compressed deltas in between."""
+    __tablename__ = "code_revisions"
+    __table_args__ = (
+        Index("ix_code_revisions_room_seq", "roomId", "seq", unique=True),
+        Index("ix_code_revisions_room_time", "roomId", "createdAt"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    roomId: Mapped[str] = mapped_column(String(16))
+    seq: Mapped[int] = mapped_column(Integer)
+    snapshot: Mapped[bool] = mapped_column(Boolean)
+    data: Mapped[bytes] = mapped_column(LargeBinary)  # zlib: full text or JSON ops
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
@@ -0,0 +1,179 @@
+"""Move rooms nobody has touched for a while out of the hot ``rooms`` table.
+
+Archived rooms are stored zlib-compressed in ``rooms_archive`` and restored
+transparently the first time anything asks for them (``get_room``, a socket
+opening the room, a REST update), so ids and links keep working.
+
+Runs in the background every ``ROOM_ARCHIVE_INTERVAL`` seconds (0 disables),
+or by hand: python -m app.services.archive [--days N]
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..db.session import SessionLocal
+from ..models.database import RoomModel, ArchivedRoomModel
+from .room_cache import room_cache
+
+logger = logging.getLogger(__name__)
+
+ROOM_ARCHIVE_DAYS = float(os.environ.get("ROOM_ARCHIVE_DAYS", "30"))
+ROOM_ARCHIVE_INTERVAL = float(os.environ.get("ROOM_ARCHIVE_INTERVAL", "3600"))
+BATCH_SIZE = 500
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _pack(room: dict) -> bytes:
+    return zlib.compress(json.dumps(room, separators=(",", ":")).encode(), 6)
+
+
+def _unpack(data: bytes) -> dict:
+    return json.loads(zlib.decompress(data))
+
+
+def archive_rooms(
+    days: float = ROOM_ARCHIVE_DAYS,
+    exclude: Iterable[str] = (),
+    batch_size: int = BATCH_SIZE,
+    now: datetime | None = None,
+) -> int:
+    """Archive rooms not updated for ``days``; ``exclude`` is rooms currently
+    held in memory. Returns how many were moved."""
+    now = now or utcnow()
+    cutoff = now - timedelta(days=days)
+    skip = set(exclude)
+    moved = 0
+    with SessionLocal() as db:
+        # rows from before updatedAt existed count from their creation
+        db.execute(update(RoomModel).where(RoomModel.updatedAt.is_(None)).values(updatedAt=RoomModel.createdAt))
+        db.commit()
+        while True:
+            rows = db.scalars(
+                select(RoomModel).where(RoomModel.updatedAt < cutoff).order_by(RoomModel.updatedAt).limit(batch_size + len(skip))
+            ).all()
+            rows = [r for r in rows if r.id not in skip][:batch_size]
+            if not rows:
+                break
+            for obj in rows:
+                db.add(ArchivedRoomModel(
+                    id=obj.id,
+                    data=_pack(obj.to_dict()),
+                    createdAt=obj.createdAt,
+                    updatedAt=obj.updatedAt,
+                    archivedAt=now,
+                ))
+                db.delete(obj)
+            db.commit()
+            for obj in rows:
+                room_cache.invalidate(obj.id)
+            moved += len(rows)
+            if len(rows) < batch_size:
+                break
+    return moved
+
+
+def restore_room(db: Session, room_id: str) -> RoomModel | None:
+    """Move an archived room back into ``rooms`` and return it (None if it
+    was never archived)."""
+    arch = db.get(ArchivedRoomModel, room_id)
+    if arch is None:
+        return None
+    room = _unpack(arch.data)
+    obj = RoomModel(
+        id=room_id,
+        code=room["code"],
+        language=room["language"],
+        task=room["task"],
+        taskTitle=room["taskTitle"],
+        createdAt=arch.createdAt,
+        updatedAt=utcnow(),
+    )
+    db.add(obj)
+    db.delete(arch)
+    try:
+        db.commit()
+    except IntegrityError:
+        # restored concurrently by another request
+        db.rollback()
+        return db.get(RoomModel, room_id)
+    return obj
+
+
+def get_or_restore(db: Session, room_id: str) -> RoomModel | None:
+    return db.get(RoomModel, room_id) or restore_room(db, room_id)
+
+
+def id_taken(db: Session, room_id: str) -> bool:
+    return db.get(RoomModel, room_id) is not None or db.get(ArchivedRoomModel, room_id) is not None
+
+
+class Archiver:
+    def __init__(
+        self,
+        days: float = ROOM_ARCHIVE_DAYS,
+        interval: float = ROOM_ARCHIVE_INTERVAL,
+        resident: Callable[[], Iterable[str]] = lambda: (),
+    ):
+        self.days = days
+        self.interval = interval
+        self.resident = resident
+        self.archived = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def run_once(self) -> int:
+        n = archive_rooms(self.days, exclude=self.resident())
+        self.archived += n
+        return n
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="room-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("archive pass failed; retrying in %ss", self.interval)
+
+
+def _resident_rooms() -> list[str]:
+    from .room_state import room_state  # room_state restores through this module
+    return [r["id"] for r in room_state.resident()]
+
+
+archiver = Archiver(resident=_resident_rooms)
+
+
+def _main() -> None:
+    from ..db.session import init_db
+    from ..models.database import Base
+    parser = argparse.ArgumentParser(description="Archive rooms untouched for N days")
+    parser.add_argument("--days", type=float, default=ROOM_ARCHIVE_DAYS)
+    args = parser.parse_args()
+    init_db(Base)
+    print(f"archived {archive_rooms(args.days)} rooms")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,189 @@
+"""Room broadcast and presence shared between server processes.
+
+Every worker delivers room traffic to its own sockets directly through the
+``RoomHub``; the backplane only carries events to *other* workers and owns the
+participant roster. ``LocalBackplane`` is the single-process default.
+``BrokerBackplane`` talks to ``app.services.broker`` over a Unix socket so that
+several uvicorn workers (or replicas on one host) share rooms.
+
+Configure with ``BACKPLANE_URL``: unset or ``memory://`` for in-process,
+``unix:///path/to/broker.sock`` for the broker. Broker calls fail with
+``ConnectionError`` once the connection is lost, and after
+``BACKPLANE_CALL_TIMEOUT`` seconds without a reply.
+"""
+import abc
+import asyncio
+import itertools
+import json
+import logging
+import os
+import uuid
+from typing import Callable
+from .room_service import add_participant, remove_participant, get_participants
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[dict], None]
+
+BACKPLANE_CALL_TIMEOUT = float(os.environ.get("BACKPLANE_CALL_TIMEOUT", "5"))
+
+
+class Backplane(abc.ABC):
+    node_id: str
+
+    @abc.abstractmethod
+    async def start(self, deliver: Deliver) -> None: ...
+
+    @abc.abstractmethod
+    async def stop(self) -> None: ...
+
+    @abc.abstractmethod
+    async def publish(self, event: dict) -> None: ...
+
+    @abc.abstractmethod
+    async def join(self, room_id: str, name: str) -> dict: ...
+
+    @abc.abstractmethod
+    async def leave(self, room_id: str, participant_id: str) -> bool: ...
+
+    @abc.abstractmethod
+    async def members(self, room_id: str) -> list[dict]: ...
+
+
+class LocalBackplane(Backplane):
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, event: dict) -> None:
+        pass  # no other workers to tell
+
+    async def join(self, room_id: str, name: str) -> dict:
+        return add_participant(room_id, name)
+
+    async def leave(self, room_id: str, participant_id: str) -> bool:
+        return remove_participant(room_id, participant_id)
+
+    async def members(self, room_id: str) -> list[dict]:
+        return get_participants(room_id)
+
+
+class BrokerBackplane(Backplane):
+    def __init__(self, path: str, call_timeout: float = BACKPLANE_CALL_TIMEOUT):
+        self.path = path
+        self.call_timeout = call_timeout
+        self.node_id = uuid.uuid4().hex
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._deliver: Deliver | None = None
+        self._lost: ConnectionError | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._lost = None
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._task = asyncio.create_task(self._read_loop())
+        # registered with the broker (and receiving events) once this returns
+        await self._call("hello", node=self.node_id)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
+        self._fail(ConnectionError("backplane stopped"))
+
+    def _fail(self, error: ConnectionError) -> None:
+        # every call waiting for a reply, and every later one, gets ``error``
+        self._lost = error
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(error)
+        self._pending.clear()
+
+    def _send(self, msg: dict) -> None:
+        if self._lost is not None:
+            raise self._lost
+        if self._writer is None:
+            raise ConnectionError("backplane not started")
+        self._writer.write(json.dumps(msg).encode() + b"\n")
+
+    async def _call(self, op: str, **kwargs):
+        rid = next(self._ids)
+        self._send({"op": op, "id": rid, **kwargs})
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[rid] = fut
+        try:
+            return await asyncio.wait_for(fut, self.call_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"backplane: no reply to {op} in {self.call_timeout:g}s") from None
+        finally:
+            self._pending.pop(rid, None)
+
+    async def _read_loop(self) -> None:
+        assert self._reader is not None
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                if msg.get("op") == "reply":
+                    fut = self._pending.pop(msg["id"], None)
+                    if fut is not None and not fut.done():
+                        fut.set_result(msg.get("result"))
+                elif msg.get("op") == "event" and self._deliver is not None:
+                    try:
+                        self._deliver(msg["event"])
+                    except Exception:
+                        logger.exception("backplane: delivering an event failed")
+        except (OSError, ValueError):
+            pass  # reset, or a garbled line: the connection is no good either way
+        finally:
+            self._fail(ConnectionError("backplane connection lost"))
+
+    async def publish(self, event: dict) -> None:
+        if self._lost is not None:
+            # fire-and-forget, like an event in flight when the broker went away
+            logger.warning("backplane: %s event not published (%s)", event.get("kind"), self._lost)
+            return
+        self._send({"op": "publish", "event": event})
+        await self._writer.drain()
+
+    async def join(self, room_id: str, name: str) -> dict:
+        return await self._call("join", room=room_id, name=name)
+
+    async def leave(self, room_id: str, participant_id: str) -> bool:
+        return await self._call("leave", room=room_id, pid=participant_id)
+
+    async def members(self, room_id: str) -> list[dict]:
+        return await self._call("members", room=room_id)
+
+
+def create_backplane(url: str | None) -> Backplane:
+    if not url or url.startswith("memory://"):
+        return LocalBackplane()
+    if url.startswith("unix://"):
+        return BrokerBackplane(url[len("unix://"):])
+    raise ValueError(f"unsupported BACKPLANE_URL: {url}")
+
+
+backplane = create_backplane(os.environ.get("BACKPLANE_URL"))
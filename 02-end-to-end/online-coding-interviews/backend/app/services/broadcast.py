@@ -0,0 +1,331 @@
+import asyncio
+import os
+import time
+from typing import Callable, Iterable
+from fastapi import WebSocket
+from .wire import Frame, dumps, encode, loads
+from .resume import RoomLog
+from .metrics import registry, METRICS_ENABLED
+
+SEND_QUEUE_SIZE = 256
+MAX_OVERFLOWS = 3
+CLOSE_TRY_AGAIN = 1013
+# State frames (code/task/language/output) sent within one window collapse to
+# the latest per kind; chat messages go out together. 0 sends immediately.
+COALESCE_MS = float(os.environ.get("WS_COALESCE_MS", "25"))
+# a send that takes longer counts as a failure; MAX_SEND_FAILURES in a row
+# (or any send error) marks the connection dead for the reaper
+SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "5"))
+MAX_SEND_FAILURES = int(os.environ.get("WS_MAX_SEND_FAILURES", "3"))
+
+BROADCAST_SECONDS = registry.histogram(
+    "ws_broadcast_seconds", "Time to fan a frame out to a room's send queues.")
+BROADCAST_RECIPIENTS = registry.histogram(
+    "ws_broadcast_recipients", "Sockets a broadcast was queued for.", buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+
+
+class Connection:
+    """One socket with a bounded outgoing queue drained by its own writer task.
+
+    Producers never await: ``offer`` enqueues an already-encoded JSON frame,
+    converted to the socket's wire ``encoding`` on the way in (``cache`` lets a
+    broadcast do that once per encoding rather than once per socket). A client
+    whose queue fills up is resynced (queue replaced by a state snapshot); one
+    that overflows ``MAX_OVERFLOWS`` times without catching up is dropped.
+
+    ``hold`` and ``append`` park frames until ``flush``; any frame offered
+    directly flushes them first, so a client never sees frames out of order.
+    """
+
+    __slots__ = ("ws", "queue", "task", "overflows", "resync", "closed", "features", "latest", "batch", "saved", "encoding", "pid",
+                 "last_seen", "failures")
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        resync: Callable[[], Iterable[str]] | None = None,
+        maxsize: int = SEND_QUEUE_SIZE,
+        encoding: str = "json",
+    ):
+        self.ws = ws
+        self.queue: asyncio.Queue[Frame | None] = asyncio.Queue(maxsize=maxsize)
+        self.task: asyncio.Task | None = None
+        self.overflows = 0
+        self.resync = resync
+        self.closed = False
+        self.features: set[str] = set()
+        self.latest: dict[str, str] = {}
+        self.batch: list[str] = []
+        self.saved = 0
+        self.encoding = encoding
+        self.pid: str | None = None  # participant, once joined
+        self.last_seen = time.monotonic()  # last frame received from the client
+        self.failures = 0
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._writer())
+
+    def offer(self, payload: str, cache: dict | None = None) -> bool:
+        if self.latest or self.batch:
+            self.flush(cache)
+        return self._put(payload, cache)
+
+    def hold(self, key: str, payload: str) -> bool:
+        if self.closed:
+            return False
+        if self.latest.pop(key, None) is not None:
+            self.saved += 1
+        self.latest[key] = payload
+        return True
+
+    def append(self, payload: str) -> bool:
+        if self.closed:
+            return False
+        self.batch.append(payload)
+        return True
+
+    def flush(self, cache: dict | None = None) -> int:
+        frames = list(self.latest.values())
+        self.latest.clear()
+        if len(self.batch) > 1 and "batch" in self.features:
+            frames.append(dumps({"type": "chat_batch", "messages": [loads(m) for m in self.batch]}))
+            self.saved += len(self.batch) - 1
+        else:
+            frames.extend(self.batch)
+        self.batch = []
+        for frame in frames:
+            self._put(frame, cache)
+        return len(frames)
+
+    def _encode(self, payload: str, cache: dict | None) -> Frame:
+        if self.encoding == "json":
+            return payload
+        if cache is None:
+            return encode(payload, self.encoding)
+        key = (self.encoding, payload)
+        frame = cache.get(key)
+        if frame is None:
+            frame = cache[key] = encode(payload, self.encoding)
+        return frame
+
+    def _put(self, payload: str, cache: dict | None = None) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(self._encode(payload, cache))
+            return True
+        except asyncio.QueueFull:
+            pass
+        self._drain()
+        self.overflows += 1
+        if self.resync is None or self.overflows > MAX_OVERFLOWS:
+            self.closed = True
+            self.queue.put_nowait(None)
+            return False
+        for frame in self.resync():
+            self.queue.put_nowait(self._encode(frame, None))
+        return False
+
+    def _drain(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def _writer(self) -> None:
+        while True:
+            payload = await self.queue.get()
+            if payload is None:
+                try:
+                    await self.ws.close(code=CLOSE_TRY_AGAIN)
+                except Exception:
+                    pass
+                return
+            try:
+                async with asyncio.timeout(SEND_TIMEOUT):
+                    await self._send(payload)
+            except asyncio.TimeoutError:
+                self.failures += 1
+                if self.failures >= MAX_SEND_FAILURES:
+                    self.closed = True
+                    return
+                if self.resync is not None:
+                    # the frame may be lost: replace the backlog with current state
+                    self._drain()
+                    for frame in self.resync():
+                        self.queue.put_nowait(self._encode(frame, None))
+                continue
+            except Exception:
+                self.failures += 1
+                self.closed = True
+                return
+            self.failures = 0
+            if self.queue.empty():
+                self.overflows = 0
+
+    async def _send(self, payload: Frame) -> None:
+        if isinstance(payload, bytes):
+            await self.ws.send_bytes(payload)
+        else:
+            await self.ws.send_text(payload)
+
+    async def stop(self) -> None:
+        self.closed = True
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+class RoomHub:
+    """Per-room connection registry; messages are JSON-encoded once per broadcast.
+
+    Broadcasts marked ``latest=<kind>`` or ``batched`` are parked on each
+    connection and flushed by one timer per room, ``window`` seconds after the
+    first of them.
+
+    Rooms with a ``RoomLog`` (see ``keep_log``) record every broadcast with a
+    sequence number; connections with the "resume" feature get frames with
+    ``seq`` and can have missed ones replayed.
+    """
+
+    def __init__(self, maxsize: int = SEND_QUEUE_SIZE, window: float = COALESCE_MS / 1000):
+        self.maxsize = maxsize
+        self.window = window
+        self.rooms: dict[str, dict[WebSocket, Connection]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._saved = 0  # by connections that have left
+        self.logs: dict[str, RoomLog] = {}
+
+    def join(
+        self,
+        room_id: str,
+        ws: WebSocket,
+        resync: Callable[[], Iterable[str]] | None = None,
+        encoding: str = "json",
+    ) -> Connection:
+        conn = Connection(ws, resync, self.maxsize, encoding)
+        self.rooms.setdefault(room_id, {})[ws] = conn
+        conn.start()
+        return conn
+
+    async def leave(self, room_id: str, ws: WebSocket) -> None:
+        conns = self.rooms.get(room_id)
+        if conns is None:
+            return
+        conn = conns.pop(ws, None)
+        if not conns:
+            del self.rooms[room_id]
+            timer = self._timers.pop(room_id, None)
+            if timer is not None:
+                timer.cancel()
+        if conn is not None:
+            self._saved += conn.saved
+            await conn.stop()
+
+    def connections(self, room_id: str) -> list[Connection]:
+        return list(self.rooms.get(room_id, {}).values())
+
+    def get(self, room_id: str, ws: WebSocket) -> Connection | None:
+        return self.rooms.get(room_id, {}).get(ws)
+
+    def broadcast(
+        self,
+        room_id: str,
+        message: dict,
+        exclude: WebSocket | None = None,
+        only: Callable[[Connection], bool] | None = None,
+        latest: str | None = None,
+        batched: bool = False,
+        replay: bool = True,
+    ) -> int:
+        return self.broadcast_raw(room_id, dumps(message), exclude, only, latest, batched, replay)
+
+    def broadcast_raw(
+        self,
+        room_id: str,
+        payload: str,
+        exclude: WebSocket | None = None,
+        only: Callable[[Connection], bool] | None = None,
+        latest: str | None = None,
+        batched: bool = False,
+        replay: bool = True,
+    ) -> int:
+        start = time.perf_counter() if METRICS_ENABLED else 0.0
+        deferred = self.window > 0 and (latest is not None or batched)
+        conns = self.rooms.get(room_id, {})
+        sequenced = payload
+        log = self.logs.get(room_id)
+        if log is not None:
+            sender = conns.get(exclude) if exclude is not None else None
+            sequenced = log.append(payload, sender and sender.pid, only, latest, keep=replay).payload
+        cache: dict = {}
+        sent = 0
+        for ws, conn in list(conns.items()):
+            if ws is exclude or (only is not None and not only(conn)):
+                continue
+            frame = sequenced if "resume" in conn.features else payload
+            if not deferred:
+                ok = conn.offer(frame, cache)
+            elif latest is not None:
+                ok = conn.hold(latest, frame)
+            else:
+                ok = conn.append(frame)
+            if ok:
+                sent += 1
+        if deferred and sent and room_id not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[room_id] = loop.call_later(self.window, self.flush, room_id)
+        if METRICS_ENABLED:
+            BROADCAST_SECONDS.observe(time.perf_counter() - start)
+            BROADCAST_RECIPIENTS.observe(sent)
+        return sent
+
+    def keep_log(self, room_id: str) -> RoomLog:
+        return self.logs.setdefault(room_id, RoomLog())
+
+    def drop_log(self, room_id: str) -> None:
+        self.logs.pop(room_id, None)
+
+    def replay(self, room_id: str, ws: WebSocket, since: int) -> int | None:
+        """Send ``ws`` the logged frames after ``since`` that it would have
+        received, newest state per ``latest`` kind only. None if the log no
+        longer reaches back that far."""
+        conn = self.get(room_id, ws)
+        log = self.logs.get(room_id)
+        if conn is None or log is None:
+            return None
+        entries = log.since(since)
+        if entries is None:
+            return None
+        frames: list[str] = []
+        superseded: set[str] = set()
+        for e in reversed(entries):
+            if e.latest is not None:
+                if e.latest in superseded:
+                    continue
+                superseded.add(e.latest)
+            if (e.exclude is not None and e.exclude == conn.pid) or (e.only is not None and not e.only(conn)):
+                continue
+            frames.append(e.payload)
+        for frame in reversed(frames):
+            conn.offer(frame)
+        return len(frames)
+
+    def flush(self, room_id: str) -> int:
+        self._timers.pop(room_id, None)
+        cache: dict = {}
+        return sum(conn.flush(cache) for conn in list(self.rooms.get(room_id, {}).values()))
+
+    def stats(self) -> dict:
+        conns = [c for room in self.rooms.values() for c in room.values()]
+        return {
+            "rooms": len(self.rooms),
+            "connections": len(conns),
+            "windowMs": self.window * 1000,
+            "framesSaved": self._saved + sum(c.saved for c in conns),
+        }
+
+    def send(self, room_id: str, ws: WebSocket, message: dict) -> bool:
+        conn = self.rooms.get(room_id, {}).get(ws)
+        return conn.offer(dumps(message)) if conn is not None else False
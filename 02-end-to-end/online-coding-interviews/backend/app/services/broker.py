@@ -0,0 +1,104 @@
+"""Minimal cross-process broker for ``BrokerBackplane``.
+
+Newline-delimited JSON over a Unix socket. Published events are relayed to
+every other connected node; presence (the participant roster) lives here so all
+workers agree on it, and a node's participants are dropped if it disconnects.
+
+Run: python -m app.services.broker /tmp/codeinterview.sock
+"""
+import asyncio
+import json
+import os
+import sys
+from .presence import Presence
+
+
+class Broker:
+    def __init__(self):
+        self.nodes: dict[asyncio.StreamWriter, str] = {}
+        self.presence = Presence()
+        self.owners: dict[tuple[str, str], asyncio.StreamWriter] = {}
+        self.server: asyncio.AbstractServer | None = None
+
+    async def start(self, path: str) -> None:
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = await asyncio.start_unix_server(self._handle, path=path)
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for writer in list(self.nodes):
+            writer.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    continue
+                self._dispatch(writer, msg)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.nodes.pop(writer, None)
+            self._drop_node(writer)
+            writer.close()
+
+    def _dispatch(self, writer: asyncio.StreamWriter, msg: dict) -> None:
+        op = msg.get("op")
+        if op == "hello":
+            self.nodes[writer] = msg.get("node", "")
+            self._reply(writer, msg, True)
+        elif op == "publish":
+            self._relay(writer, msg.get("event"))
+        elif op == "join":
+            self._reply(writer, msg, self._join(writer, msg["room"], msg.get("name") or ""))
+        elif op == "leave":
+            self._reply(writer, msg, self._leave(msg["room"], msg["pid"]))
+        elif op == "members":
+            self._reply(writer, msg, self.presence.members(msg["room"]))
+
+    def _relay(self, origin: asyncio.StreamWriter, event) -> None:
+        data = json.dumps({"op": "event", "event": event}).encode() + b"\n"
+        for writer in list(self.nodes):
+            if writer is not origin:
+                writer.write(data)
+
+    def _reply(self, writer: asyncio.StreamWriter, msg: dict, result) -> None:
+        writer.write(json.dumps({"op": "reply", "id": msg.get("id"), "result": result}).encode() + b"\n")
+
+    def _join(self, writer: asyncio.StreamWriter, room_id: str, name: str) -> dict:
+        p = self.presence.join(room_id, name)
+        self.owners[(room_id, p.id)] = writer
+        return p.to_dict()
+
+    def _leave(self, room_id: str, participant_id: str) -> bool:
+        self.owners.pop((room_id, participant_id), None)
+        return self.presence.leave(room_id, participant_id) is not None
+
+    def _drop_node(self, writer: asyncio.StreamWriter) -> None:
+        gone = [key for key, owner in self.owners.items() if owner is writer]
+        rooms = {room_id for room_id, _ in gone}
+        for room_id, pid in gone:
+            self._leave(room_id, pid)
+        for room_id in rooms:
+            members = self.presence.members(room_id)
+            self._relay(writer, {"kind": "roster", "room": room_id, "participants": members})
+
+
+async def _main(path: str) -> None:
+    broker = Broker()
+    await broker.start(path)
+    print(f"broker listening on {path}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "/tmp/codeinterview.sock"))
@@ -0,0 +1,66 @@
+from collections import deque
+from . import ot
+
+LOG_SIZE = 200
+
+
+class StaleRevision(Exception):
+    pass
+
+
+class CodeLog:
+    __slots__ = ("rev", "ops")
+
+    def __init__(self, size: int):
+        self.rev = 0
+        self.ops: deque[ot.Ops] = deque(maxlen=size)
+
+
+class CodeSync:
+    """Per-room revision log for delta (``code_ops``) editing.
+
+    Revision ``rev`` is the number of changes applied since the log was created
+    or last reset; the log keeps the most recent ``log_size`` operations so a
+    client edit based on an older revision can be transformed forward. Edits
+    based on revisions that have already fallen out of the log raise
+    ``StaleRevision`` and the client is sent a snapshot instead.
+    """
+
+    def __init__(self, log_size: int = LOG_SIZE):
+        self.log_size = log_size
+        self.logs: dict[str, CodeLog] = {}
+
+    def _log(self, room_id: str) -> CodeLog:
+        log = self.logs.get(room_id)
+        if log is None:
+            log = self.logs[room_id] = CodeLog(self.log_size)
+        return log
+
+    def revision(self, room_id: str) -> int:
+        return self._log(room_id).rev
+
+    def reset(self, room_id: str) -> int:
+        # full-document replacement: history can no longer be transformed across
+        log = self._log(room_id)
+        log.ops.clear()
+        log.rev += 1
+        return log.rev
+
+    def submit(self, room_id: str, doc: str, base_rev: int, ops) -> tuple[int, ot.Ops, str]:
+        log = self._log(room_id)
+        ops = ot.normalize(ops)
+        behind = log.rev - base_rev
+        if behind < 0 or behind > len(log.ops):
+            raise StaleRevision(room_id)
+        for concurrent in list(log.ops)[len(log.ops) - behind:]:
+            ops, _ = ot.transform(ops, concurrent)
+        new_doc = ot.apply(doc, ops)
+        log.ops.append(ops)
+        log.rev += 1
+        return log.rev, ops, new_doc
+
+    def drop(self, room_id: str) -> None:
+        self.logs.pop(room_id, None)
+
+
+code_sync = CodeSync()
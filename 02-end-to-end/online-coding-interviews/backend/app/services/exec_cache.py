@@ -0,0 +1,121 @@
+"""Content-addressed cache of execution results.
+
+Keyed by a hash of (language, code, stdin). Only outcomes that depend on the
+input alone are stored: runs cut short by a limit, a cancel or a crash are not,
+and neither is code that imports clock, randomness or process modules, reads
+the environment, the filesystem or object identities, or imports dynamically
+(see ``deterministic``); that is a list of known sources, not a proof.
+Eviction is LRU, bounded by the approximate size of the stored output.
+"""
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+EXEC_CACHE_BYTES = int(os.environ.get("EXEC_CACHE_BYTES", str(16 * 1024 * 1024)))
+ENTRY_OVERHEAD = 200
+
+_NONDETERMINISTIC_MODULES = frozenset({
+    "random", "time", "datetime", "uuid", "secrets", "os", "tempfile", "glob", "shutil", "pathlib",
+    "threading", "multiprocessing", "concurrent", "asyncio", "subprocess", "socket", "signal",
+    "resource", "importlib", "ctypes", "gc", "platform",
+})
+# builtins whose result depends on more than the code and stdin
+# (hash() is not one: every worker runs with the same PYTHONHASHSEED)
+_NONDETERMINISTIC_CALLS = frozenset({"__import__", "eval", "exec", "compile", "open", "id", "globals", "vars"})
+# reached without importing a listed module, e.g. sys.modules["os"].urandom
+_NONDETERMINISTIC_ATTRS = frozenset({"urandom", "getrandom", "getpid", "getppid", "environ", "getenv", "modules"})
+_TRANSIENT_ERRORS = ("Time limit exceeded", "Output limit exceeded", "CPU time limit exceeded",
+                     "Cancelled", "Execution worker crashed", "Execution failed", "Killed by signal")
+
+
+def cache_key(language: str, code: str, stdin: str) -> str:
+    h = hashlib.sha256()
+    for part in (language, code, stdin):
+        data = part.encode()
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def _listed_module(name: str) -> bool:
+    return name.split(".")[0] in _NONDETERMINISTIC_MODULES
+
+
+def deterministic(code: str) -> bool:
+    """False if ``code`` touches a known source of nondeterminism."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return True  # it fails the same way every time
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(_listed_module(alias.name) for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if node.level == 0 and _listed_module(node.module):
+                return False
+        elif isinstance(node, ast.Name) and node.id in _NONDETERMINISTIC_CALLS:
+            return False
+        elif isinstance(node, ast.Attribute) and node.attr in _NONDETERMINISTIC_ATTRS:
+            return False
+    return True
+
+
+def cacheable(code: str, result: dict) -> bool:
+    if not deterministic(code):
+        return False
+    error = result.get("error") or ""
+    return not any(reason in error for reason in _TRANSIENT_ERRORS)
+
+
+def _size(result: dict) -> int:
+    return len(result["output"]) + len(result.get("error") or "") + ENTRY_OVERHEAD
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = EXEC_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: dict) -> None:
+        size = _size(result)
+        # one huge output shouldn't wipe everything else
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= _size(old)
+            self._entries[key] = result
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= _size(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+result_cache = ResultCache()
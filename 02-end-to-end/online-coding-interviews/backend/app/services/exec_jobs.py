@@ -0,0 +1,205 @@
+"""Execution jobs: runs submitted with an id and streamed to the room.
+
+``submit`` returns immediately; the run happens on a dedicated thread pool (not
+the one FastAPI uses for sync endpoints) that waits on an ``ExecutorPool``
+worker, so long-running candidate code can't starve the API. Output is pushed
+to the room as it is produced through the ``emit`` callback given to ``start``:
+
+    {"type": "job", "jobId", "status": "queued" | "running", "language"}
+    {"type": "output_chunk", "jobId", "stream": "stdout" | "stderr", "data"}
+    {"type": "output", "jobId", "status": "completed" | "cancelled", "output", "error", "executionTime", "cached"}
+
+A run whose result is already in the cache completes at once and skips the
+per-room limit. Jobs belong to the worker process that accepted them.
+"""
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+from .exec_service import ExecutorPool, ExecutorBusy, exec_pool, execute_code, SUPPORTED
+from .exec_cache import ResultCache, result_cache, cache_key, cacheable
+
+EXEC_ROOM_JOBS = int(os.environ.get("EXEC_ROOM_JOBS", "2"))
+JOB_HISTORY = 256
+
+Emit = Callable[[str, dict], Awaitable[None]]
+
+
+class RoomBusy(Exception):
+    pass
+
+
+class Job:
+    __slots__ = ("id", "room_id", "language", "status", "result", "cancel", "done")
+
+    def __init__(self, room_id: str, language: str):
+        self.id = uuid.uuid4().hex
+        self.room_id = room_id
+        self.language = language
+        self.status = "queued"
+        self.result: dict | None = None
+        self.cancel = threading.Event()
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def to_dict(self) -> dict:
+        d = {"id": self.id, "roomId": self.room_id, "language": self.language, "status": self.status}
+        if self.result is not None:
+            d.update(self.result)
+        return d
+
+
+class ExecJobs:
+    def __init__(
+        self,
+        pool: ExecutorPool = exec_pool,
+        per_room: int = EXEC_ROOM_JOBS,
+        history: int = JOB_HISTORY,
+        cache: ResultCache | None = result_cache,
+    ):
+        self.pool = pool
+        self.cache = cache
+        self.per_room = per_room
+        self.history = history
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.active: dict[str, set[str]] = {}
+        self._emit: Emit | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    def start(self, emit: Emit | None) -> None:
+        self._emit = emit
+
+    def stop(self) -> None:
+        for ids in self.active.values():
+            for job_id in ids:
+                self.jobs[job_id].cancel.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def submit(self, room_id: str, code: str, language: str, stdin: str = "", use_cache: bool = True) -> Job:
+        """Queue a run; raises RoomBusy past the per-room limit and
+        ExecutorBusy when the execution queue is full. Call on the event loop."""
+        key = None
+        if use_cache and self.cache is not None and language == "python" and SUPPORTED:
+            key = cache_key(language, code, stdin)
+            hit = self.cache.get(key)
+            if hit is not None:
+                job = Job(room_id, language)
+                self.jobs[job.id] = job
+                self._complete(job, {**hit, "cached": True})
+                asyncio.create_task(self._announce(job))
+                return job
+        running = self.active.get(room_id, ())
+        if len(running) >= self.per_room:
+            raise RoomBusy(f"room already has {len(running)} running jobs")
+        if sum(len(ids) for ids in self.active.values()) >= self.pool.size + self.pool.max_queue:
+            raise ExecutorBusy("execution queue is full")
+        job = Job(room_id, language)
+        self.jobs[job.id] = job
+        self.active.setdefault(room_id, set()).add(job.id)
+        asyncio.create_task(self._run(job, code, stdin, key))
+        return job
+
+    def get(self, room_id: str, job_id: str) -> Job | None:
+        job = self.jobs.get(job_id)
+        return job if job is not None and job.room_id == room_id else None
+
+    def cancel(self, room_id: str, job_id: str) -> Job | None:
+        job = self.get(room_id, job_id)
+        if job is not None:
+            job.cancel.set()
+        return job
+
+    async def _run(self, job: Job, code: str, stdin: str, key: str | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def on_output(stream: str, text: str) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, (stream, text))
+
+        def on_start() -> None:
+            loop.call_soon_threadsafe(events.put_nowait, ("running", None))
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool.size + self.pool.max_queue, thread_name_prefix="exec-job"
+            )
+        await self._send(job, {"type": "job", "jobId": job.id, "status": "queued", "language": job.language})
+        fut = loop.run_in_executor(self._executor, self._execute, job, code, stdin, on_output, on_start)
+        fut.add_done_callback(lambda _: events.put_nowait((None, None)))
+        try:
+            finished = False
+            while not finished:
+                batch = [await events.get()]
+                while not events.empty():
+                    batch.append(events.get_nowait())
+                for kind, text in _coalesce(batch):
+                    if kind is None:
+                        finished = True
+                    elif kind == "running":
+                        job.status = "running"
+                        await self._send(job, {"type": "job", "jobId": job.id, "status": "running", "language": job.language})
+                    else:
+                        await self._send(job, {"type": "output_chunk", "jobId": job.id, "stream": kind, "data": text})
+            try:
+                result = fut.result()
+            except Exception as e:
+                result = {"output": "", "error": f"Execution failed: {e}", "executionTime": 0}
+        finally:
+            ids = self.active.get(job.room_id)
+            if ids is not None:
+                ids.discard(job.id)
+                if not ids:
+                    del self.active[job.room_id]
+        if key is not None and cacheable(code, result):
+            self.cache.put(key, result)
+        self._complete(job, result)
+        await self._announce(job)
+
+    def _complete(self, job: Job, result: dict) -> None:
+        job.status = "cancelled" if job.cancel.is_set() and result["error"] == "Cancelled" else "completed"
+        job.result = result
+        if not job.done.done():
+            job.done.set_result(result)
+        self._trim()
+
+    async def _announce(self, job: Job) -> None:
+        await self._send(job, {"type": "output", "jobId": job.id, "status": job.status, "cached": False, **job.result})
+
+    def _execute(self, job: Job, code: str, stdin: str, on_output, on_start) -> dict:
+        if job.language == "python" and SUPPORTED:
+            return self.pool.run(code, stdin, on_output=on_output, cancel=job.cancel, on_start=on_start)
+        on_start()
+        return execute_code(code, job.language, stdin)
+
+    async def _send(self, job: Job, message: dict) -> None:
+        if self._emit is None:
+            return
+        try:
+            await self._emit(job.room_id, message)
+        except Exception:
+            pass  # a room with no listeners must not fail the run
+
+    def _trim(self) -> None:
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.history:
+                break
+            if self.jobs[job_id].result is not None:
+                del self.jobs[job_id]
+
+
+def _coalesce(batch: list[tuple]) -> list[tuple]:
+    # merge consecutive chunks of the same stream into one frame
+    out: list[tuple] = []
+    for kind, text in batch:
+        if out and kind in ("stdout", "stderr") and out[-1][0] == kind:
+            out[-1] = (kind, out[-1][1] + text)
+        else:
+            out.append((kind, text))
+    return out
+
+
+exec_jobs = ExecJobs()
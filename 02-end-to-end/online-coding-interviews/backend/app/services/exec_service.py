@@ -1,6 +1,405 @@
+"""Server-side Python execution on a pool of warm worker processes.
+
+Each worker is a single-threaded "zygote" started once with the interpreter
+already loaded. For every job it forks a fresh child that starts its own
+session, applies rlimits (CPU time, address space, file size, processes),
+drops the server's environment, runs the candidate code with stdin/stdout/
+stderr on pipes and exits; the worker enforces the wall-clock limit and the
+output cap, kills the child's process group when the run ends and reports the
+real execution time. Forking a warm interpreter is
+much cheaper than starting ``python`` per run, and nothing leaks between runs.
+
+A run can stream its stdout/stderr back as it is produced and be cancelled
+mid-flight: the worker watches its control pipe alongside the child's output.
+
+rlimits bound resource usage; they are not a security boundary on their own.
+Run the server in a container or under a dedicated user for untrusted code.
+"""
+import codecs
+import multiprocessing
+import os
+import queue
+import select
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
 from datetime import datetime
 
-def execute_code(code: str, language: str) -> dict:
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+EXEC_WORKERS = int(os.environ.get("EXEC_WORKERS", "2"))
+EXEC_QUEUE_SIZE = int(os.environ.get("EXEC_QUEUE_SIZE", "16"))
+EXEC_TIMEOUT = float(os.environ.get("EXEC_TIMEOUT", "5"))
+EXEC_CPU_SECONDS = int(os.environ.get("EXEC_CPU_SECONDS", "5"))
+EXEC_MEMORY_MB = int(os.environ.get("EXEC_MEMORY_MB", "256"))
+EXEC_OUTPUT_LIMIT = int(os.environ.get("EXEC_OUTPUT_LIMIT", str(64 * 1024)))
+# RLIMIT_NPROC counts every process of the user, not just this run's; run the
+# server as a dedicated user so the limit means what it says
+EXEC_MAX_PROCESSES = int(os.environ.get("EXEC_MAX_PROCESSES", "64"))
+# every worker gets the same string hashing, so set iteration order (and
+# hash()) is the same whichever worker runs the code, and results can be cached
+EXEC_HASH_SEED = os.environ.get("EXEC_HASH_SEED", "0")
+STDIN_LIMIT = 64 * 1024
+CANCEL_POLL = 0.05
+EXIT_POLL = 0.01  # where there are no pidfds (not Linux)
+
+SUPPORTED = hasattr(os, "fork") and resource is not None
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+def _limits(timeout: float, cpu_seconds: int, memory_mb: int, output_limit: int, processes: int) -> dict:
+    return {"timeout": timeout, "cpu": cpu_seconds, "memory": memory_mb, "output": output_limit, "processes": processes}
+
+
+def _child_env(cwd: str) -> dict:
+    # none of the server's environment (database URL, secrets) reaches the run
+    return {"PATH": "/usr/local/bin:/usr/bin:/bin", "HOME": cwd, "LANG": "C.UTF-8", "PYTHONIOENCODING": "utf-8"}
+
+
+def _child(job: dict, stdin_r: int, out_w: int, err_w: int) -> None:
+    status = 1
+    try:
+        os.setsid()  # its own process group, so the worker can kill whatever it forks
+        os.dup2(stdin_r, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        for fd in (stdin_r, out_w, err_w):
+            os.close(fd)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+        limits = job["limits"]
+        resource.setrlimit(resource.RLIMIT_CPU, (limits["cpu"], limits["cpu"] + 1))
+        mem = limits["memory"] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (mem, mem))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (1024 * 1024, 1024 * 1024))
+        resource.setrlimit(resource.RLIMIT_NPROC, (limits["processes"], limits["processes"]))
+        os.chdir(job["cwd"])
+        os.environ.clear()
+        os.environ.update(_child_env(job["cwd"]))
+        exec(compile(job["code"], "<solution>", "exec"), {"__name__": "__main__"})
+        status = 0
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if not isinstance(e.code, int) and e.code is not None:
+            print(e.code, file=sys.stderr)
+    except BaseException as e:
+        # drop this module's frame so the traceback starts at <solution>
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status)
+
+
+def _pidfd(pid: int) -> int | None:
+    """A descriptor that becomes readable when ``pid`` exits (Linux 5.3+)."""
+    try:
+        return os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return None
+
+
+def _kill_group(pid: int) -> None:
+    """SIGKILL the child's process group: the child and whatever it forked."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _run_job(job: dict, emit=None, control=None) -> dict:
+    """Run one job in a forked child. ``emit(stream, text)`` receives output as
+    it arrives; ``control`` is a connection polled for a "cancel" message."""
+    limits = job["limits"]
+    stdin_r, stdin_w = os.pipe()
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(stdin_w)
+        os.close(out_r)
+        os.close(err_r)
+        if control is not None:
+            os.close(control.fileno())  # candidate code must not talk to the server
+        _child(job, stdin_r, out_w, err_w)
+    for fd in (stdin_r, out_w, err_w):
+        os.close(fd)
+    try:
+        os.write(stdin_w, job["stdin"].encode()[:STDIN_LIMIT])
+    except OSError:
+        pass
+    os.close(stdin_w)
+
+    exited = _pidfd(pid)
+    bufs = {out_r: bytearray(), err_r: bytearray()}
+    names = {out_r: "stdout", err_r: "stderr"}
+    decoders = {fd: codecs.getincrementaldecoder("utf-8")("replace") for fd in bufs}
+    open_fds = [out_r, err_r]
+    extra = [control] if control is not None else []
+    deadline = start + limits["timeout"]
+    reason = None
+    status = None
+    # until the child has exited and its output is drained; it may close
+    # stdout/stderr and keep running, so EOF alone does not end the run
+    while open_fds or status is None:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            reason = f"Time limit exceeded ({limits['timeout']:g}s)"
+            break
+        watch = open_fds + extra
+        if status is not None:
+            wait = remaining
+        elif exited is not None:
+            watch.append(exited)  # readable once the child exits
+            wait = remaining
+        else:
+            wait = min(remaining, EXIT_POLL)
+        ready, _, _ = select.select(watch, [], [], wait)
+        if control is not None and control in ready:
+            msg = control.recv()
+            if msg is None:
+                job["stop"] = True  # pool shutting down: don't leave the child behind
+            if msg is None or msg == "cancel":
+                reason = "Cancelled"
+                break
+            continue
+        if status is None and (exited is None or exited in ready):
+            reaped, st = os.waitpid(pid, os.WNOHANG)
+            if reaped:
+                status = st
+                _kill_group(pid)  # anything it left running would hold the pipes open
+        for fd in ready:
+            if fd not in bufs:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                open_fds.remove(fd)
+                continue
+            budget = limits["output"] - len(bufs[out_r]) - len(bufs[err_r])
+            if emit is not None and budget > 0:
+                text = decoders[fd].decode(chunk[:budget])
+                if text:
+                    emit(names[fd], text)
+            bufs[fd] += chunk
+        if len(bufs[out_r]) + len(bufs[err_r]) > limits["output"]:
+            reason = f"Output limit exceeded ({limits['output']} bytes)"
+            break
+    _kill_group(pid)
+    if status is None:
+        try:
+            os.kill(pid, signal.SIGKILL)  # in case it had not called setsid() yet
+        except ProcessLookupError:
+            pass
+        _, status = os.waitpid(pid, 0)
+    if exited is not None:
+        os.close(exited)
+    elapsed = time.perf_counter() - start
+    os.close(out_r)
+    os.close(err_r)
+
+    if reason is None and os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        reason = "CPU time limit exceeded" if sig in (signal.SIGXCPU, signal.SIGKILL) else f"Killed by signal {sig}"
+    output = bytes(bufs[out_r][:limits["output"]]).decode("utf-8", "replace")
+    stderr = bytes(bufs[err_r][:limits["output"]]).decode("utf-8", "replace")
+    if reason:
+        error = f"{stderr.rstrip()}\n{reason}" if stderr else reason
+    else:
+        error = (stderr or f"Exited with status {os.WEXITSTATUS(status)}") if status != 0 else None
+    return {"output": output, "error": error, "executionTime": int(elapsed * 1000)}
+
+
+def _worker_main(conn) -> None:
+    # messages in: job dict, "cancel" (for the running job) or None (stop);
+    # messages out: ("chunk", stream, text) while streaming, then ("done", result)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def emit(stream: str, text: str) -> None:
+        conn.send(("chunk", stream, text))
+
+    with tempfile.TemporaryDirectory(prefix="exec-") as cwd:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                return
+            if job is None:
+                return
+            if job == "cancel":
+                continue  # arrived after its job had already finished
+            job["cwd"] = cwd
+            try:
+                result = _run_job(job, emit if job.get("stream") else None, conn)
+            except Exception as e:
+                result = {"output": "", "error": f"Execution failed: {e}", "executionTime": 0}
+            try:
+                conn.send(("done", result))
+            except OSError:
+                return
+            if job.get("stop"):
+                return
+
+
+_spawn_lock = threading.Lock()
+
+
+class _Worker:
+    __slots__ = ("process", "conn")
+
+    def __init__(self, ctx):
+        parent, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True, name="exec-worker")
+        # a spawned interpreter takes its environment from ours, and the hash
+        # seed cannot be set once it is running
+        with _spawn_lock:
+            previous = os.environ.get("PYTHONHASHSEED")
+            os.environ["PYTHONHASHSEED"] = EXEC_HASH_SEED
+            try:
+                self.process.start()
+            finally:
+                if previous is None:
+                    del os.environ["PYTHONHASHSEED"]
+                else:
+                    os.environ["PYTHONHASHSEED"] = previous
+        child.close()
+        self.conn = parent
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ExecutorPool:
+    """Fixed set of warm workers; at most ``size + max_queue`` runs are admitted,
+    the rest are rejected with ``ExecutorBusy`` instead of piling up."""
+
+    def __init__(
+        self,
+        size: int = EXEC_WORKERS,
+        max_queue: int = EXEC_QUEUE_SIZE,
+        timeout: float = EXEC_TIMEOUT,
+        cpu_seconds: int = EXEC_CPU_SECONDS,
+        memory_mb: int = EXEC_MEMORY_MB,
+        output_limit: int = EXEC_OUTPUT_LIMIT,
+        max_processes: int = EXEC_MAX_PROCESSES,
+    ):
+        self.size = size
+        self.max_queue = max_queue
+        self.limits = _limits(timeout, cpu_seconds, memory_mb, output_limit, max_processes)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._workers: list[_Worker] = []
+        self._slots = threading.BoundedSemaphore(size + max_queue)
+        self._lock = threading.Lock()
+        self._admitted = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            for _ in range(self.size):
+                w = _Worker(self._ctx)
+                self._workers.append(w)
+                self._idle.put(w)
+
+    def stop(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._idle = queue.Queue()
+        for w in workers:
+            w.stop()
+
+    def stats(self) -> dict:
+        workers = len(self._workers)
+        busy = workers - self._idle.qsize()
+        return {"workers": workers, "busy": busy, "queued": max(0, self._admitted - busy)}
+
+    def run(self, code: str, stdin: str = "", on_output=None, cancel: threading.Event | None = None, on_start=None) -> dict:
+        """Run ``code`` on an idle worker. ``on_output(stream, text)`` is called
+        from this thread as output arrives; setting ``cancel`` stops the run,
+        whether it is still queued or already executing."""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorBusy("execution queue is full")
+        with self._lock:
+            self._admitted += 1
+        try:
+            self.start()
+            worker = self._take(cancel)
+            if worker is None:
+                return {"output": "", "error": "Cancelled", "executionTime": 0}
+            if on_start is not None:
+                on_start()
+            try:
+                worker.conn.send({"code": code, "stdin": stdin, "limits": self.limits, "stream": on_output is not None})
+                cancelled = False
+                while True:
+                    if cancel is not None and not cancelled and cancel.is_set():
+                        worker.conn.send("cancel")
+                        cancelled = True
+                    if not worker.conn.poll(None if cancel is None else CANCEL_POLL):
+                        continue
+                    msg = worker.conn.recv()
+                    if msg[0] == "done":
+                        return msg[1]
+                    if on_output is not None:
+                        try:
+                            on_output(msg[1], msg[2])
+                        except Exception:
+                            pass  # keep draining so the worker stays in sync
+            except (EOFError, OSError):
+                worker = self._replace(worker)
+                return {"output": "", "error": "Execution worker crashed", "executionTime": 0}
+            finally:
+                self._idle.put(worker)
+        finally:
+            with self._lock:
+                self._admitted -= 1
+            self._slots.release()
+
+    def _take(self, cancel: threading.Event | None) -> _Worker | None:
+        if cancel is None:
+            return self._idle.get()
+        while not cancel.is_set():
+            try:
+                return self._idle.get(timeout=CANCEL_POLL)
+            except queue.Empty:
+                pass
+        return None
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.stop()
+        fresh = _Worker(self._ctx)
+        with self._lock:
+            self._workers = [fresh if w is worker else w for w in self._workers]
+        return fresh
+
+
+exec_pool = ExecutorPool()
+
+
+def execute_code(code: str, language: str, stdin: str = "") -> dict:
+    # uncached: room runs go through ExecJobs, which owns the result cache
+    if language == "python" and SUPPORTED:
+        return exec_pool.run(code, stdin)
     start = datetime.now()
     dur = (datetime.now() - start).total_seconds()
     return {
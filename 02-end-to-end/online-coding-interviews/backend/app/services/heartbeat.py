@@ -0,0 +1,115 @@
+"""Liveness for room sockets.
+
+Every ``WS_PING_INTERVAL`` seconds the reaper pings connections it has not
+heard from in that time (``{"type": "ping"}``; clients answer ``pong``, any
+other frame counts too) and removes dead ones from their room, so broadcasts
+stop paying for them:
+
+- connections whose writer gave up (send error, ``WS_MAX_SEND_FAILURES``
+  send timeouts in a row, or a send queue that never caught up);
+- clients that joined with ``"features": ["heartbeat"]`` and sent nothing for
+  ``WS_PONG_TIMEOUT`` seconds. Other clients may ignore pings, so silence
+  alone does not reap them.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable
+from fastapi import WebSocket
+from .broadcast import RoomHub, Connection
+from .wire import dumps
+
+WS_PING_INTERVAL = float(os.environ.get("WS_PING_INTERVAL", "20"))
+WS_PONG_TIMEOUT = float(os.environ.get("WS_PONG_TIMEOUT", "60"))
+PING = dumps({"type": "ping"})
+
+logger = logging.getLogger(__name__)
+
+OnDead = Callable[[str, WebSocket], Awaitable[None]]
+
+
+class Heartbeat:
+    def __init__(
+        self,
+        hub: RoomHub,
+        interval: float = WS_PING_INTERVAL,
+        timeout: float = WS_PONG_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.hub = hub
+        self.interval = interval
+        self.timeout = timeout
+        self.clock = clock
+        self.reaped: dict[str, int] = {}  # per room, while the room has sockets
+        self.reaped_total = 0
+        self.pings = 0
+        self._on_dead: OnDead | None = None
+        self._task: asyncio.Task | None = None
+
+    def dead(self, conn: Connection, now: float) -> bool:
+        return conn.closed or ("heartbeat" in conn.features and now - conn.last_seen > self.timeout)
+
+    def stale(self, conn: Connection, now: float) -> bool:
+        return conn.failures > 0 or now - conn.last_seen > self.interval
+
+    async def sweep(self) -> int:
+        """Ping idle connections and reap dead ones; returns how many were reaped."""
+        now = self.clock()
+        n = 0
+        for room_id, conns in list(self.hub.rooms.items()):
+            for ws, conn in list(conns.items()):
+                if self.dead(conn, now):
+                    self.reaped[room_id] = self.reaped.get(room_id, 0) + 1
+                    self.reaped_total += 1
+                    n += 1
+                    if self._on_dead is not None:
+                        await self._on_dead(room_id, ws)
+                elif now - conn.last_seen >= self.interval:
+                    conn.offer(PING)
+                    self.pings += 1
+        for room_id in [r for r in self.reaped if r not in self.hub.rooms]:
+            del self.reaped[room_id]
+        return n
+
+    def stats(self) -> dict:
+        now = self.clock()
+        rooms = {}
+        for room_id, conns in self.hub.rooms.items():
+            stale = sum(1 for c in conns.values() if not self.dead(c, now) and self.stale(c, now))
+            dead = sum(1 for c in conns.values() if self.dead(c, now))
+            rooms[room_id] = {
+                "live": len(conns) - stale - dead,
+                "stale": stale,
+                "dead": dead,
+                "reaped": self.reaped.get(room_id, 0),
+            }
+        return {
+            "connections": sum(len(c) for c in self.hub.rooms.values()),
+            "stale": sum(r["stale"] for r in rooms.values()),
+            "reaped": self.reaped_total,
+            "pings": self.pings,
+            "rooms": rooms,
+        }
+
+    def start(self, on_dead: OnDead) -> None:
+        self._on_dead = on_dead
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("heartbeat sweep failed")
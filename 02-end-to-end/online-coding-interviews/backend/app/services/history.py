@@ -0,0 +1,145 @@
+"""Per-room code revision history.
+
+Every persisted code change appends one revision. Every ``SNAPSHOT_EVERY``
+revisions the full text is stored; in between only a delta from the previous
+revision (ot-style ops from a common prefix/suffix diff, JSON, zlib). Reading
+revision N loads the nearest snapshot at or before N and replays at most
+``SNAPSHOT_EVERY - 1`` deltas, so random access stays cheap however long the
+history gets.
+"""
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..db.session import SessionLocal
+from ..models.database import CodeRevisionModel
+from . import ot
+
+SNAPSHOT_EVERY = int(os.environ.get("HISTORY_SNAPSHOT_EVERY", "50"))
+BATCH_SIZE = 200
+
+
+def diff(old: str, new: str) -> ot.Ops:
+    # edits are local: one replaced span between a common prefix and suffix
+    n = min(len(old), len(new))
+    start = 0
+    while start < n and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < n - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+    return ot.normalize([start, -(len(old) - start - end), new[start:len(new) - end], end])
+
+
+def _encode(snapshot: bool, code: str, ops: ot.Ops | None) -> bytes:
+    raw = code if snapshot else json.dumps(ops, separators=(",", ":"))
+    return zlib.compress(raw.encode(), 6)
+
+
+def _decode(row: CodeRevisionModel):
+    raw = zlib.decompress(row.data).decode()
+    return raw if row.snapshot else json.loads(raw)
+
+
+def _last(db: Session, room_id: str, snapshot_only: bool = False, at_most: int | None = None) -> CodeRevisionModel | None:
+    q = select(CodeRevisionModel).where(CodeRevisionModel.roomId == room_id)
+    if snapshot_only:
+        q = q.where(CodeRevisionModel.snapshot.is_(True))
+    if at_most is not None:
+        q = q.where(CodeRevisionModel.seq <= at_most)
+    return db.scalars(q.order_by(CodeRevisionModel.seq.desc()).limit(1)).first()
+
+
+def record(db: Session, room_id: str, old_code: str, new_code: str, at: datetime | None = None) -> int | None:
+    """Append the change old_code -> new_code to the session (the caller
+    commits, so history and room row land together). Returns the new seq."""
+    if old_code == new_code:
+        return None
+    at = at or datetime.now(timezone.utc)
+    last = _last(db, room_id)
+    if last is None:
+        # first change seen for this room: keep where it started from
+        db.add(CodeRevisionModel(roomId=room_id, seq=1, snapshot=True, data=_encode(True, old_code, None), createdAt=at))
+        seq, since_snapshot = 2, 1
+    else:
+        seq = last.seq + 1
+        snap = last if last.snapshot else _last(db, room_id, snapshot_only=True)
+        since_snapshot = seq - (snap.seq if snap is not None else 0)
+    snapshot = since_snapshot >= SNAPSHOT_EVERY
+    ops = None if snapshot else diff(old_code, new_code)
+    db.add(CodeRevisionModel(roomId=room_id, seq=seq, snapshot=snapshot, data=_encode(snapshot, new_code, ops), createdAt=at))
+    return seq
+
+
+def _code_at(db: Session, room_id: str, seq: int) -> str | None:
+    snap = _last(db, room_id, snapshot_only=True, at_most=seq)
+    if snap is None:
+        return None
+    code = _decode(snap)
+    for row in db.scalars(
+        select(CodeRevisionModel)
+        .where(CodeRevisionModel.roomId == room_id, CodeRevisionModel.seq > snap.seq, CodeRevisionModel.seq <= seq)
+        .order_by(CodeRevisionModel.seq)
+    ):
+        code = _decode(row) if row.snapshot else ot.apply(code, _decode(row))
+    return code
+
+
+def revision(room_id: str, seq: int) -> dict | None:
+    with SessionLocal() as db:
+        row = db.scalars(
+            select(CodeRevisionModel).where(CodeRevisionModel.roomId == room_id, CodeRevisionModel.seq == seq)
+        ).first()
+        if row is None:
+            return None
+        return {"seq": seq, "createdAt": row.createdAt.isoformat(), "code": _code_at(db, room_id, seq)}
+
+
+def _utc_naive(t: datetime | None) -> datetime | None:
+    # stored timestamps are UTC without an offset
+    if t is None or t.tzinfo is None:
+        return t
+    return t.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def iter_revisions(
+    room_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    full: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[dict]:
+    """Revisions created in [since, until], oldest first. The first carries the
+    full ``code``; later ones carry ``ops`` against the one before (or ``code``
+    where a snapshot was stored), unless ``full`` asks for code every time."""
+    since, until = _utc_naive(since), _utc_naive(until)
+    with SessionLocal() as db:
+        q = select(CodeRevisionModel).where(CodeRevisionModel.roomId == room_id)
+        if since is not None:
+            q = q.where(CodeRevisionModel.createdAt >= since)
+        if until is not None:
+            q = q.where(CodeRevisionModel.createdAt <= until)
+        q = q.order_by(CodeRevisionModel.seq)
+        code: str | None = None
+        after = 0
+        while True:
+            rows = db.scalars(q.where(CodeRevisionModel.seq > after).limit(batch_size)).all()
+            if not rows:
+                return
+            for row in rows:
+                item = {"seq": row.seq, "createdAt": row.createdAt.isoformat()}
+                if code is None:
+                    code = _code_at(db, room_id, row.seq)
+                    item["code"] = code
+                elif row.snapshot:
+                    code = _decode(row)
+                    item["code"] = code
+                else:
+                    ops = _decode(row)
+                    code = ot.apply(code, ops)
+                    item["code" if full else "ops"] = code if full else ops
+                yield item
+            after = rows[-1].seq
@@ -0,0 +1,82 @@
+"""Idle eviction for resident room state.
+
+``room_state`` keeps a room in memory while sockets hold it. A tab left open
+overnight would pin it forever, so a background sweeper writes back and drops
+rooms idle for ``ROOM_IDLE_SECONDS`` and, past ``ROOM_MAX_RESIDENT`` rooms,
+the least recently used ones. Evicted rooms are hydrated again from the DB on
+their next message.
+"""
+import os
+import threading
+import time
+from .room_state import RoomStateStore, room_state
+
+ROOM_IDLE_SECONDS = float(os.environ.get("ROOM_IDLE_SECONDS", "600"))
+ROOM_MAX_RESIDENT = int(os.environ.get("ROOM_MAX_RESIDENT", "1000"))
+ROOM_SWEEP_INTERVAL = float(os.environ.get("ROOM_SWEEP_INTERVAL", "30"))
+
+
+class RoomLifecycle:
+    def __init__(
+        self,
+        store: RoomStateStore = room_state,
+        idle_seconds: float = ROOM_IDLE_SECONDS,
+        max_resident: int = ROOM_MAX_RESIDENT,
+        interval: float = ROOM_SWEEP_INTERVAL,
+    ):
+        self.store = store
+        self.idle_seconds = idle_seconds
+        self.max_resident = max_resident
+        self.interval = interval
+        self.evictions = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def sweep(self) -> int:
+        rooms = sorted(self.store.resident(), key=lambda r: r["lastUsed"])
+        cutoff = time.monotonic() - self.idle_seconds
+        excess = len(rooms) - self.max_resident
+        evicted = 0
+        for i, r in enumerate(rooms):
+            if r["lastUsed"] > cutoff and i >= excess:
+                break  # sorted: everything after is recent and within the cap
+            try:
+                if self.store.evict(r["id"], r["lastUsed"]):
+                    evicted += 1
+            except Exception:
+                pass  # write-back failed; the room stays resident and dirty
+        self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        rooms = sorted(self.store.resident(), key=lambda r: r["bytes"], reverse=True)
+        for r in rooms:
+            del r["lastUsed"]
+        return {
+            "resident": len(rooms),
+            "bytes": sum(r["bytes"] for r in rooms),
+            "maxResident": self.max_resident,
+            "idleSeconds": self.idle_seconds,
+            "evictions": self.evictions,
+            "rooms": rooms,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="room-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+
+lifecycle = RoomLifecycle()
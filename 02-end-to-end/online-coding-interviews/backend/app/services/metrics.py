@@ -0,0 +1,167 @@
+"""Prometheus text-format metrics, without the client library.
+
+Counters and histograms are updated on hot paths (socket messages,
+broadcasts, ``room_service`` calls); gauges are read from callbacks only
+when ``/metrics`` is scraped. ``METRICS=0`` turns recording off: ``timed``
+then returns the function unchanged and ``observe``/``inc`` return at once.
+"""
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from typing import Callable
+
+METRICS_ENABLED = os.environ.get("METRICS", "1") != "0"
+# seconds; DB calls and fan-out are usually well under a millisecond to tens of ms
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, n: float = 1) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + n
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {v:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # per label set: [count per bucket..., +Inf count], sum
+        self.values: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        if not METRICS_ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][i] += 1
+            entry[1][0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total[0]:g}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> list[str]:
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value:g}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Counter | Histogram | Gauge] = {}
+
+    def register(self, metric):
+        # module reloads and repeated app setup get the existing metric back
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        g = Gauge(name, help, read)
+        self.metrics[name] = g  # the newest reader wins
+        return g
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+ROOM_SERVICE_SECONDS = registry.histogram(
+    "room_service_call_seconds", "Duration of room_service calls (mostly SQLite).", ("fn",))
+
+
+class timed:
+    """``@timed(histogram)`` on a function, or ``with timed(histogram, *labels):``.
+
+    As a decorator the function name is the last label value, after ``labels``."""
+
+    __slots__ = ("hist", "labels", "start")
+
+    def __init__(self, hist: Histogram = ROOM_SERVICE_SECONDS, *labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __call__(self, fn):
+        if not METRICS_ENABLED:
+            return fn
+        hist, labels = self.hist, self.labels + (fn.__name__,)
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    hist.observe(time.perf_counter() - start, *labels)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start, *labels)
+        return wrapper
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start, *self.labels)
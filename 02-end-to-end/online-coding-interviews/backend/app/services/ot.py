@@ -0,0 +1,93 @@
+"""Operational transformation for plain-text documents.
+
+An operation covers the whole document it applies to and is a list of
+components: a positive int retains that many characters, a string inserts it,
+and a negative int deletes that many characters (same format as ot.js).
+"""
+
+Ops = list[int | str]
+
+
+def _kind(c: int | str) -> int:
+    return 0 if isinstance(c, str) else 1 if c > 0 else -1
+
+
+def normalize(ops) -> Ops:
+    if not isinstance(ops, list):
+        raise ValueError("ops must be a list")
+    out: Ops = []
+    for c in ops:
+        if isinstance(c, bool) or not isinstance(c, (int, str)):
+            raise ValueError(f"invalid component: {c!r}")
+        if c == 0 or c == "":
+            continue
+        if out and _kind(out[-1]) == _kind(c):
+            out[-1] += c
+        else:
+            out.append(c)
+    return out
+
+
+def base_len(ops: Ops) -> int:
+    return sum(abs(c) for c in ops if isinstance(c, int))
+
+
+def target_len(ops: Ops) -> int:
+    return sum(c if isinstance(c, int) and c > 0 else len(c) if isinstance(c, str) else 0 for c in ops)
+
+
+def apply(doc: str, ops: Ops) -> str:
+    if base_len(ops) != len(doc):
+        raise ValueError("operation does not match document length")
+    parts: list[str] = []
+    pos = 0
+    for c in ops:
+        if isinstance(c, str):
+            parts.append(c)
+        elif c > 0:
+            parts.append(doc[pos:pos + c])
+            pos += c
+        else:
+            pos -= c
+    return "".join(parts)
+
+
+def transform(a: Ops, b: Ops) -> tuple[Ops, Ops]:
+    """Given concurrent a and b on the same document, return (a', b') such that
+    apply(apply(d, a), b') == apply(apply(d, b), a'). Inserts from a win ties."""
+    if base_len(a) != base_len(b):
+        raise ValueError("concurrent operations must share a base document")
+    a1: Ops = []
+    b1: Ops = []
+    ia, ib = iter(a), iter(b)
+    ca, cb = next(ia, None), next(ib, None)
+    while ca is not None or cb is not None:
+        if isinstance(ca, str):
+            a1.append(ca)
+            b1.append(len(ca))
+            ca = next(ia, None)
+            continue
+        if isinstance(cb, str):
+            a1.append(len(cb))
+            b1.append(cb)
+            cb = next(ib, None)
+            continue
+        if ca is None or cb is None:
+            raise ValueError("operations have different lengths")
+        n = min(abs(ca), abs(cb))
+        if ca > 0 and cb > 0:
+            a1.append(n)
+            b1.append(n)
+        elif ca < 0 and cb > 0:
+            a1.append(-n)
+        elif ca > 0 and cb < 0:
+            b1.append(-n)
+        # both delete the same span: nothing left to do on either side
+        ca = _rest(ca, n) or next(ia, None)
+        cb = _rest(cb, n) or next(ib, None)
+    return normalize(a1), normalize(b1)
+
+
+def _rest(c: int, n: int) -> int | None:
+    r = c - n if c > 0 else c + n
+    return r or None
@@ -0,0 +1,62 @@
+"""Who is in each room.
+
+Per-room maps keyed by participant id, so join, leave and lookup are O(1) no
+matter how many people watch a room. Records are ``__slots__`` objects; the
+wire format (``{"id", "name", "isOnline"}``) is only built when asked for.
+"""
+import secrets
+
+
+class Participant:
+    __slots__ = ("id", "name", "online")
+
+    def __init__(self, participant_id: str, name: str):
+        self.id = participant_id
+        self.name = name
+        self.online = True
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "isOnline": self.online}
+
+
+class Presence:
+    def __init__(self):
+        self.rooms: dict[str, dict[str, Participant]] = {}
+        self.guest_counters: dict[str, int] = {}
+
+    def join(self, room_id: str, name: str) -> Participant:
+        # auto assign unique guest name if default
+        if not name or name.strip().lower() == "guest":
+            n = self.guest_counters.get(room_id, 1)
+            name = f"Guest{n}"
+            self.guest_counters[room_id] = n + 1
+        room = self.rooms.setdefault(room_id, {})
+        pid = secrets.token_hex(4)
+        while pid in room:
+            pid = secrets.token_hex(4)
+        p = Participant(pid, name)
+        room[pid] = p
+        return p
+
+    def leave(self, room_id: str, participant_id: str) -> Participant | None:
+        room = self.rooms.get(room_id)
+        if room is None:
+            return None
+        p = room.pop(participant_id, None)
+        if not room:
+            # nobody left: numbering starts over at Guest1 next time
+            del self.rooms[room_id]
+            self.guest_counters.pop(room_id, None)
+        return p
+
+    def get(self, room_id: str, participant_id: str) -> Participant | None:
+        return self.rooms.get(room_id, {}).get(participant_id)
+
+    def count(self, room_id: str) -> int:
+        return len(self.rooms.get(room_id, ()))
+
+    def members(self, room_id: str) -> list[dict]:
+        return [p.to_dict() for p in self.rooms.get(room_id, {}).values()]
+
+
+presence = Presence()
@@ -0,0 +1,149 @@
+"""Resumable room sessions.
+
+Clients that join with ``"features": ["resume"]`` get a ``resumeToken`` and a
+``seq`` on every room frame. When their socket drops, they stay in the room
+for ``WS_RESUME_GRACE`` seconds. A new socket that sends
+``{"type": "resume", "token", "lastSeq"}`` within that time takes over the
+session, as does one that arrives while the old socket still looks connected
+(which is then closed). It gets the frames it missed from the room's ring buffer (the last
+``WS_RESUME_BUFFER`` frames, ``WS_RESUME_BUFFER_BYTES`` at most) and nobody
+else sees a leave or a join.
+"""
+import asyncio
+import os
+import secrets
+from collections import deque
+from typing import Awaitable, Callable
+
+WS_RESUME_BUFFER = int(os.environ.get("WS_RESUME_BUFFER", "256"))
+WS_RESUME_BUFFER_BYTES = int(os.environ.get("WS_RESUME_BUFFER_BYTES", str(1 << 20)))
+WS_RESUME_GRACE = float(os.environ.get("WS_RESUME_GRACE", "10"))
+CLOSE_SESSION_MOVED = 4000  # closes a socket whose session was resumed on another
+
+
+class Entry:
+    __slots__ = ("seq", "payload", "exclude", "only", "latest")
+
+    def __init__(self, seq: int, payload: str, exclude: str | None, only, latest: str | None):
+        self.seq = seq
+        self.payload = payload  # with "seq" already spliced in
+        self.exclude = exclude  # participant id of the sender, if excluded
+        self.only = only
+        self.latest = latest
+
+
+class RoomLog:
+    """Ring buffer of a room's recent broadcasts, bounded by count and bytes."""
+
+    def __init__(self, max_entries: int = WS_RESUME_BUFFER, max_bytes: int = WS_RESUME_BUFFER_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: deque[Entry] = deque()
+        self.seq = 0
+        self.bytes = 0
+        self.floor = 0  # newest seq dropped from the buffer
+
+    def append(
+        self,
+        payload: str,
+        exclude: str | None = None,
+        only=None,
+        latest: str | None = None,
+        keep: bool = True,
+    ) -> Entry:
+        """Number a frame; ``keep=False`` numbers it without keeping it for replay."""
+        self.seq += 1
+        entry = Entry(self.seq, f'{{"seq":{self.seq},' + payload[1:], exclude, only, latest)
+        if not keep:
+            return entry
+        self.entries.append(entry)
+        self.bytes += len(entry.payload)
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            old = self.entries.popleft()
+            self.bytes -= len(old.payload)
+            self.floor = old.seq
+        return entry
+
+    def since(self, seq: int) -> list[Entry] | None:
+        """Entries after ``seq``, or None if some of them were already dropped."""
+        if seq < self.floor or seq > self.seq:
+            return None
+        return [e for e in self.entries if e.seq > seq]
+
+
+class Session:
+    __slots__ = ("token", "room_id", "pid", "name", "features", "timer")
+
+    def __init__(self, token: str, room_id: str, pid: str, name: str, features: set[str]):
+        self.token = token
+        self.room_id = room_id
+        self.pid = pid
+        self.name = name
+        self.features = features
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class Sessions:
+    def __init__(self, grace: float = WS_RESUME_GRACE):
+        self.grace = grace
+        self._sessions: dict[str, Session] = {}
+        self._parked: dict[str, int] = {}  # disconnected sessions per room
+        self.resumed = 0
+        self.expired = 0
+
+    def issue(self, room_id: str, pid: str, name: str, features: set[str]) -> Session:
+        token = secrets.token_urlsafe(16)
+        s = self._sessions[token] = Session(token, room_id, pid, name, set(features))
+        return s
+
+    def park(self, token: str, on_expire: Callable[[Session], Awaitable[None]]) -> bool:
+        """Keep a disconnected session for the grace period; False if there is
+        no such session (the caller cleans up right away)."""
+        s = self._sessions.get(token)
+        if s is None or self.grace <= 0:
+            self._sessions.pop(token, None)
+            return False
+
+        def expire() -> None:
+            if self._sessions.pop(token, None) is not None:
+                self._unpark(s)
+                self.expired += 1
+                asyncio.create_task(on_expire(s))
+
+        s.timer = asyncio.get_running_loop().call_later(self.grace, expire)
+        self._parked[s.room_id] = self._parked.get(s.room_id, 0) + 1
+        return True
+
+    def resume(self, token: str, room_id: str) -> Session | None:
+        """The session for ``token``, parked or not: on a flaky network the new
+        socket often arrives before the old one is seen to drop, and the
+        caller then detaches the old one. None if unknown, expired or for
+        another room."""
+        s = self._sessions.get(token)
+        if s is None or s.room_id != room_id:
+            return None
+        if s.timer is not None:
+            self._unpark(s)
+        self.resumed += 1
+        return s
+
+    def _unpark(self, s: Session) -> None:
+        s.timer.cancel()
+        s.timer = None
+        n = self._parked.pop(s.room_id) - 1
+        if n:
+            self._parked[s.room_id] = n
+
+    def parked(self, room_id: str) -> bool:
+        return room_id in self._parked
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "parked": sum(self._parked.values()),
+            "resumed": self.resumed,
+            "expired": self.expired,
+        }
+
+
+sessions = Sessions()
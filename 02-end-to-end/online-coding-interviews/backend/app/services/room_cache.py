@@ -0,0 +1,91 @@
+"""Read-through cache of room snapshots for rooms that are not resident in
+``room_state`` (page loads, reconnects, REST polling).
+
+Entries expire after ``ttl`` seconds (other workers may write the same room)
+and the least recently used are evicted past ``max_entries``. Writers ``put``
+the new snapshot or ``invalidate``; readers ``fill`` after a miss with the
+token taken before the DB read, so a slow read never overwrites a newer write.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+ROOM_CACHE_SIZE = int(os.environ.get("ROOM_CACHE_SIZE", "1024"))
+ROOM_CACHE_TTL = float(os.environ.get("ROOM_CACHE_TTL", "30"))
+
+
+class RoomCache:
+    def __init__(self, max_entries: int = ROOM_CACHE_SIZE, ttl: float = ROOM_CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, room_id: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(room_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, room = entry
+            if expires <= self.clock():
+                del self._entries[room_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(room_id)
+            self.hits += 1
+            return dict(room)
+
+    def token(self) -> int:
+        with self._lock:
+            return self._writes
+
+    def fill(self, room_id: str, room: dict, token: int) -> None:
+        with self._lock:
+            if token == self._writes:
+                self._store(room_id, room)
+
+    def put(self, room_id: str, room: dict) -> None:
+        with self._lock:
+            self._writes += 1
+            self._store(room_id, room)
+
+    def invalidate(self, room_id: str) -> None:
+        with self._lock:
+            self._writes += 1
+            self._entries.pop(room_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def _store(self, room_id: str, room: dict) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[room_id] = (self.clock() + self.ttl, dict(room))
+        self._entries.move_to_end(room_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+room_cache = RoomCache()
@@ -1,129 +1,191 @@
+import asyncio
+import logging
+import os
+import secrets
+import string
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Literal
-from datetime import datetime, timezone
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from ..db.session import SessionLocal
 from ..models.database import RoomModel
-from ..db.mock_db import participants
-guest_counters: dict[str, int] = {}
+from .archive import get_or_restore, id_taken, utcnow
+from .room_state import room_state
+from .room_cache import room_cache
+from .code_sync import code_sync
+from .presence import presence
+from . import history
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+_ID_ALPHABET = string.ascii_lowercase + string.digits
+ID_ATTEMPTS = 8
+
+# Blocking SQLAlchemy calls made on behalf of WebSocket handlers run here so the
+# event loop (and every other socket on this worker) never waits on SQLite.
+DB_WORKERS = int(os.environ.get("DB_WORKERS", "4"))
+_db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="room-db")
+
+async def run_db(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(fn, *args, **kwargs))
 
 def _template(language: Literal["javascript", "python"]) -> str:
     if language == "python":
         return "# Write your code here\ndef solution():\n    pass\n"
     return "// Write your code here\nfunction solution() {\n  // your solution\n}\n"
 
-def _now() -> str:
-    return datetime.now(timezone.utc).isoformat()
-
 def _gen_id() -> str:
-    from random import choices
-    import string
-    return "".join(choices(string.ascii_lowercase + string.digits, k=6))
+    return "".join(secrets.choice(_ID_ALPHABET) for _ in range(6))
 
+@timed()
 def create_room(language: Literal["javascript", "python"] = "javascript") -> dict:
-    rid = _gen_id()
-    now = datetime.now(timezone.utc)
+    now = utcnow()
     with SessionLocal() as db:
-        obj = RoomModel(id=rid, code=_template(language), language=language, task="", taskTitle="", createdAt=now)
-        db.add(obj)
-        db.commit()
-        db.refresh(obj)
-        result = {
-            "id": obj.id,
-            "code": obj.code,
-            "language": obj.language,
-            "task": obj.task,
-            "taskTitle": obj.taskTitle,
-            "createdAt": obj.createdAt.isoformat(),
-        }
-    participants.setdefault(rid, [])
-    guest_counters[rid] = 1
+        for _ in range(ID_ATTEMPTS):
+            rid = _gen_id()
+            if id_taken(db, rid):
+                continue
+            obj = RoomModel(id=rid, code=_template(language), language=language, task="", taskTitle="", createdAt=now, updatedAt=now)
+            db.add(obj)
+            try:
+                db.commit()
+            except IntegrityError:
+                # lost a race for the same id
+                db.rollback()
+                continue
+            db.refresh(obj)
+            result = obj.to_dict()
+            break
+        else:
+            raise RuntimeError("could not allocate a room id")
+    room_cache.put(rid, result)
     return result
 
+@timed()
 def get_room(room_id: str) -> dict | None:
+    live = room_state.get(room_id)
+    if live is not None:
+        return live
+    cached = room_cache.get(room_id)
+    if cached is not None:
+        return cached
+    token = room_cache.token()
     with SessionLocal() as db:
-        obj = db.get(RoomModel, room_id)
+        obj = get_or_restore(db, room_id)
         if not obj:
             return None
-        return {
-            "id": obj.id,
-            "code": obj.code,
-            "language": obj.language,
-            "task": obj.task,
-            "taskTitle": obj.taskTitle,
-            "createdAt": obj.createdAt.isoformat(),
-        }
+        room = obj.to_dict()
+    room_cache.fill(room_id, room, token)
+    return room
 
+@timed()
 def update_code(room_id: str, code: str) -> dict | None:
+    if buffer_code(room_id, code):
+        code_sync.reset(room_id)
+        room_state.flush(room_id)
+        return room_state.get(room_id)
     with SessionLocal() as db:
-        obj = db.get(RoomModel, room_id)
+        obj = get_or_restore(db, room_id)
         if not obj:
             return None
+        obj.updatedAt = utcnow()
+        history.record(db, room_id, obj.code, code)
         obj.code = code
         db.commit()
         db.refresh(obj)
-        return {
-            "id": obj.id,
-            "code": obj.code,
-            "language": obj.language,
-            "task": obj.task,
-            "taskTitle": obj.taskTitle,
-            "createdAt": obj.createdAt.isoformat(),
-        }
+        room = obj.to_dict()
+    room_cache.put(room_id, room)
+    return room
 
+@timed()
 def update_task(room_id: str, task: str, title: str | None = None) -> dict | None:
+    if buffer_task(room_id, task, title):
+        room_state.flush(room_id)
+        return room_state.get(room_id)
     with SessionLocal() as db:
-        obj = db.get(RoomModel, room_id)
+        obj = get_or_restore(db, room_id)
         if not obj:
             return None
+        obj.updatedAt = utcnow()
         obj.task = task
         if title is not None:
             obj.taskTitle = title
         db.commit()
         db.refresh(obj)
-        return {
-            "id": obj.id,
-            "code": obj.code,
-            "language": obj.language,
-            "task": obj.task,
-            "taskTitle": obj.taskTitle,
-            "createdAt": obj.createdAt.isoformat(),
-        }
+        room = obj.to_dict()
+    room_cache.put(room_id, room)
+    return room
 
+@timed()
 def update_language(room_id: str, language: Literal["javascript", "python"]) -> dict | None:
+    if buffer_language(room_id, language):
+        room_state.flush(room_id)
+        return room_state.get(room_id)
     with SessionLocal() as db:
-        obj = db.get(RoomModel, room_id)
+        obj = get_or_restore(db, room_id)
         if not obj:
             return None
+        obj.updatedAt = utcnow()
         obj.language = language
         db.commit()
         db.refresh(obj)
-        return {
-            "id": obj.id,
-            "code": obj.code,
-            "language": obj.language,
-            "task": obj.task,
-            "taskTitle": obj.taskTitle,
-            "createdAt": obj.createdAt.isoformat(),
-        }
+        room = obj.to_dict()
+    room_cache.put(room_id, room)
+    return room
+
+@timed()
+def open_room(room_id: str) -> dict | None:
+    return room_state.acquire(room_id)
+
+@timed()
+def hydrate_room(room_id: str) -> dict | None:
+    return room_state.hydrate(room_id)
+
+@timed()
+def release_room(room_id: str) -> None:
+    room_state.release(room_id)
+    # the cached snapshot predates everything that happened while resident
+    room_cache.invalidate(room_id)
+
+# In-memory only: the room must have been opened. Persisted by the room_state
+# flusher (code) or by persist_soon (task/language), never on the caller's stack.
+def buffer_code(room_id: str, code: str) -> bool:
+    return room_state.update(room_id, code=code) is not None
+
+def buffer_task(room_id: str, task: str, title: str | None = None) -> bool:
+    fields = {"task": task} if title is None else {"task": task, "taskTitle": title}
+    return room_state.update(room_id, **fields) is not None
+
+def buffer_language(room_id: str, language: Literal["javascript", "python"]) -> bool:
+    return room_state.update(room_id, language=language) is not None
+
+def _log_persist_failure(room_id: str, fut: asyncio.Future) -> None:
+    if not fut.cancelled() and fut.exception() is not None:
+        logger.warning("write-behind of room %s failed; the flusher retries", room_id, exc_info=fut.exception())
+
+def persist_soon(room_id: str) -> asyncio.Future:
+    # fire-and-forget for the handler; a failure leaves the room dirty for
+    # the room_state flusher and is logged here rather than lost
+    fut = asyncio.get_running_loop().run_in_executor(_db_executor, room_state.flush, room_id)
+    fut.add_done_callback(partial(_log_persist_failure, room_id))
+    return fut
+
+async def open_room_async(room_id: str) -> dict | None:
+    return await run_db(open_room, room_id)
+
+async def hydrate_room_async(room_id: str) -> dict | None:
+    return await run_db(hydrate_room, room_id)
+
+async def release_room_async(room_id: str) -> None:
+    await run_db(release_room, room_id)
 
 def get_participants(room_id: str) -> list[dict]:
-    return participants.get(room_id, [])
+    return presence.members(room_id)
 
 def add_participant(room_id: str, name: str) -> dict:
-    pid = _gen_id()
-    # auto assign unique guest name if default
-    if not name or name.strip().lower() == "guest":
-        base = "Guest"
-        n = guest_counters.get(room_id, 1)
-        name = f"{base}{n}"
-        guest_counters[room_id] = n + 1
-    p = {"id": pid, "name": name, "isOnline": True}
-    lst = participants.setdefault(room_id, [])
-    lst.append(p)
-    return p
+    return presence.join(room_id, name).to_dict()
 
 def remove_participant(room_id: str, participant_id: str) -> bool:
-    lst = participants.get(room_id, [])
-    before = len(lst)
-    participants[room_id] = [p for p in lst if p.get("id") != participant_id]
-    return len(participants[room_id]) < before
+    return presence.leave(room_id, participant_id) is not None
@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from typing import Callable
+from ..db.session import SessionLocal
+from .archive import get_or_restore, utcnow
+from .metrics import registry
+from . import history
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0
+FLUSH_FAILURES = registry.counter(
+    "room_state_flush_failures_total", "Background write-behind flushes that raised; the rooms stay dirty.")
+
+
+def _persist(room_id: str, room: dict) -> None:
+    with SessionLocal() as db:
+        obj = get_or_restore(db, room_id)
+        if not obj:
+            return
+        history.record(db, room_id, obj.code, room["code"])
+        obj.code = room["code"]
+        obj.language = room["language"]
+        obj.task = room["task"]
+        obj.taskTitle = room["taskTitle"]
+        obj.updatedAt = utcnow()
+        db.commit()
+
+
+def _load(room_id: str) -> dict | None:
+    with SessionLocal() as db:
+        obj = get_or_restore(db, room_id)
+        return obj.to_dict() if obj else None
+
+
+class RoomStateStore:
+    """In-memory state for active rooms; dirty rooms are written back by a
+    background flusher, on release of the last reference and on stop."""
+
+    def __init__(
+        self,
+        load: Callable[[str], dict | None] = _load,
+        persist: Callable[[str, dict], None] = _persist,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.load = load
+        self.persist = persist
+        self.flush_interval = flush_interval
+        self._rooms: dict[str, dict] = {}
+        self._dirty: set[str] = set()
+        self._refs: dict[str, int] = {}
+        self._used: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self, room_id: str) -> dict | None:
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                return None
+            self._used[room_id] = time.monotonic()
+            return dict(room)
+
+    def touch(self, room_id: str) -> bool:
+        # mark activity; False means the room was evicted and must be hydrated
+        with self._lock:
+            if room_id not in self._rooms:
+                return False
+            self._used[room_id] = time.monotonic()
+            return True
+
+    def hydrate(self, room_id: str) -> dict | None:
+        room = self.get(room_id)
+        if room is not None:
+            return room
+        loaded = self.load(room_id)
+        if loaded is None:
+            return None
+        with self._lock:
+            room = self._rooms.setdefault(room_id, loaded)
+            self._used[room_id] = time.monotonic()
+            return dict(room)
+
+    def acquire(self, room_id: str) -> dict | None:
+        room = self.hydrate(room_id)
+        if room is not None:
+            with self._lock:
+                self._refs[room_id] = self._refs.get(room_id, 0) + 1
+        return room
+
+    def update(self, room_id: str, **fields) -> dict | None:
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                return None
+            room.update(fields)
+            self._dirty.add(room_id)
+            self._used[room_id] = time.monotonic()
+            return dict(room)
+
+    def refresh(self, room_id: str, **fields) -> dict | None:
+        # apply a change someone else writes back (e.g. another worker's flusher)
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                return None
+            room.update(fields)
+            self._used[room_id] = time.monotonic()
+            return dict(room)
+
+    def is_dirty(self, room_id: str) -> bool:
+        with self._lock:
+            return room_id in self._dirty
+
+    def flush(self, room_id: str | None = None) -> int:
+        # Serialize writers so an older snapshot can never land after a newer one.
+        with self._flush_lock:
+            with self._lock:
+                ids = [room_id] if room_id is not None else list(self._dirty)
+                batch = [(rid, dict(self._rooms[rid])) for rid in ids if rid in self._dirty and rid in self._rooms]
+                for rid, _ in batch:
+                    self._dirty.discard(rid)
+            for rid, snapshot in batch:
+                try:
+                    self.persist(rid, snapshot)
+                except Exception:
+                    with self._lock:
+                        self._dirty.add(rid)
+                    raise
+            return len(batch)
+
+    def release(self, room_id: str) -> None:
+        with self._lock:
+            refs = self._refs.get(room_id, 0) - 1
+            if refs > 0:
+                self._refs[room_id] = refs
+                return
+            self._refs.pop(room_id, None)
+        self.flush(room_id)
+        with self._lock:
+            # a new socket may have acquired the room while we were flushing
+            if room_id not in self._dirty and room_id not in self._refs:
+                self._rooms.pop(room_id, None)
+                self._used.pop(room_id, None)
+
+    def evict(self, room_id: str, unused_since: float) -> bool:
+        """Write back and drop a room's state even if sockets still hold it;
+        it is hydrated again on next use. Skipped if the room was used after
+        ``unused_since`` (monotonic time)."""
+        with self._lock:
+            if self._used.get(room_id, 0.0) > unused_since:
+                return False
+        self.flush(room_id)
+        with self._lock:
+            if room_id in self._dirty or self._used.get(room_id, 0.0) > unused_since:
+                return False
+            self._used.pop(room_id, None)
+            return self._rooms.pop(room_id, None) is not None
+
+    def resident(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "id": rid,
+                    "lastUsed": self._used.get(rid, now),
+                    "idleSeconds": round(now - self._used.get(rid, now), 3),
+                    "bytes": sum(len(v) for v in room.values() if isinstance(v, str)),
+                    "refs": self._refs.get(rid, 0),
+                    "dirty": rid in self._dirty,
+                }
+                for rid, room in self._rooms.items()
+            ]
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="room-state-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                FLUSH_FAILURES.inc()
+                logger.exception("write-behind flush failed; retrying in %ss", self.flush_interval)
+
+
+room_state = RoomStateStore()
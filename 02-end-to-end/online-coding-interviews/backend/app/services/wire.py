@@ -0,0 +1,63 @@
+"""How frames are encoded for room sockets.
+
+``dumps`` is the JSON encoder for all outgoing frames: orjson when it is
+installed (``pip install orjson``), the standard library otherwise.
+
+Clients pick a wire encoding when they connect, ``/ws/rooms/{id}?encoding=``:
+
+- ``json`` (default): JSON text frames.
+- ``deflate``: the same JSON, raw-deflate compressed, in binary frames. Each
+  frame is compressed on its own (no shared context), so a broadcast is
+  compressed once and the same bytes go to every deflate client. Any raw
+  inflater reads them (e.g. ``new DecompressionStream("deflate-raw")``).
+  Frames shorter than ``WS_DEFLATE_MIN`` stay uncompressed text.
+"""
+import json
+import os
+import zlib
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+ENCODINGS = ("json", "deflate")
+WS_DEFLATE_LEVEL = int(os.environ.get("WS_DEFLATE_LEVEL", "6"))
+# every frame gets a fresh compressor, and setting up a 32 KB window costs more
+# than compressing a typical frame; 4 KB compresses code about as well
+WS_DEFLATE_WBITS = int(os.environ.get("WS_DEFLATE_WBITS", "12"))
+# below this, headers cost more than compression saves; sent as text
+WS_DEFLATE_MIN = int(os.environ.get("WS_DEFLATE_MIN", "64"))
+
+Frame = str | bytes
+
+
+def dumps(message) -> str:
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(payload: str | bytes):
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def deflate(payload: str, level: int = WS_DEFLATE_LEVEL, wbits: int = WS_DEFLATE_WBITS) -> bytes:
+    c = zlib.compressobj(level, zlib.DEFLATED, -wbits)
+    return c.compress(payload.encode()) + c.flush()
+
+
+def inflate(frame: bytes, wbits: int = WS_DEFLATE_WBITS) -> str:
+    return zlib.decompress(frame, -wbits).decode()
+
+
+def encode(payload: str, encoding: str) -> Frame:
+    if encoding == "deflate" and len(payload) >= WS_DEFLATE_MIN:
+        return deflate(payload)
+    return payload
+
+
+def negotiate(requested: str | None) -> str:
+    return requested if requested in ENCODINGS else "json"
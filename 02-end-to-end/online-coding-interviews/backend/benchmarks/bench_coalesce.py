@@ -0,0 +1,84 @@
+"""Frames delivered and CPU spent fanning out a typing burst, per coalescing window.
+
+Every participant in every room sends a code update every TYPE_INTERVAL
+seconds (plus a chat message every CHAT_EVERY keystrokes) for DURATION
+seconds. Updates go through RoomHub exactly as room_ws sends them; sockets
+are in-memory and only count frames, so CPU is the server-side cost of
+encoding, queueing and writing.
+
+Run from backend/: python -m benchmarks.bench_coalesce [rooms] [participants]
+"""
+import asyncio
+import sys
+import time
+from app.services.broadcast import RoomHub
+
+DURATION = 2.0
+TYPE_INTERVAL = 0.005
+CHAT_EVERY = 10
+WINDOWS_MS = (0, 16, 25, 50)
+
+
+class CountingWS:
+    def __init__(self):
+        self.frames = 0
+
+    async def send_text(self, data: str) -> None:
+        self.frames += 1
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+async def typist(hub: RoomHub, room_id: str, me: CountingWS, name: str) -> None:
+    code = ""
+    n = 0
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        n += 1
+        code += "x"
+        hub.broadcast(room_id, {"type": "code", "code": code, "rev": 0}, exclude=me, latest="code")
+        if n % CHAT_EVERY == 0:
+            hub.broadcast(room_id, {"type": "chat", "userName": name, "text": f"msg {n}"}, batched=True)
+        await asyncio.sleep(TYPE_INTERVAL)
+
+
+async def run(window_ms: float, rooms: int, participants: int) -> tuple[float, float]:
+    hub = RoomHub(maxsize=100_000, window=window_ms / 1000)
+    sockets: dict[str, list[CountingWS]] = {}
+    for r in range(rooms):
+        sockets[f"r{r}"] = [CountingWS() for _ in range(participants)]
+        for ws in sockets[f"r{r}"]:
+            hub.join(f"r{r}", ws).features.add("batch")
+    cpu = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        typist(hub, room_id, ws, f"p{i}")
+        for room_id, conns in sockets.items()
+        for i, ws in enumerate(conns)
+    ))
+    await asyncio.sleep(window_ms / 1000 + 0.01)  # last window
+    for _ in range(100):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    frames = sum(ws.frames for conns in sockets.values() for ws in conns)
+    for room_id, conns in sockets.items():
+        for ws in conns:
+            await hub.leave(room_id, ws)
+    return frames / elapsed, cpu
+
+
+def main() -> None:
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    participants = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"{rooms} rooms x {participants} typists, a keystroke every {TYPE_INTERVAL * 1000:.0f} ms for {DURATION:.0f} s")
+    base_cpu = None
+    for window in WINDOWS_MS:
+        rate, cpu = asyncio.run(run(window, rooms, participants))
+        base_cpu = base_cpu or cpu
+        print(f"window {window:>3} ms: {rate:10,.0f} frames/s  cpu {cpu:5.2f} s  ({1 - cpu / base_cpu:+.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Bytes on the wire and server CPU: full-document code_update vs code_ops deltas.
+
+Simulates one typist making single-character edits to a large solution and
+measures, per keystroke, the inbound + outbound frame size and the server-side
+time to decode, apply and re-encode the message.
+
+Run from backend/: python -m benchmarks.bench_code_sync [lines] [keystrokes]
+"""
+import json
+import random
+import sys
+import time
+from app.services.code_sync import CodeSync
+
+
+def make_doc(lines: int) -> str:
+    return "".join(f"    total += values[{i}] * weight  # line {i}\n" for i in range(lines))
+
+
+def full_updates(doc: str, edits: list[tuple[int, str]]) -> tuple[int, float]:
+    wire = 0
+    cpu = 0.0
+    for pos, ch in edits:
+        doc = doc[:pos] + ch + doc[pos:]
+        inbound = json.dumps({"type": "code_update", "code": doc})
+        start = time.perf_counter()
+        data = json.loads(inbound)
+        outbound = json.dumps({"type": "code", "code": data["code"], "rev": 1})
+        cpu += time.perf_counter() - start
+        wire += len(inbound) + len(outbound)
+    return wire, cpu
+
+
+def delta_updates(doc: str, edits: list[tuple[int, str]]) -> tuple[int, float]:
+    sync = CodeSync()
+    wire = 0
+    cpu = 0.0
+    rev = 0
+    for pos, ch in edits:
+        inbound = json.dumps({"type": "code_ops", "rev": rev, "ops": [pos, ch, len(doc) - pos]})
+        start = time.perf_counter()
+        data = json.loads(inbound)
+        rev, ops, doc = sync.submit("bench", doc, data["rev"], data["ops"])
+        outbound = json.dumps({"type": "code_ops", "rev": rev, "ops": ops})
+        ack = json.dumps({"type": "code_ack", "rev": rev})
+        cpu += time.perf_counter() - start
+        wire += len(inbound) + len(outbound) + len(ack)
+    return wire, cpu
+
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    doc = make_doc(lines)
+    rnd = random.Random(0)
+    edits = []
+    size = len(doc)
+    for _ in range(n):
+        edits.append((rnd.randint(0, size), "x"))
+        size += 1
+
+    full_wire, full_cpu = full_updates(doc, edits)
+    delta_wire, delta_cpu = delta_updates(doc, edits)
+    print(f"document: {lines} lines, {len(doc):,} bytes; keystrokes: {n}")
+    print(f"full code_update: {full_wire / n:>10,.0f} B/keystroke  {full_cpu / n * 1e6:8.1f} us/keystroke")
+    print(f"code_ops delta:   {delta_wire / n:>10,.0f} B/keystroke  {delta_cpu / n * 1e6:8.1f} us/keystroke")
+    print(f"wire reduction: {full_wire / delta_wire:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
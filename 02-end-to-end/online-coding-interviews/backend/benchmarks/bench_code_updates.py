@@ -0,0 +1,51 @@
+"""Messages/sec per room for WebSocket code_update persistence.
+
+before: room_service.update_code (SQLite commit + refresh per message)
+after:  room_service.buffer_code (in-memory, write-behind flush)
+
+Runs against a temporary SQLite database; rooms.db is not touched.
+
+Run from backend/: python -m benchmarks.bench_code_updates [messages]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# before app.db.session reads it at import
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from app.models.database import Base
+from app.db.session import init_db
+from app.services.room_service import create_room, update_code, buffer_code, open_room, release_room
+
+
+def bench(fn, room_id: str, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn(room_id, f"print({i})\n" * 40)
+    return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    init_db(Base)
+    before_room = create_room("python")["id"]
+    before = bench(update_code, before_room, n)
+
+    after_room = create_room("python")["id"]
+    open_room(after_room)
+    after = bench(buffer_code, after_room, n)
+    t = time.perf_counter()
+    release_room(after_room)
+    flush_ms = (time.perf_counter() - t) * 1000
+
+    print(f"messages: {n}")
+    print(f"before (commit per message): {before:,.0f} msg/s per room")
+    print(f"after  (write-behind):       {after:,.0f} msg/s per room  (final flush {flush_ms:.1f} ms)")
+    print(f"speedup: {after / before:,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Room create/update throughput against SQLite under concurrent writers.
+
+default: rollback journal, synchronous=FULL, no pragmas (the old engine)
+wal:     the engine from app.db.session (WAL, synchronous=NORMAL, busy_timeout)
+wal-full: WAL with synchronous=FULL, to separate the journal from the fsyncs
+
+Each thread creates rooms and updates their code a few times, one commit per
+operation, against a fresh database file per configuration.
+
+Run from backend/: python -m benchmarks.bench_db [rooms_per_thread] [threads]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.db.session import make_engine, SQLITE_PRAGMAS
+from app.models.database import Base, RoomModel
+
+UPDATES_PER_ROOM = 4
+CONFIGS = {
+    "default": None,
+    "wal": SQLITE_PRAGMAS,
+    "wal-full": {**SQLITE_PRAGMAS, "synchronous": "FULL"},
+}
+
+
+def run(pragmas: dict | None, rooms: int, threads: int) -> tuple[float, int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", pool_size=threads, pragmas=pragmas)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        errors = [0]
+        barrier = threading.Barrier(threads)
+
+        def writer(t: int) -> None:
+            barrier.wait()
+            for i in range(rooms):
+                rid = f"{t:03d}{i:05d}"
+                try:
+                    with Session() as db:
+                        db.add(RoomModel(id=rid, code="", language="python", task="", taskTitle="",
+                                         createdAt=datetime.now(timezone.utc)))
+                        db.commit()
+                    for n in range(UPDATES_PER_ROOM):
+                        with Session() as db:
+                            db.get(RoomModel, rid).code = f"print({n})\n" * 40
+                            db.commit()
+                except OperationalError:
+                    errors[0] += 1  # "database is locked"
+
+        workers = [threading.Thread(target=writer, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+    ops = threads * rooms * (1 + UPDATES_PER_ROOM)
+    return ops / elapsed, errors[0]
+
+
+def main() -> None:
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"{threads} threads x {rooms} rooms x {1 + UPDATES_PER_ROOM} commits")
+    for name, pragmas in CONFIGS.items():
+        rate, errors = run(pragmas, rooms, threads)
+        print(f"{name:<9} {rate:9,.0f} commits/s  locked errors: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Server-side execution: cold vs warm start latency and throughput.
+
+cold: a fresh ``python -c`` subprocess per run (what a naive executor does)
+warm: ExecutorPool (fork from a pre-started worker per run)
+cached: repeated identical runs answered from the result cache
+
+Run from backend/: python -m benchmarks.bench_exec [runs] [workers]
+"""
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.exec_service import ExecutorPool
+from app.services.exec_cache import ResultCache, cache_key
+
+CODE = "def solution(n):\n    return sum(i * i for i in range(n))\nprint(solution(1000))\n"
+
+
+def latencies(fn, n: int) -> list[float]:
+    out = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def throughput(fn, n: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        list(ex.map(lambda _: fn(), range(n)))
+    return n / (time.perf_counter() - start)
+
+
+def report(name: str, samples: list[float], rate: float) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<6} p50 {statistics.median(samples):9.3f} ms  p95 {p95:9.3f} ms  {rate:10.1f} exec/s")
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    def cold():
+        subprocess.run([sys.executable, "-c", CODE], capture_output=True, timeout=10)
+
+    pool = ExecutorPool(size=workers, max_queue=runs)
+    start = time.perf_counter()
+    pool.start()
+    pool.run("pass")
+    print(f"pool start ({workers} workers): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def warm():
+        pool.run(CODE)
+
+    cache = ResultCache()
+
+    def cached():
+        key = cache_key("python", CODE, "")
+        if cache.get(key) is None:
+            cache.put(key, pool.run(CODE))
+
+    try:
+        report("cold", latencies(cold, runs), throughput(cold, runs, workers))
+        report("warm", latencies(warm, runs), throughput(warm, runs, workers))
+        report("cached", latencies(cached, runs), throughput(cached, runs, workers))
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Bytes on the wire and encode time per frame for typical room traffic.
+
+The mix is a 45-minute session in miniature: full ``code`` frames as a
+solution grows to ~4 KB, small ``code_ops`` deltas, chat, task and roster
+updates and run output. Each row encodes every frame the way the server
+would for one socket.
+
+Run from backend/: python -m benchmarks.bench_wire [frames]
+"""
+import json
+import random
+import sys
+import time
+from app.services import wire
+
+SOLUTION = '''def two_sum(nums: list[int], target: int) -> list[int]:
+    """Return indices of the two numbers that add up to target."""
+    seen: dict[int, int] = {}
+    for i, n in enumerate(nums):
+        if target - n in seen:
+            return [seen[target - n], i]
+        seen[n] = i
+    return []
+
+
+if __name__ == "__main__":
+    print(two_sum([2, 7, 11, 15], 9))
+    print(two_sum([3, 2, 4], 6))
+'''
+
+
+def traffic(n: int) -> list[dict]:
+    rnd = random.Random(7)
+    code = SOLUTION * 8
+    frames = []
+    for i in range(n):
+        r = rnd.random()
+        cut = len(code) * (i + 1) // n
+        if r < 0.35:
+            frames.append({"type": "code", "code": code[:max(cut, 200)], "rev": i})
+        elif r < 0.75:
+            frames.append({"type": "code_ops", "rev": i, "ops": [cut, rnd.choice("abcdef ()\n:"), 40]})
+        elif r < 0.88:
+            frames.append({"type": "chat", "userName": "Guest2", "text": "what about duplicates?", "timestamp": "2024-05-01T10:00:00+00:00"})
+        elif r < 0.93:
+            frames.append({"type": "participants", "participants": [
+                {"id": f"{p:08x}", "name": f"Guest{p}", "isOnline": True} for p in range(4)]})
+        elif r < 0.97:
+            frames.append({"type": "output", "output": "[0, 1]\n[1, 2]\n" * 4, "error": None, "executionTime": 31})
+        else:
+            frames.append({"type": "task", "task": "Given an array of integers nums and an integer target...", "title": "Two Sum"})
+    return frames
+
+
+def deflated(payload: str, level: int, wbits: int = wire.WS_DEFLATE_WBITS):
+    # what wire.encode(payload, "deflate") sends, at other settings
+    return wire.deflate(payload, level, wbits) if len(payload) >= wire.WS_DEFLATE_MIN else payload
+
+
+def row(name: str, frames: list[dict], encode) -> tuple[int, float]:
+    start = time.perf_counter()
+    size = sum(len(f) if isinstance(f, bytes) else len(f.encode()) for f in map(encode, frames))
+    us = (time.perf_counter() - start) / len(frames) * 1e6
+    return size, us
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    frames = traffic(n)
+    rows = {
+        "json.dumps (before)": json.dumps,
+        f"wire.dumps ({'orjson' if wire.orjson else 'json'})": wire.dumps,
+        "deflate level 1": lambda m: deflated(wire.dumps(m), level=1),
+        "deflate level 6, 32 KB window": lambda m: deflated(wire.dumps(m), level=6, wbits=15),
+        "deflate level 6, 4 KB window": lambda m: deflated(wire.dumps(m), level=6, wbits=12),
+        "deflate level 6, 1 KB window": lambda m: deflated(wire.dumps(m), level=6, wbits=10),
+        "deflate level 9": lambda m: deflated(wire.dumps(m), level=9),
+    }
+    print(f"{n} frames")
+    base = None
+    for name, fn in rows.items():
+        size, us = row(name, frames, fn)
+        base = base or size
+        print(f"{name:<30} {size / n:8,.0f} B/frame  {size / base:6.1%}  {us:6.1f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
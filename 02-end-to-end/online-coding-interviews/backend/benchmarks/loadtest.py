@@ -0,0 +1,309 @@
+"""Load test: N rooms x M participants typing, chatting and running code.
+
+Drives a real server over HTTP and WebSocket. ``--spawn`` starts a local
+uvicorn on a free port with a throwaway SQLite database, so nothing needs
+network access and ``rooms.db`` is left alone; ``--url`` targets a server
+that is already running.
+
+Every participant joins its room's socket, types into the shared code
+(``code_update``), chats every few keystrokes and now and then runs code
+through ``POST /api/rooms/{id}/execute``. Each chat and code frame carries
+its send time, so every peer that receives it records a fan-out latency.
+
+Reports throughput, p50/p95/p99 latencies and server memory per room, and
+writes them as JSON (``--out``, default ``benchmarks/results/loadtest-<commit>.json``)
+to compare across commits.
+
+Needs a WebSocket client and server: pip install .[loadtest]
+Run from backend/: python -m benchmarks.loadtest --spawn [--rooms 20] [--participants 4] [--duration 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+try:
+    import httpx
+    import websockets
+except ImportError:  # optional, see [project.optional-dependencies] loadtest
+    httpx = websockets = None
+
+MARK = "lt"
+EXEC_CODE = "total = sum(i * i for i in range(2000))\nprint(total)\n"
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(s[min(len(s) - 1, int(len(s) * q))], 3)
+
+    return {"count": len(s), "p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(s[-1], 3)}
+
+
+class Stats:
+    def __init__(self):
+        self.sent: dict[str, int] = {}
+        self.received = 0
+        self.fanout_ms: list[float] = []
+        self.join_ms: list[float] = []
+        self.execute_ms: list[float] = []
+        self.errors: dict[str, int] = {}
+
+    def count(self, kind: str) -> None:
+        self.sent[kind] = self.sent.get(kind, 0) + 1
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def _stamp(text: str) -> float | None:
+    # a chat "lt <perf_counter>", or code ending in "# lt <perf_counter>"
+    parts = text.rsplit("\n", 1)[-1].split()
+    if len(parts) >= 3 and parts[0] == "#" and parts[1] == MARK:
+        return float(parts[2])
+    if len(parts) >= 2 and parts[0] == MARK:
+        return float(parts[1])
+    return None
+
+
+async def _receive(ws, stats: Stats) -> None:
+    async for raw in ws:
+        stats.received += 1
+        now = time.perf_counter()
+        msg = json.loads(raw)
+        if msg.get("type") == "chat_batch":
+            texts = [m.get("text", "") for m in msg.get("messages", [])]
+        elif msg.get("type") == "chat":
+            texts = [msg.get("text", "")]
+        elif msg.get("type") == "code":
+            texts = [msg.get("code", "")]
+        else:
+            continue
+        for text in texts:
+            sent = _stamp(text)
+            if sent is not None:
+                stats.fanout_ms.append((now - sent) * 1000)
+
+
+async def participant(http, ws_base: str, room_id: str, n: int, args, stats: Stats, start: asyncio.Event) -> None:
+    rnd = random.Random(n)
+    t = time.perf_counter()
+    try:
+        ws = await websockets.connect(f"{ws_base}/ws/rooms/{room_id}", max_size=None)
+    except Exception:
+        stats.error("connect")
+        return
+    reader = None
+    runs: list[asyncio.Task] = []
+    try:
+        await ws.send(json.dumps({"type": "join", "name": f"load{n}", "features": ["presence", "batch"]}))
+        async for raw in ws:
+            if json.loads(raw).get("type") == "me":
+                break
+        stats.join_ms.append((time.perf_counter() - t) * 1000)
+        reader = asyncio.create_task(_receive(ws, stats))
+        await start.wait()
+        deadline = time.perf_counter() + args.duration
+        code = ""
+        keys = 0
+        next_exec = time.perf_counter() + rnd.uniform(0, args.exec_interval) if args.exec_interval > 0 else float("inf")
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(args.type_interval * rnd.uniform(0.5, 1.5))
+            keys += 1
+            code = code[-2000:] + rnd.choice("abcdefghij ()=:\n")
+            await ws.send(json.dumps({"type": "code_update", "code": f"{code}\n# {MARK} {time.perf_counter()}"}))
+            stats.count("code_update")
+            if keys % args.chat_every == 0:
+                await ws.send(json.dumps({"type": "chat_message", "text": f"{MARK} {time.perf_counter()}"}))
+                stats.count("chat_message")
+            if time.perf_counter() >= next_exec:
+                next_exec += args.exec_interval
+                runs.append(asyncio.create_task(_execute(http, room_id, stats)))
+        await asyncio.gather(*runs)
+    except Exception:
+        stats.error("socket")
+    finally:
+        if reader is not None:
+            reader.cancel()
+        await ws.close()
+
+
+async def _execute(http, room_id: str, stats: Stats) -> None:
+    t = time.perf_counter()
+    try:
+        r = await http.post(f"/api/rooms/{room_id}/execute", json={"code": EXEC_CODE, "language": "python", "cache": False})
+        r.raise_for_status()
+    except Exception:
+        stats.error("execute")
+        return
+    stats.execute_ms.append((time.perf_counter() - t) * 1000)
+    stats.count("execute")
+
+
+def _rss_kb(pid: int | None) -> int | None:
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+async def _wait_healthy(http, timeout: float = 20) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await http.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError("server did not come up")
+        await asyncio.sleep(0.2)
+
+
+async def run(args, url: str, pid: int | None) -> dict:
+    stats = Stats()
+    ws_base = "ws" + url[len("http"):]
+    limits = httpx.Limits(max_connections=args.rooms * args.participants + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as http:
+        await _wait_healthy(http)
+        rss_before = _rss_kb(pid)
+        rooms = []
+        for _ in range(args.rooms):
+            r = await http.post("/api/rooms", json={"language": "python"})
+            r.raise_for_status()
+            rooms.append(r.json()["id"])
+        start = asyncio.Event()
+        tasks = [
+            asyncio.create_task(participant(http, ws_base, room_id, i * args.participants + p, args, stats, start))
+            for i, room_id in enumerate(rooms)
+            for p in range(args.participants)
+        ]
+        while len(stats.join_ms) + sum(stats.errors.values()) < len(tasks):
+            await asyncio.sleep(0.05)
+        rss_joined = _rss_kb(pid)
+        began = time.perf_counter()
+        start.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - began
+        rss_after = _rss_kb(pid)
+        resident = (await http.get("/api/room-state/stats")).json()
+    sent = sum(stats.sent.values())
+    return {
+        "commit": _commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "rooms": args.rooms,
+            "participants": args.participants,
+            "duration": args.duration,
+            "typeInterval": args.type_interval,
+            "chatEvery": args.chat_every,
+            "execInterval": args.exec_interval,
+        },
+        "throughput": {
+            "seconds": round(elapsed, 3),
+            "sentPerSec": round(sent / elapsed, 1),
+            "framesReceivedPerSec": round(stats.received / elapsed, 1),
+            "executionsPerSec": round(stats.sent.get("execute", 0) / elapsed, 2),
+            "sent": stats.sent,
+            "framesReceived": stats.received,
+        },
+        "latencyMs": {
+            "fanout": percentiles(stats.fanout_ms),
+            "join": percentiles(stats.join_ms),
+            "execute": percentiles(stats.execute_ms),
+        },
+        "memory": {
+            "rssBeforeKb": rss_before,
+            "rssJoinedKb": rss_joined,
+            "rssAfterKb": rss_after,
+            "rssPerRoomKb": round((rss_after - rss_before) / args.rooms, 1) if rss_before and rss_after else None,
+            "roomStateBytesPerRoom": round(resident["bytes"] / max(resident["resident"], 1)),
+        },
+        "errors": stats.errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:3001")
+    parser.add_argument("--spawn", action="store_true", help="start a local uvicorn with a temporary database")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--participants", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--type-interval", type=float, default=0.15, help="seconds between keystrokes")
+    parser.add_argument("--chat-every", type=int, default=20, help="keystrokes per chat message")
+    parser.add_argument("--exec-interval", type=float, default=10, help="seconds between runs per participant (0: none)")
+    parser.add_argument("--out", help="result file (default benchmarks/results/loadtest-<commit>.json)")
+    args = parser.parse_args()
+    if websockets is None or httpx is None:
+        sys.exit("needs websockets and httpx: pip install .[loadtest]")
+
+    server = None
+    url = args.url
+    tmp = tempfile.TemporaryDirectory()
+    if args.spawn:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp.name, 'load.db')}"}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=env,
+        )
+    try:
+        result = asyncio.run(run(args, url, server.pid if server else None))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        tmp.cleanup()
+
+    out = args.out or os.path.join(os.path.dirname(__file__), "results", f"loadtest-{result['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+
+    t, lat, mem = result["throughput"], result["latencyMs"], result["memory"]
+    print(f"{args.rooms} rooms x {args.participants} participants for {t['seconds']:.0f} s  (commit {result['commit']})")
+    print(f"sent {t['sentPerSec']:,.0f} msg/s, received {t['framesReceivedPerSec']:,.0f} frames/s, {t['executionsPerSec']} runs/s")
+    for name, p in lat.items():
+        if p["count"]:
+            print(f"{name:<8} p50 {p['p50']:8.2f} ms  p95 {p['p95']:8.2f} ms  p99 {p['p99']:8.2f} ms  (n={p['count']})")
+    if mem["rssPerRoomKb"] is not None:
+        print(f"server RSS {mem['rssPerRoomKb']:,.0f} KB per room; room state {mem['roomStateBytesPerRoom']:,} B per room")
+    if result["errors"]:
+        print(f"errors: {result['errors']}")
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
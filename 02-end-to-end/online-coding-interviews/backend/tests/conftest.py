@@ -0,0 +1,15 @@
+import pytest
+from app.services.room_state import RoomStateStore
+
+
+@pytest.fixture
+def make_store():
+    """A ``RoomStateStore`` over ``rooms`` (id -> room) that records writes
+    as ``(room_id, code)`` in ``writes``, with the background flusher idle."""
+    def make(rooms: dict, writes: list) -> RoomStateStore:
+        return RoomStateStore(
+            load=lambda rid: dict(rooms[rid]) if rid in rooms else None,
+            persist=lambda rid, room: writes.append((rid, room["code"])),
+            flush_interval=60,
+        )
+    return make
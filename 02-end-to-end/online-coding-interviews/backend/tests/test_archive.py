@@ -0,0 +1,65 @@
+import logging
+import threading
+from datetime import datetime
+from app.db.session import SessionLocal
+from app.models.database import RoomModel, ArchivedRoomModel
+from app.services import room_service
+from app.services.archive import Archiver, archive_rooms
+from app.services.room_cache import room_cache
+from app.services.room_service import create_room, get_room, update_task
+
+
+def _age(room_id: str) -> None:
+    with SessionLocal() as db:
+        db.get(RoomModel, room_id).updatedAt = datetime(2000, 1, 1)
+        db.commit()
+
+def _where(room_id: str) -> str | None:
+    with SessionLocal() as db:
+        if db.get(RoomModel, room_id) is not None:
+            return "hot"
+        if db.get(ArchivedRoomModel, room_id) is not None:
+            return "archive"
+    return None
+
+def test_archives_old_rooms_and_restores_on_read():
+    old = create_room("python")
+    update_task(old["id"], "Two sum", "Easy")
+    recent = create_room("python")["id"]
+    _age(old["id"])
+    assert archive_rooms(days=1, now=datetime(2000, 1, 3)) == 1
+    assert _where(old["id"]) == "archive" and _where(recent) == "hot"
+
+    room_cache.invalidate(old["id"])
+    restored = get_room(old["id"])
+    assert restored["task"] == "Two sum" and restored["createdAt"] == old["createdAt"]
+    assert _where(old["id"]) == "hot"
+
+def test_archive_skips_resident_rooms():
+    rid = create_room("python")["id"]
+    _age(rid)
+    assert archive_rooms(days=1, now=datetime(2000, 1, 3), exclude=[rid]) == 0
+    assert _where(rid) == "hot"
+
+def test_room_ids_never_collide(monkeypatch):
+    taken = create_room("python")["id"]
+    _age(taken)
+    archive_rooms(days=1, now=datetime(2000, 1, 3))
+    ids = iter([taken, taken, "zz" + taken[:4]])
+    monkeypatch.setattr(room_service, "_gen_id", lambda: next(ids))
+    # the archived id is still reserved
+    assert create_room("python")["id"] == "zz" + taken[:4]
+
+def test_background_archive_failure_is_logged(caplog):
+    called = threading.Event()
+
+    def resident():
+        called.set()
+        raise RuntimeError("boom")
+
+    archiver = Archiver(interval=0.01, resident=resident)
+    with caplog.at_level(logging.ERROR, logger="app.services.archive"):
+        archiver.start()
+        assert called.wait(2)
+        archiver.stop()
+    assert "archive pass failed" in caplog.text
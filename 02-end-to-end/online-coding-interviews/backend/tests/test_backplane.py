@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import pytest
+from app.services.backplane import Backplane, BrokerBackplane, LocalBackplane, create_backplane
+from app.services.broker import Broker
+
+
+def test_create_backplane_from_url():
+    assert isinstance(create_backplane(None), LocalBackplane)
+    assert isinstance(create_backplane("memory://"), LocalBackplane)
+    bp = create_backplane("unix:///tmp/x.sock")
+    assert isinstance(bp, BrokerBackplane) and bp.path == "/tmp/x.sock"
+
+async def _wait_for(events: list, n: int) -> None:
+    for _ in range(100):
+        if len(events) >= n:
+            return
+        await asyncio.sleep(0.01)
+
+def test_broker_relays_events_and_shares_presence(tmp_path):
+    async def run():
+        path = str(tmp_path / "broker.sock")
+        broker = Broker()
+        await broker.start(path)
+        seen_a, seen_b = [], []
+        a, b = BrokerBackplane(path), BrokerBackplane(path)
+        await a.start(seen_a.append)
+        await b.start(seen_b.append)
+
+        await a.publish({"kind": "frame", "room": "r", "payload": "{}"})
+        p1 = await a.join("r", "Guest")
+        p2 = await b.join("r", "Alice")
+        assert p1["name"] == "Guest1" and p2["name"] == "Alice"
+        assert {p["id"] for p in await b.members("r")} == {p1["id"], p2["id"]}
+        await _wait_for(seen_b, 1)
+        assert seen_a == []
+        assert seen_b == [{"kind": "frame", "room": "r", "payload": "{}"}]
+
+        # a worker going away takes its participants with it
+        await a.stop()
+        await _wait_for(seen_b, 2)
+        assert seen_b[-1] == {"kind": "roster", "room": "r", "participants": [p2]}
+        assert await b.members("r") == [p2]
+        assert await b.leave("r", p2["id"])
+        assert await b.members("r") == []
+
+        await b.stop()
+        await broker.stop()
+    asyncio.run(run())
+
+def test_calls_fail_once_the_broker_is_gone(tmp_path, caplog):
+    async def run():
+        path = str(tmp_path / "broker.sock")
+        broker = Broker()
+        await broker.start(path)
+        bp = BrokerBackplane(path)
+        await bp.start(lambda event: None)
+        await broker.stop()
+        for _ in range(100):
+            if bp._lost is not None:
+                break
+            await asyncio.sleep(0.01)
+        for call in (bp.join("r", "Guest"), bp.members("r")):
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(call, 1)
+        with caplog.at_level(logging.WARNING, logger="app.services.backplane"):
+            await bp.publish({"kind": "frame", "room": "r", "payload": "{}"})  # dropped
+        assert "frame event not published" in caplog.text
+        await bp.stop()
+    asyncio.run(run())
+
+def test_calls_time_out_without_a_reply(tmp_path):
+    async def run():
+        path = str(tmp_path / "silent.sock")
+
+        async def silent(reader, writer):
+            await reader.read()  # never replies
+        server = await asyncio.start_unix_server(silent, path)
+        bp = BrokerBackplane(path, call_timeout=0.2)
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(bp.start(lambda event: None), 1)
+        assert bp._pending == {}
+        await bp.stop()
+        server.close()
+        await server.wait_closed()
+    asyncio.run(run())
+
+def test_backplane_is_abstract():
+    with pytest.raises(TypeError):
+        Backplane()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+from app.services.broadcast import RoomHub, MAX_OVERFLOWS, CLOSE_TRY_AGAIN
+
+
+class FakeWS:
+    def __init__(self, blocked: bool = False):
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def send_text(self, data: str) -> None:
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_broadcast_encodes_once_and_skips_sender():
+    async def run():
+        hub = RoomHub()
+        a, b, c = FakeWS(), FakeWS(), FakeWS()
+        for ws in (a, b, c):
+            hub.join("r", ws)
+        assert hub.broadcast("r", {"type": "code", "code": "x"}, exclude=a) == 2
+        await _settle()
+        assert a.sent == []
+        assert b.sent[0] is c.sent[0]
+        assert json.loads(b.sent[0]) == {"type": "code", "code": "x"}
+        for ws in (a, b, c):
+            await hub.leave("r", ws)
+        assert "r" not in hub.rooms
+    asyncio.run(run())
+
+def test_slow_client_does_not_block_room():
+    async def run():
+        hub = RoomHub()
+        slow, fast = FakeWS(blocked=True), FakeWS()
+        hub.join("r", slow)
+        hub.join("r", fast)
+        for i in range(10):
+            hub.broadcast("r", {"type": "chat", "text": str(i)})
+        await _settle()
+        assert len(fast.sent) == 10
+        assert slow.sent == []
+        await hub.leave("r", slow)
+        await hub.leave("r", fast)
+    asyncio.run(run())
+
+def test_backed_up_client_is_resynced_then_dropped():
+    async def run():
+        hub = RoomHub(maxsize=4)
+        slow = FakeWS(blocked=True)
+        conn = hub.join("r", slow, resync=lambda: ['{"type": "code", "code": "snapshot"}'])
+        hub.broadcast("r", {"type": "code", "code": "0"})
+        await _settle()  # "0" is now stuck in the blocked writer
+        for i in range(4):
+            hub.broadcast("r", {"type": "code", "code": str(i)})
+        hub.broadcast("r", {"type": "code", "code": "overflow"})
+        assert conn.overflows == 1 and not conn.closed
+        assert conn.queue.qsize() == 1
+        for _ in range(MAX_OVERFLOWS * 4):
+            hub.broadcast("r", {"type": "code", "code": "more"})
+        assert conn.closed
+        slow.gate.set()
+        await _settle()
+        assert slow.closed_with == CLOSE_TRY_AGAIN
+        await hub.leave("r", slow)
+    asyncio.run(run())
+
+def test_coalescing_window_keeps_latest_state_and_batches_chat():
+    async def run():
+        hub = RoomHub(window=0.01)
+        a, b = FakeWS(), FakeWS()
+        hub.join("r", a)
+        hub.join("r", b).features.add("batch")
+        for i in range(5):
+            hub.broadcast("r", {"type": "code", "code": str(i)}, latest="code")
+            hub.broadcast("r", {"type": "chat", "text": str(i)}, batched=True)
+        hub.broadcast("r", {"type": "task", "task": "t"}, latest="task")
+        await _settle()
+        assert a.sent == [] and b.sent == []
+        await asyncio.sleep(0.03)
+        assert [json.loads(f) for f in b.sent] == [
+            {"type": "code", "code": "4"},
+            {"type": "task", "task": "t"},
+            {"type": "chat_batch", "messages": [{"type": "chat", "text": str(i)} for i in range(5)]},
+        ]
+        # clients that did not ask for batches still get chat one by one
+        assert [json.loads(f)["type"] for f in a.sent] == ["code", "task"] + ["chat"] * 5
+        assert hub.stats()["framesSaved"] == 4 + 4 + 4
+        await hub.leave("r", a)
+        await hub.leave("r", b)
+    asyncio.run(run())
+
+def test_direct_frame_flushes_parked_frames_first():
+    async def run():
+        hub = RoomHub(window=10)
+        a = FakeWS()
+        hub.join("r", a)
+        hub.broadcast("r", {"type": "code", "code": "x"}, latest="code")
+        hub.broadcast("r", {"type": "code_ops", "rev": 1})
+        await _settle()
+        assert [json.loads(f)["type"] for f in a.sent] == ["code", "code_ops"]
+        await hub.leave("r", a)
+        assert hub._timers == {}
+    asyncio.run(run())
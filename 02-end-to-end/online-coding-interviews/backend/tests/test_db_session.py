@@ -0,0 +1,21 @@
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+from app.db.session import make_engine
+
+
+def test_sqlite_file_gets_wal_and_pragmas(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'rooms.db'}", pool_size=3)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    assert engine.pool.size() == 3
+    engine.dispose()
+
+def test_in_memory_sqlite_shares_one_connection():
+    engine = make_engine("sqlite://")
+    assert isinstance(engine.pool, StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
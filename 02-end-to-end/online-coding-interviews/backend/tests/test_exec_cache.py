@@ -0,0 +1,42 @@
+from app.services.exec_cache import ResultCache, cache_key, cacheable, ENTRY_OVERHEAD
+
+
+def _result(output: str, error: str | None = None) -> dict:
+    return {"output": output, "error": error, "executionTime": 1}
+
+def test_key_covers_language_code_and_stdin():
+    keys = {cache_key("python", "print(1)", ""), cache_key("python", "print(1)", "x"),
+            cache_key("javascript", "print(1)", ""), cache_key("python", "print(1)x", "")}
+    assert len(keys) == 4
+    # parts are length-prefixed, so shifting text between them changes the key
+    assert cache_key("python", "ab", "c") != cache_key("python", "a", "bc")
+
+def test_lru_eviction_by_bytes():
+    entry = 100 + ENTRY_OVERHEAD
+    cache = ResultCache(max_bytes=entry * 4)
+    for k in "abcd":
+        cache.put(k, _result("x" * 100))
+    assert cache.get("a") is not None  # a is now most recent
+    cache.put("e", _result("x" * 100))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats() == {"entries": 4, "bytes": entry * 4, "hits": 2, "misses": 1}
+    # too big for the cache: not stored, nothing evicted
+    cache.put("huge", _result("x" * entry * 2))
+    assert cache.get("huge") is None and cache.stats()["entries"] == 4
+
+def test_only_deterministic_outcomes_are_cacheable():
+    assert cacheable("print(1)", _result("1\n"))
+    assert cacheable("1/0", _result("", "ZeroDivisionError: division by zero"))
+    assert not cacheable("import random\nprint(random.random())", _result("0.5\n"))
+    assert not cacheable("from time import time", _result(""))
+    for code in ("import os, random", "import sys, time", "import os\nprint(os.urandom(4))",
+                 "r = __import__('random')", "import numpy.random as r, datetime.datetime",
+                 "if True:\n    from uuid import uuid4", "print(id(object()))",
+                 "import sys\nprint(sys.modules['os'].getpid())"):
+        assert not cacheable(code, _result("")), code
+    assert cacheable("import sys, math\nprint(sorted(sys.stdin.read().split()))", _result(""))
+    assert cacheable("from . import x", _result("", "ImportError"))
+    assert cacheable("print(", _result("", "SyntaxError"))
+    assert not cacheable("while True: pass", _result("", "Time limit exceeded (5s)"))
+    assert not cacheable("print(1)", _result("", "Cancelled"))
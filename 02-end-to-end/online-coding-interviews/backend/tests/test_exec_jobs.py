@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from app.services.exec_cache import ResultCache
+from app.services.exec_jobs import ExecJobs, RoomBusy
+from app.services.exec_service import ExecutorPool, SUPPORTED
+
+pytestmark = pytest.mark.skipif(not SUPPORTED, reason="needs fork and resource (POSIX)")
+
+
+@pytest.fixture(scope="module")
+def pool():
+    p = ExecutorPool(size=2, max_queue=0, timeout=5, cpu_seconds=5, memory_mb=256, output_limit=10000)
+    p.start()
+    yield p
+    p.stop()
+
+def _jobs(pool, per_room=1, cache=None):
+    sent: list[tuple[str, dict]] = []
+
+    async def emit(room_id, message):
+        sent.append((room_id, message))
+
+    jobs = ExecJobs(pool, per_room=per_room, cache=cache)
+    jobs.start(emit)
+    return jobs, sent
+
+def test_streams_output_before_the_run_finishes(pool):
+    async def run():
+        jobs, sent = _jobs(pool)
+        job = jobs.submit("r", "import time\nprint('a', flush=True)\ntime.sleep(0.5)\nprint('b')", "python")
+        for _ in range(100):
+            if any(m["type"] == "output_chunk" for _, m in sent):
+                break
+            await asyncio.sleep(0.01)
+        assert not job.done.done()
+        assert ("r", {"type": "output_chunk", "jobId": job.id, "stream": "stdout", "data": "a\n"}) in sent
+        result = await job.done
+        assert result["output"] == "a\nb\n"
+        types = [m["type"] for _, m in sent]
+        assert types[0] == "job" and types[-1] == "output"
+        assert sent[-1][1]["status"] == "completed"
+        assert jobs.get("r", job.id).to_dict()["output"] == "a\nb\n"
+        assert jobs.get("other", job.id) is None
+        jobs.stop()
+    asyncio.run(run())
+
+def test_cancel_and_room_limit(pool):
+    async def run():
+        jobs, sent = _jobs(pool)
+        job = jobs.submit("r", "import time\ntime.sleep(10)", "python")
+        with pytest.raises(RoomBusy):
+            jobs.submit("r", "print(1)", "python")
+        other = jobs.submit("s", "print(1)", "python")
+        await asyncio.sleep(0.1)
+        jobs.cancel("r", job.id)
+        result = await asyncio.wait_for(job.done, 2)
+        assert result["error"] == "Cancelled"
+        assert job.status == "cancelled"
+        assert (await other.done)["output"] == "1\n"
+        # the slot is free again and the worker is reusable
+        again = jobs.submit("r", "print(2)", "python")
+        assert (await again.done)["output"] == "2\n"
+        jobs.stop()
+    asyncio.run(run())
+
+def test_cached_result_completes_immediately(pool):
+    async def run():
+        jobs, sent = _jobs(pool, cache=ResultCache(1024 * 1024))
+        first = await jobs.submit("r", "print(40 + 2)", "python").done
+        assert first["output"] == "42\n" and "cached" not in first
+        job = jobs.submit("r", "print(40 + 2)", "python")
+        assert job.done.done() and job.result["cached"] is True
+        # opting out runs it again
+        fresh = await jobs.submit("r", "print(40 + 2)", "python", use_cache=False).done
+        assert "cached" not in fresh
+        assert jobs.cache.stats()["hits"] == 1
+        await asyncio.sleep(0)
+        assert sent[-1][1]["type"] == "output"
+        jobs.stop()
+    asyncio.run(run())
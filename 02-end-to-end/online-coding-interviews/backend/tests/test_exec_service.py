@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+import pytest
+from app.services.exec_service import ExecutorPool, ExecutorBusy, SUPPORTED
+
+pytestmark = pytest.mark.skipif(not SUPPORTED, reason="needs fork and resource (POSIX)")
+
+
+@pytest.fixture(scope="module")
+def pool():
+    os.environ["SECRET"] = "s3cret"  # inherited by the workers
+    p = ExecutorPool(size=2, max_queue=1, timeout=1, cpu_seconds=1, memory_mb=256, output_limit=1000, max_processes=16)
+    p.start()
+    yield p
+    p.stop()
+    del os.environ["SECRET"]
+
+def test_runs_code_with_stdin(pool):
+    r = pool.run("import sys\nprint(sum(int(x) for x in sys.stdin.read().split()))", "1 2 3")
+    assert r["output"] == "6\n"
+    assert r["error"] is None
+    assert r["executionTime"] >= 0
+
+def test_runs_are_isolated(pool):
+    pool.run("import builtins\nbuiltins.leak = 1")
+    r = pool.run("import builtins\nprint(hasattr(builtins, 'leak'))")
+    assert r["output"] == "False\n"
+
+def test_exception_and_exit_status(pool):
+    r = pool.run("raise ValueError('boom')")
+    assert "ValueError: boom" in r["error"]
+    assert pool.run("import sys; sys.exit(3)")["error"] == "Exited with status 3"
+
+def test_wall_clock_limit(pool):
+    r = pool.run("import time\nprint('start', flush=True)\ntime.sleep(10)")
+    assert r["output"] == "start\n"
+    assert r["error"].startswith("Time limit exceeded")
+    assert 900 <= r["executionTime"] < 5000
+
+def test_wall_clock_limit_after_closing_output(pool):
+    r = pool.run("import os, time\nos.close(1)\nos.close(2)\ntime.sleep(8)")
+    assert r["error"].startswith("Time limit exceeded")
+    assert r["executionTime"] < 3000
+
+def test_cancel_after_closing_output(pool):
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    r = pool.run("import os, time\nos.close(1)\nos.close(2)\ntime.sleep(8)", cancel=cancel)
+    assert r["error"] == "Cancelled"
+    assert r["executionTime"] < 900
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="needs /proc")
+def test_kills_processes_the_child_forked(pool):
+    code = "import os, time\npid = os.fork()\nif pid == 0:\n    time.sleep(30)\nelse:\n    print(pid)"
+    r = pool.run(code)
+    assert r["error"] is None
+    pid = int(r["output"])
+    for _ in range(50):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if f.read().split(") ")[-1].startswith("Z"):
+                    break  # killed, waiting for init to reap it
+        except FileNotFoundError:
+            break
+        time.sleep(0.02)
+    else:
+        pytest.fail("forked process outlived the run")
+
+def test_limits_process_count(pool):
+    # enforced by the kernel for non-root users only, so check the limit itself
+    r = pool.run("import resource\nprint(resource.getrlimit(resource.RLIMIT_NPROC))")
+    assert r["output"] == "(16, 16)\n"
+
+def test_does_not_see_the_server_environment(pool):
+    r = pool.run("import os\nprint('SECRET' in os.environ)")
+    assert r["output"] == "False\n"
+
+def test_string_hashing_is_the_same_on_every_worker():
+    code = "print({'apple', 'banana', 'cherry', 'date', 'elderberry', 'fig'}, hash('x'))"
+    p = ExecutorPool(size=4, max_queue=0, timeout=5, cpu_seconds=5, memory_mb=256, output_limit=1000)
+    p.start()
+    try:
+        # idle workers are taken in turn, so this runs on each of them twice
+        outputs = {p.run(code)["output"] for _ in range(8)}
+    finally:
+        p.stop()
+    assert len(outputs) == 1
+
+def test_output_limit(pool):
+    r = pool.run("while True: print('x' * 100)")
+    assert len(r["output"]) <= 1000
+    assert r["error"].startswith("Output limit exceeded")
+
+def test_memory_limit(pool):
+    r = pool.run("data = bytearray(1024 * 1024 * 1024)")
+    assert "MemoryError" in r["error"]
+
+def test_rejects_when_queue_is_full(pool):
+    barrier = threading.Barrier(4)
+    results = []
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(pool.run("import time; time.sleep(0.3)"))
+        except ExecutorBusy:
+            results.append("busy")
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count("busy") == 1
+    assert pool.stats()["busy"] == 0
@@ -0,0 +1,76 @@
+import asyncio
+import json
+from app.services import broadcast
+from app.services.broadcast import RoomHub
+from app.services.heartbeat import Heartbeat
+
+class FakeWS:
+    def __init__(self, blocked: bool = False, broken: bool = False):
+        self.sent: list[str] = []
+        self.gate = asyncio.Event()
+        self.broken = broken
+        if not blocked:
+            self.gate.set()
+
+    async def send_text(self, data: str) -> None:
+        if self.broken:
+            raise ConnectionResetError
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+def test_send_timeouts_and_errors_mark_connection_dead(monkeypatch):
+    monkeypatch.setattr(broadcast, "SEND_TIMEOUT", 0.01)
+    async def run():
+        hub = RoomHub(window=0)
+        stuck, broken, ok = FakeWS(blocked=True), FakeWS(broken=True), FakeWS()
+        c_stuck, c_broken, c_ok = hub.join("r", stuck), hub.join("r", broken), hub.join("r", ok)
+        for i in range(broadcast.MAX_SEND_FAILURES + 1):
+            hub.broadcast("r", {"type": "chat", "text": str(i)})
+        await asyncio.sleep(0.1)
+        assert c_stuck.closed and c_stuck.failures == broadcast.MAX_SEND_FAILURES
+        assert c_broken.closed and c_broken.failures == 1
+        assert not c_ok.closed and len(ok.sent) == broadcast.MAX_SEND_FAILURES + 1
+        for ws in (stuck, broken, ok):
+            await hub.leave("r", ws)
+    asyncio.run(run())
+
+def test_sweep_pings_idle_and_reaps_dead():
+    async def run():
+        now = [1000.0]
+        hub = RoomHub(window=0)
+        hb = Heartbeat(hub, interval=10, timeout=30, clock=lambda: now[0])
+        reaped = []
+
+        async def on_dead(room_id, ws):
+            reaped.append(ws)
+            await hub.leave(room_id, ws)
+
+        hb.start(on_dead)
+        quiet, legacy, chatty = FakeWS(), FakeWS(), FakeWS()
+        c_quiet, c_legacy, c_chatty = (hub.join("r", ws) for ws in (quiet, legacy, chatty))
+        c_quiet.features.add("heartbeat")
+        for c in (c_quiet, c_legacy, c_chatty):
+            c.last_seen = now[0]
+
+        now[0] += 15
+        c_chatty.last_seen = now[0]
+        assert await hb.sweep() == 0
+        await asyncio.sleep(0)
+        assert [json.loads(f) for f in quiet.sent] == [{"type": "ping"}]
+        assert legacy.sent and chatty.sent == []
+        assert hb.stats()["rooms"]["r"] == {"live": 1, "stale": 2, "dead": 0, "reaped": 0}
+
+        now[0] += 20  # heartbeat client silent for 35 s; the legacy one is not reaped for silence
+        c_chatty.closed = True
+        assert await hb.sweep() == 2
+        assert reaped == [quiet, chatty]
+        stats = hb.stats()
+        assert stats["reaped"] == 2 and stats["rooms"]["r"]["reaped"] == 2 and stats["connections"] == 1
+        await hub.leave("r", legacy)
+        await hb.sweep()
+        assert hb.reaped == {}
+        await hb.stop()
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import json
+from sqlalchemy import select
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.session import SessionLocal
+from app.models.database import CodeRevisionModel
+from app.services import history, ot
+
+client = TestClient(app)
+
+def _revisions(rid: str, **params) -> list[dict]:
+    r = client.get(f"/api/rooms/{rid}/revisions", params=params)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in r.text.splitlines()]
+
+def test_diff_round_trips():
+    for old, new in [("", "abc"), ("abc", ""), ("hello world", "hello brave world"), ("aaa", "aa"), ("x = 1", "y = 1")]:
+        assert ot.apply(old, history.diff(old, new)) == new
+
+def test_revisions_snapshot_every_n(monkeypatch):
+    monkeypatch.setattr(history, "SNAPSHOT_EVERY", 4)
+    rid = client.post("/api/rooms", json={"language": "python"}).json()["id"]
+    versions = [f"print({i})\n" * 10 for i in range(10)]
+    for code in versions:
+        client.put(f"/api/rooms/{rid}/code", json={"code": code})
+        client.put(f"/api/rooms/{rid}/code", json={"code": code})  # unchanged: no revision
+
+    with SessionLocal() as db:
+        rows = db.scalars(select(CodeRevisionModel).where(CodeRevisionModel.roomId == rid).order_by(CodeRevisionModel.seq)).all()
+        assert [r.seq for r in rows] == list(range(1, 12))
+        assert [r.seq for r in rows if r.snapshot] == [1, 5, 9]
+
+    # every revision is reachable directly
+    for i, code in enumerate(versions):
+        assert client.get(f"/api/rooms/{rid}/revisions/{i + 2}").json()["code"] == code
+    assert client.get(f"/api/rooms/{rid}/revisions/99").status_code == 404
+
+    # delta stream replays to the same texts
+    lines = _revisions(rid)
+    code = lines[0]["code"]
+    seen = [code]
+    for line in lines[1:]:
+        code = line["code"] if "code" in line else ot.apply(code, line["ops"])
+        seen.append(code)
+    assert seen[1:] == versions
+    assert [line["code"] for line in _revisions(rid, format="full")][1:] == versions
+
+def test_revisions_time_range():
+    rid = client.post("/api/rooms").json()["id"]
+    client.put(f"/api/rooms/{rid}/code", json={"code": "a"})
+    lines = _revisions(rid)
+    assert len(lines) == 2
+    cut = lines[-1]["createdAt"]
+    client.put(f"/api/rooms/{rid}/code", json={"code": "ab"})
+    later = _revisions(rid, since=cut)
+    # the first line in range is materialized, the rest are deltas
+    assert later[0]["seq"] <= 2 and "code" in later[0]
+    assert later[-1]["seq"] == 3 and later[-1]["ops"] == [1, "b"]
+    assert _revisions(rid, until="2000-01-01T00:00:00Z") == []
+    assert client.get("/api/rooms/nope00/revisions").status_code == 404
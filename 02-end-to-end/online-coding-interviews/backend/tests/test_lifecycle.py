@@ -0,0 +1,75 @@
+import json
+import time
+from fastapi.testclient import TestClient
+from app.main import app, _snapshot_frames
+from app.services.lifecycle import RoomLifecycle
+from app.services.room_state import room_state
+
+
+def _rooms(ids) -> dict:
+    return {rid: {"id": rid, "code": rid * 10} for rid in ids}
+
+def test_evicts_idle_rooms_and_writes_them_back(make_store):
+    writes = []
+    store = make_store(_rooms("ab"), writes)
+    store.acquire("a")
+    store.acquire("b")
+    store.update("a", code="dirty")
+    lc = RoomLifecycle(store, idle_seconds=0.05, max_resident=10)
+    assert lc.sweep() == 0
+    time.sleep(0.06)
+    store.touch("b")
+    assert lc.sweep() == 1
+    assert writes == [("a", "dirty")]
+    assert store.get("a") is None and store.get("b") is not None
+    # still referenced by its socket: comes back on next use
+    assert not store.touch("a")
+    assert store.hydrate("a")["code"] == "aaaaaaaaaa"
+
+def test_caps_resident_rooms_least_recently_used_first(make_store):
+    store = make_store(_rooms("abcd"), [])
+    for rid in "abcd":
+        store.acquire(rid)
+    store.get("a")
+    lc = RoomLifecycle(store, idle_seconds=3600, max_resident=2)
+    assert lc.sweep() == 2
+    assert {r["id"] for r in store.resident()} == {"a", "d"}
+    stats = lc.stats()
+    assert stats["resident"] == 2 and stats["evictions"] == 2
+    assert stats["bytes"] == sum(r["bytes"] for r in stats["rooms"]) == 2 * (1 + 10)
+
+def test_evict_skips_rooms_used_since_the_snapshot(make_store):
+    store = make_store(_rooms("a"), [])
+    store.acquire("a")
+    seen = store.resident()[0]["lastUsed"]
+    store.update("a", code="new")
+    assert not store.evict("a", seen)
+    assert store.get("a")["code"] == "new"
+
+def test_socket_rehydrates_an_evicted_room():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms").json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as ws:
+            ws.send_text(json.dumps({"type": "join", "name": "A"}))
+            ws.receive_text()
+            assert room_state.evict(rid, float("inf"))
+            ws.send_text(json.dumps({"type": "code_update", "code": "after eviction"}))
+            ws.send_text(json.dumps({"type": "chat_message", "text": "sync"}))
+            while json.loads(ws.receive_text()).get("text") != "sync":
+                pass
+            assert room_state.get(rid)["code"] == "after eviction"
+        assert client.get(f"/api/rooms/{rid}").json()["code"] == "after eviction"
+        assert client.get("/api/room-state/stats").json()["resident"] >= 0
+
+def test_resync_snapshot_of_an_evicted_room_has_its_state():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms", json={"language": "python"}).json()["id"]
+        client.put(f"/api/rooms/{rid}/code", json={"code": "x = 1"})
+        with client.websocket_connect(f"/ws/rooms/{rid}") as ws:
+            ws.send_text(json.dumps({"type": "join", "name": "A"}))
+            ws.receive_text()  # the room is open
+            assert room_state.evict(rid, float("inf"))
+            frames = [json.loads(f) for f in _snapshot_frames(rid)]
+        assert [f["type"] for f in frames] == ["participants", "language", "task", "code"]
+        assert frames[0]["participants"][0]["name"] == "A"
+        assert frames[1]["language"] == "python" and frames[3]["code"] == "x = 1"
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import metrics
+from app.services.metrics import Registry, timed
+
+def test_counter_and_histogram_render():
+    reg = Registry()
+    c = reg.counter("msgs_total", "Messages.", ("type",))
+    h = reg.histogram("call_seconds", "Calls.", ("fn",), buckets=(0.1, 1.0))
+    c.inc("chat")
+    c.inc("chat", n=2)
+    c.inc("code")
+    h.observe(0.05, "get")
+    h.observe(0.5, "get")
+    h.observe(5, "get")
+    text = reg.render()
+    assert '# TYPE msgs_total counter' in text
+    assert 'msgs_total{type="chat"} 3' in text
+    assert 'msgs_total{type="code"} 1' in text
+    assert 'call_seconds_bucket{fn="get",le="0.1"} 1' in text
+    assert 'call_seconds_bucket{fn="get",le="1"} 2' in text
+    assert 'call_seconds_bucket{fn="get",le="+Inf"} 3' in text
+    assert 'call_seconds_count{fn="get"} 3' in text
+    assert 'call_seconds_sum{fn="get"} 5.55' in text
+    # asking again returns the same metric
+    assert reg.counter("msgs_total", "Messages.", ("type",)) is c
+
+def test_gauge_reads_on_render_and_skips_errors():
+    reg = Registry()
+    depth = [4]
+    reg.gauge("queue_depth", "Queued.", lambda: depth[0])
+    reg.gauge("broken", "Fails.", lambda: 1 / 0)
+    assert "queue_depth 4\n" in reg.render()
+    depth[0] = 7
+    text = reg.render()
+    assert "queue_depth 7\n" in text
+    assert "broken" not in text
+
+def test_timed_labels_sync_and_async_functions():
+    h = Registry().histogram("t_seconds", "T.", ("fn",))
+
+    @timed(h)
+    def load(x):
+        return x * 2
+
+    @timed(h)
+    async def save(x):
+        return x + 1
+
+    assert load(2) == 4
+    assert asyncio.run(save(2)) == 3
+    with timed(h, "block"):
+        pass
+    assert load.__name__ == "load"
+    assert {k: counts[-1] + sum(counts[:-1]) for k, (counts, _) in h.values.items()} == {
+        ("load",): 1, ("save",): 1, ("block",): 1}
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    reg = Registry()
+    c = reg.counter("c_total", "C.")
+    h = reg.histogram("h_seconds", "H.", ("fn",))
+
+    def f():
+        return 1
+
+    assert timed(h)(f) is f
+    c.inc()
+    h.observe(0.1, "x")
+    assert c.values == {} and h.values == {}
+
+def test_metrics_endpoint_counts_ws_messages_and_service_calls():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms").json()["id"]
+        client.get(f"/api/rooms/{rid}")
+        with client.websocket_connect(f"/ws/rooms/{rid}") as ws:
+            ws.send_text(json.dumps({"type": "join", "name": "A"}))
+            ws.send_text(json.dumps({"type": "bogus"}))
+            ws.send_text(json.dumps({"type": "chat_message", "text": "hi"}))
+            # messages are handled in order: once the chat is out, the others were counted
+            while "hi" not in ws.receive_text():
+                pass
+            r = client.get("/metrics")
+            assert r.status_code == 200
+            assert r.headers["content-type"].startswith("text/plain")
+            text = r.text
+            assert 'ws_messages_total{type="join"}' in text
+            assert 'ws_messages_total{type="other"}' in text
+            assert 'ws_message_seconds_count{type="join"}' in text
+            assert 'room_service_call_seconds_count{fn="get_room"}' in text
+            assert "ws_broadcast_seconds_count" in text
+            assert "rooms_active " in text
+            assert "ws_connections " in text
+            assert "exec_queue_depth " in text
@@ -0,0 +1,64 @@
+import random
+import pytest
+from app.services import ot
+from app.services.code_sync import CodeSync, StaleRevision
+
+
+def _random_op(doc: str, rnd: random.Random) -> ot.Ops:
+    ops, i = [], 0
+    while i < len(doc):
+        n = rnd.randint(1, len(doc) - i)
+        r = rnd.random()
+        if r < 0.4:
+            ops.append(n)
+            i += n
+        elif r < 0.7:
+            ops.append(-n)
+            i += n
+        else:
+            ops.append(rnd.choice(["x", "yz", "\n"]))
+    if rnd.random() < 0.5:
+        ops.append("!")
+    return ot.normalize(ops)
+
+def test_apply_insert_and_delete():
+    assert ot.apply("hello world", [6, -5, "there"]) == "hello there"
+    with pytest.raises(ValueError):
+        ot.apply("short", [10])
+
+def test_normalize_merges_and_validates():
+    assert ot.normalize([1, 2, "a", "b", 0, -1, -1]) == [3, "ab", -2]
+    with pytest.raises(ValueError):
+        ot.normalize([1.5])
+    with pytest.raises(ValueError):
+        ot.normalize("abc")
+
+def test_transform_converges():
+    rnd = random.Random(7)
+    for _ in range(2000):
+        doc = "".join(rnd.choice("abc") for _ in range(rnd.randint(0, 12)))
+        a, b = _random_op(doc, rnd), _random_op(doc, rnd)
+        a1, b1 = ot.transform(a, b)
+        assert ot.apply(ot.apply(doc, a), b1) == ot.apply(ot.apply(doc, b), a1)
+
+def test_code_sync_transforms_concurrent_edits():
+    sync = CodeSync()
+    doc = "abc"
+    rev, _, doc = sync.submit("r", doc, 0, ["X", 3])
+    assert (rev, doc) == (1, "Xabc")
+    # based on rev 0: append at the end of "abc"
+    rev, ops, doc = sync.submit("r", doc, 0, [3, "Y"])
+    assert (rev, ops, doc) == (2, [4, "Y"], "XabcY")
+
+def test_code_sync_stale_revisions():
+    sync = CodeSync(log_size=2)
+    doc = ""
+    for i in range(3):
+        _, _, doc = sync.submit("r", doc, i, [len(doc), "x"])
+    with pytest.raises(StaleRevision):
+        sync.submit("r", doc, 0, [len(doc), "y"])
+    with pytest.raises(StaleRevision):
+        sync.submit("r", doc, 9, [len(doc), "y"])
+    assert sync.reset("r") == 4
+    with pytest.raises(StaleRevision):
+        sync.submit("r", doc, 3, [len(doc), "y"])
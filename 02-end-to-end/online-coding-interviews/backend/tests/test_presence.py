@@ -0,0 +1,22 @@
+from app.services.presence import Presence
+
+
+def test_join_leave_and_guest_names():
+    presence = Presence()
+    a = presence.join("r", "Guest")
+    b = presence.join("r", "")
+    c = presence.join("r", "Alice")
+    assert (a.name, b.name, c.name) == ("Guest1", "Guest2", "Alice")
+    assert presence.count("r") == 3
+    assert presence.get("r", c.id) is c
+    assert presence.leave("r", b.id) is b
+    assert presence.leave("r", b.id) is None
+    assert presence.members("r") == [a.to_dict(), c.to_dict()]
+    assert c.to_dict() == {"id": c.id, "name": "Alice", "isOnline": True}
+
+def test_empty_rooms_are_dropped():
+    presence = Presence()
+    p = presence.join("r", "A")
+    presence.leave("r", p.id)
+    assert "r" not in presence.rooms
+    assert presence.members("r") == []
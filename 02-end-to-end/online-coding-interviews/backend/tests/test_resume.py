@@ -0,0 +1,79 @@
+import asyncio
+import json
+from app.services.broadcast import RoomHub
+from app.services.resume import RoomLog, Sessions
+
+class FakeWS:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+def test_room_log_is_bounded_and_detects_gaps():
+    log = RoomLog(max_entries=3, max_bytes=10_000)
+    for i in range(5):
+        log.append(json.dumps({"type": "chat", "text": str(i)}))
+    assert [e.seq for e in log.since(3)] == [4, 5]
+    assert json.loads(log.since(4)[0].payload) == {"seq": 5, "type": "chat", "text": "4"}
+    assert log.since(5) == []
+    assert log.since(1) is None  # 2 was dropped
+    assert log.since(9) is None
+    log.append('{"type":"code_ops"}', keep=False)
+    assert log.seq == 6 and log.since(5) == []
+
+def test_room_log_byte_budget():
+    log = RoomLog(max_entries=100, max_bytes=100)
+    for _ in range(10):
+        log.append('{"type":"code","code":"' + "x" * 30 + '"}')
+    assert log.bytes <= 100 and [e.seq for e in log.entries] == [10]
+
+def test_replay_skips_own_frames_and_superseded_state():
+    async def run():
+        hub = RoomHub(window=0)
+        hub.keep_log("r")
+        a, b = FakeWS(), FakeWS()
+        ca = hub.join("r", a)
+        ca.pid, ca.features = "pa", {"resume"}
+        hub.join("r", b).pid = "pb"
+        hub.broadcast("r", {"type": "code", "code": "1"}, exclude=b, latest="code")
+        hub.broadcast("r", {"type": "chat", "text": "hi"}, batched=True)
+        hub.broadcast("r", {"type": "code", "code": "2"}, exclude=b, latest="code")
+        hub.broadcast("r", {"type": "task", "task": "mine"}, exclude=a, latest="task")
+        await asyncio.sleep(0)
+        assert [json.loads(f)["seq"] for f in a.sent] == [1, 2, 3]
+        assert "seq" not in json.loads(b.sent[0])
+        a.sent.clear()
+        assert hub.replay("r", a, 0) == 2
+        await asyncio.sleep(0)
+        assert [json.loads(f) for f in a.sent] == [
+            {"seq": 2, "type": "chat", "text": "hi"},
+            {"seq": 3, "type": "code", "code": "2"},
+        ]
+        await hub.leave("r", a)
+        await hub.leave("r", b)
+    asyncio.run(run())
+
+def test_sessions_park_resume_and_expire():
+    async def run():
+        s = Sessions(grace=0.05)
+        expired = []
+
+        async def on_expire(session):
+            expired.append(session.pid)
+
+        a = s.issue("r", "pa", "A", {"resume"})
+        b = s.issue("r", "pb", "B", {"resume"})
+        assert s.resume(a.token, "r") is a  # still connected: taken over
+        assert not s.parked("r")
+        assert s.park(a.token, on_expire) and s.park(b.token, on_expire)
+        assert s.parked("r")
+        assert s.resume(a.token, "other") is None
+        assert s.resume(a.token, "r") is a
+        await asyncio.sleep(0.1)
+        assert expired == ["pb"] and s.resume(b.token, "r") is None
+        assert s.stats() == {"sessions": 1, "parked": 0, "resumed": 2, "expired": 1}
+    asyncio.run(run())
@@ -0,0 +1,56 @@
+from app.services.room_cache import RoomCache
+from app.services import room_service
+from app.services.room_service import create_room, get_room, update_code, open_room, release_room, buffer_code
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _room(rid: str, code: str = "") -> dict:
+    return {"id": rid, "code": code}
+
+def test_ttl_and_lru():
+    clock = Clock()
+    cache = RoomCache(max_entries=2, ttl=10, clock=clock)
+    cache.put("a", _room("a"))
+    cache.put("b", _room("b"))
+    assert cache.get("a") == _room("a")
+    cache.put("c", _room("c"))  # evicts b, the least recently used
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2, "evictions": 1, "expirations": 1}
+
+def test_fill_loses_to_a_concurrent_write():
+    cache = RoomCache()
+    token = cache.token()
+    cache.put("a", _room("a", "new"))
+    cache.fill("a", _room("a", "old"), token)
+    assert cache.get("a")["code"] == "new"
+    token = cache.token()
+    cache.invalidate("a")
+    cache.fill("a", _room("a", "old"), token)
+    assert cache.get("a") is None
+
+def test_get_room_reads_through_and_writes_update(monkeypatch):
+    rid = create_room("python")["id"]
+    room_service.room_cache.invalidate(rid)
+    assert get_room(rid)["language"] == "python"
+    calls = []
+    monkeypatch.setattr(room_service, "SessionLocal", lambda: calls.append(1))
+    assert get_room(rid)["id"] == rid  # served without touching the ORM
+    assert calls == []
+    monkeypatch.undo()
+
+    update_code(rid, "print(2)")
+    assert room_service.room_cache.get(rid)["code"] == "print(2)"
+
+    # changes made while resident are not masked by the cache after release
+    open_room(rid)
+    buffer_code(rid, "print(3)")
+    release_room(rid)
+    assert get_room(rid)["code"] == "print(3)"
@@ -0,0 +1,66 @@
+import logging
+import threading
+
+from app.services.room_service import create_room, get_room, buffer_code, release_room, open_room
+from app.services import room_state as room_state_module
+
+
+def test_updates_coalesce_into_one_write(make_store):
+    writes = []
+    store = make_store({"r1": {"id": "r1", "code": "", "language": "python", "task": "", "taskTitle": ""}}, writes)
+    store.hydrate("r1")
+    for i in range(100):
+        store.update("r1", code=f"v{i}")
+    assert writes == []
+    assert store.flush() == 1
+    assert writes == [("r1", "v99")]
+    assert store.flush() == 0
+
+def test_release_and_stop_flush_pending(make_store):
+    writes = []
+    store = make_store({"a": {"id": "a", "code": ""}, "b": {"id": "b", "code": ""}}, writes)
+    store.hydrate("a")
+    store.hydrate("b")
+    store.update("a", code="x")
+    store.update("b", code="y")
+    store.release("a")
+    assert writes == [("a", "x")]
+    assert store.get("a") is None
+    store.stop()
+    assert writes == [("a", "x"), ("b", "y")]
+
+def test_update_unknown_room_is_ignored(make_store):
+    store = make_store({}, [])
+    assert store.hydrate("missing") is None
+    assert store.update("missing", code="x") is None
+
+def test_background_flush_failure_is_logged_and_counted(caplog):
+    failed = threading.Event()
+
+    def persist(rid, room):
+        failed.set()
+        raise RuntimeError("disk full")
+
+    store = room_state_module.RoomStateStore(load=lambda rid: {"id": rid, "code": ""}, persist=persist, flush_interval=0.01)
+    store.hydrate("r1")
+    store.update("r1", code="x")
+    before = room_state_module.FLUSH_FAILURES.values.get((), 0)
+    with caplog.at_level(logging.ERROR, logger=room_state_module.__name__):
+        store.start()
+        assert failed.wait(2)
+        store._stop.set()
+        store._thread.join()
+    assert store.is_dirty("r1")
+    assert room_state_module.FLUSH_FAILURES.values.get((), 0) > before
+    assert "write-behind flush failed" in caplog.text
+
+def test_buffer_code_persists_on_release():
+    rid = create_room("python")["id"]
+    open_room(rid)
+    assert buffer_code(rid, "print(2)")
+    assert room_state_module.room_state.is_dirty(rid)
+    assert get_room(rid)["code"] == "print(2)"
+    release_room(rid)
+    assert room_state_module.room_state.get(rid) is None
+    assert get_room(rid)["code"] == "print(2)"
+    assert not buffer_code("nope!", "x")
@@ -1,4 +1,7 @@
-from app.services.room_service import create_room, get_room, update_code, update_task, update_language
+import asyncio
+import pytest
+from app.services.room_service import create_room, get_room, update_code, update_task, update_language, persist_soon
+from app.services.room_state import room_state
 
 def test_room_crud_sqlite():
     r = create_room("javascript")
@@ -13,3 +16,15 @@ def test_room_crud_sqlite():
     u3 = update_language(rid, "python")
     assert u3 is not None and u3["language"] == "python"
 
+def test_persist_soon_logs_a_failed_write(monkeypatch, caplog):
+    def fail(room_id=None):
+        raise OSError("disk full")
+    monkeypatch.setattr(room_state, "flush", fail)
+
+    async def run():
+        fut = persist_soon("r1")
+        with pytest.raises(OSError):
+            await fut
+        await asyncio.sleep(0)  # done callbacks run on the next loop turn
+    asyncio.run(run())
+    assert "write-behind of room r1 failed" in caplog.text
@@ -0,0 +1,21 @@
+import json
+from app.services import wire
+
+def test_dumps_is_compact_json():
+    msg = {"type": "chat", "text": "héllo \"quoted\"", "n": [1, 2]}
+    out = wire.dumps(msg)
+    assert isinstance(out, str) and json.loads(out) == msg
+    assert ", " not in out
+
+def test_deflate_round_trip_and_threshold():
+    payload = wire.dumps({"type": "code", "code": "print('x')\n" * 100})
+    frame = wire.encode(payload, "deflate")
+    assert isinstance(frame, bytes) and len(frame) < len(payload) / 5
+    assert wire.inflate(frame) == payload
+    assert wire.encode('{"type":"language"}', "deflate") == '{"type":"language"}'
+    assert wire.encode(payload, "json") is payload
+
+def test_negotiate_falls_back_to_json():
+    assert wire.negotiate("deflate") == "deflate"
+    assert wire.negotiate("msgpack") == "json"
+    assert wire.negotiate(None) == "json"
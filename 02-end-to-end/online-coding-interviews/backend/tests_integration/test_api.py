@@ -3,10 +3,38 @@ from app.main import app
 
 client = TestClient(app)
 
-def test_execute_code_mock():
+def test_execute_code_python():
     r = client.post("/api/rooms")
     rid = r.json()["id"]
-    x = client.post(f"/api/rooms/{rid}/execute", json={"code": "print(1)", "language": "python"})
+    x = client.post(f"/api/rooms/{rid}/execute", json={"code": "print(input() * 2)", "language": "python", "stdin": "ab"})
+    assert x.status_code == 200
+    data = x.json()
+    assert data["output"] == "abab\n"
+    assert data["error"] is None
+    assert isinstance(data["executionTime"], int)
+
+def test_execute_code_python_error():
+    rid = client.post("/api/rooms").json()["id"]
+    data = client.post(f"/api/rooms/{rid}/execute", json={"code": "1/0", "language": "python"}).json()
+    assert data["output"] == ""
+    assert "ZeroDivisionError" in data["error"]
+    assert "exec_service" not in data["error"]
+
+def test_execute_code_python_cached():
+    rid = client.post("/api/rooms").json()["id"]
+    body = {"code": "print(sum(range(10)))", "language": "python", "stdin": "cache-test"}
+    first = client.post(f"/api/rooms/{rid}/execute", json=body).json()
+    again = client.post(f"/api/rooms/{rid}/execute", json=body).json()
+    assert first["cached"] is False
+    assert again["cached"] is True and again["output"] == first["output"] == "45\n"
+    fresh = client.post(f"/api/rooms/{rid}/execute", json={**body, "cache": False}).json()
+    assert fresh["cached"] is False
+    assert client.get("/api/exec/stats").json()["cache"]["hits"] >= 1
+
+def test_execute_code_javascript_mock():
+    r = client.post("/api/rooms")
+    rid = r.json()["id"]
+    x = client.post(f"/api/rooms/{rid}/execute", json={"code": "console.log(1)", "language": "javascript"})
     assert x.status_code == 200
     data = x.json()
     assert "output" in data
@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+import app.main as main
+from app.api import routes
+from app.main import app
+from app.services.backplane import BrokerBackplane
+from app.services.broker import Broker
+import asyncio
+import json
+import threading
+
+def _recv_until(ws, type_: str, **match) -> dict:
+    while True:
+        data = json.loads(ws.receive_text())
+        if data["type"] == type_ and all(data.get(k) == v for k, v in match.items()):
+            return data
+
+def test_rooms_span_workers_through_broker(tmp_path, monkeypatch):
+    path = str(tmp_path / "broker.sock")
+    loop = asyncio.new_event_loop()
+    broker = Broker()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(broker.start(path), loop).result(5)
+
+    # the app under test is one worker, a bare BrokerBackplane plays another
+    worker = BrokerBackplane(path)
+    remote_events = []
+    monkeypatch.setattr(main, "backplane", BrokerBackplane(path))
+    monkeypatch.setattr(routes, "backplane", main.backplane)
+    try:
+        asyncio.run_coroutine_threadsafe(worker.start(remote_events.append), loop).result(5)
+        with TestClient(app) as client:
+            rid = client.post("/api/rooms").json()["id"]
+            other = asyncio.run_coroutine_threadsafe(worker.join(rid, "Remote"), loop).result(5)
+            with client.websocket_connect(f"/ws/rooms/{rid}") as ws:
+                ws.send_text(json.dumps({"type": "join", "name": "Local"}))
+                roster = _recv_until(ws, "participants")["participants"]
+                assert {p["name"] for p in roster} == {"Local", "Remote"}
+                names = {p["name"] for p in client.get(f"/api/rooms/{rid}/participants").json()}
+                assert names == {"Local", "Remote"}
+
+                payload = json.dumps({"type": "chat", "userName": "Remote", "text": "hi", "timestamp": "t"})
+                asyncio.run_coroutine_threadsafe(worker.publish({"kind": "frame", "room": rid, "payload": payload}), loop).result(5)
+                assert _recv_until(ws, "chat", text="hi")["userName"] == "Remote"
+
+                asyncio.run_coroutine_threadsafe(worker.publish({"kind": "state", "room": rid, "fields": {"language": "python"}}), loop).result(5)
+                assert _recv_until(ws, "language")["language"] == "python"
+
+                ws.send_text(json.dumps({"type": "code_update", "code": "x = 1"}))
+                ws.send_text(json.dumps({"type": "chat_message", "text": "ping"}))
+                _recv_until(ws, "chat", text="ping")
+            assert {"kind": "state", "room": rid, "fields": {"code": "x = 1"}} in remote_events
+            assert any(e.get("kind") == "frame" and '"ping"' in e["payload"] for e in remote_events)
+            asyncio.run_coroutine_threadsafe(worker.leave(rid, other["id"]), loop).result(5)
+    finally:
+        asyncio.run_coroutine_threadsafe(worker.stop(), loop).result(5)
+        asyncio.run_coroutine_threadsafe(broker.stop(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
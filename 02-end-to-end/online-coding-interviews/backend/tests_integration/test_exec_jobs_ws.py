@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.exec_service import SUPPORTED
+import json
+import pytest
+
+pytestmark = pytest.mark.skipif(not SUPPORTED, reason="needs fork and resource (POSIX)")
+
+def _recv_until(ws, type_: str) -> dict:
+    while True:
+        data = json.loads(ws.receive_text())
+        if data["type"] == type_:
+            return data
+
+def test_job_output_streams_to_the_room():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms", json={"language": "python"}).json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as a, client.websocket_connect(f"/ws/rooms/{rid}") as b:
+            r = client.post(f"/api/rooms/{rid}/jobs", json={"code": "print('hi')", "language": "python"})
+            assert r.status_code == 202
+            job_id = r.json()["id"]
+            chunk = _recv_until(b, "output_chunk")
+            assert chunk == {"type": "output_chunk", "jobId": job_id, "stream": "stdout", "data": "hi\n"}
+            done = _recv_until(a, "output")
+            assert done["jobId"] == job_id and done["output"] == "hi\n" and done["status"] == "completed"
+            assert client.get(f"/api/rooms/{rid}/jobs/{job_id}").json()["status"] == "completed"
+
+            # over the socket, and cancelled by another participant
+            a.send_text(json.dumps({"type": "run_code", "language": "python", "code": "import time\nprint('x', flush=True)\ntime.sleep(10)"}))
+            job_id = _recv_until(b, "job")["jobId"]
+            _recv_until(b, "output_chunk")
+            b.send_text(json.dumps({"type": "cancel_job", "jobId": job_id}))
+            done = _recv_until(a, "output")
+            assert done["status"] == "cancelled" and done["output"] == "x\n"
+        assert client.get(f"/api/rooms/{rid}/jobs/nope").status_code == 404
@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 from app.main import app
 import json
+from app.services.wire import inflate
 
 client = TestClient(app)
 
@@ -12,3 +13,16 @@ def test_ws_join_participants():
         msg = ws.receive_text()
         data = json.loads(msg)
         assert data["type"] in ("participants", "me", "chat")
+
+def test_ws_deflate_encoding():
+    rid = client.post("/api/rooms").json()["id"]
+    code = "def solve(nums):\n    return sorted(nums)\n" * 20
+    with TestClient(app) as c:
+        with c.websocket_connect(f"/ws/rooms/{rid}?encoding=deflate") as a, c.websocket_connect(f"/ws/rooms/{rid}") as b:
+            b.send_text(json.dumps({"type": "code_update", "code": code}))
+            frame = a.receive()
+            assert "bytes" in frame and len(frame["bytes"]) < len(code) / 4
+            assert json.loads(inflate(frame["bytes"]))["code"] == code
+            # small frames stay text
+            b.send_text(json.dumps({"type": "language_update", "language": "python"}))
+            assert json.loads(a.receive_text()) == {"type": "language", "language": "python"}
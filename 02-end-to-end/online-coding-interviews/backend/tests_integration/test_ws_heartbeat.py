@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+from app.main import app, heartbeat
+import json
+
+def _recv_until(ws, type_: str) -> dict:
+    while True:
+        data = json.loads(ws.receive_text())
+        if data["type"] == type_:
+            return data
+
+def test_silent_heartbeat_client_is_reaped(monkeypatch):
+    monkeypatch.setattr(heartbeat, "interval", 0.05)
+    monkeypatch.setattr(heartbeat, "timeout", 0.3)
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms").json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as watcher:
+            watcher.send_text(json.dumps({"type": "join", "name": "Watcher", "features": ["presence"]}))
+            _recv_until(watcher, "me")
+            with client.websocket_connect(f"/ws/rooms/{rid}") as silent:
+                silent.send_text(json.dumps({"type": "join", "name": "Silent", "features": ["heartbeat"]}))
+                me = _recv_until(silent, "me")
+                assert _recv_until(silent, "ping") == {"type": "ping"}
+                # never answers: removed from the room without a disconnect
+                assert _recv_until(watcher, "participant_left")["id"] == me["id"]
+            stats = client.get("/api/ws/stats").json()["heartbeat"]
+            assert stats["reaped"] >= 1 and stats["rooms"][rid]["live"] + stats["rooms"][rid]["stale"] == 1
@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.room_state import room_state
+import json
+import time
+
+DISK_DELAY = 0.2
+
+def _fanout_p99(client: TestClient, rid: str, n: int = 15) -> float:
+    with client.websocket_connect(f"/ws/rooms/{rid}") as a, client.websocket_connect(f"/ws/rooms/{rid}") as b:
+        # joining may wait on disk (room hydration); fan-out is measured after that
+        a.send_text(json.dumps({"type": "task_update", "task": "warmup"}))
+        b.receive_text()
+        samples = []
+        for i in range(n):
+            start = time.perf_counter()
+            a.send_text(json.dumps({"type": "task_update", "task": f"T{i}", "title": "Latency"}))
+            data = json.loads(b.receive_text())
+            samples.append(time.perf_counter() - start)
+            assert data == {"type": "task", "task": f"T{i}", "title": "Latency"}
+    samples.sort()
+    return samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+def test_fanout_p99_flat_with_slow_disk(monkeypatch):
+    with TestClient(app) as client:
+        baseline = _fanout_p99(client, client.post("/api/rooms").json()["id"])
+
+        persist = room_state.persist
+        def slow_persist(room_id, room):
+            time.sleep(DISK_DELAY)
+            persist(room_id, room)
+        monkeypatch.setattr(room_state, "persist", slow_persist)
+
+        rid = client.post("/api/rooms").json()["id"]
+        slow = _fanout_p99(client, rid)
+        assert slow < baseline + DISK_DELAY / 2, (baseline, slow)
+
+        monkeypatch.setattr(room_state, "persist", persist)
+        assert client.get(f"/api/rooms/{rid}").json()["task"] == "T14"
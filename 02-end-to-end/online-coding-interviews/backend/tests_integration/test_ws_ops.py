@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from app.main import app
+import json
+
+def _recv_until(ws, type_: str) -> dict:
+    while True:
+        data = json.loads(ws.receive_text())
+        if data["type"] == type_:
+            return data
+
+def test_code_ops_sync_with_legacy_fallback():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms", json={"language": "python"}).json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as a, \
+                client.websocket_connect(f"/ws/rooms/{rid}") as b, \
+                client.websocket_connect(f"/ws/rooms/{rid}") as legacy:
+            a.send_text(json.dumps({"type": "join", "name": "A", "features": ["ops"]}))
+            snap = _recv_until(a, "code_snapshot")
+            b.send_text(json.dumps({"type": "join", "name": "B", "features": ["ops"]}))
+            _recv_until(b, "code_snapshot")
+            code, rev = snap["code"], snap["rev"]
+
+            a.send_text(json.dumps({"type": "code_ops", "rev": rev, "ops": ["# hi\n", len(code)]}))
+            assert _recv_until(a, "code_ack")["rev"] == rev + 1
+            msg = _recv_until(b, "code_ops")
+            assert msg == {"type": "code_ops", "rev": rev + 1, "ops": ["# hi\n", len(code)]}
+            full = _recv_until(legacy, "code")
+            assert full["code"] == "# hi\n" + code
+
+            # concurrent edit from b based on the old revision is transformed
+            b.send_text(json.dumps({"type": "code_ops", "rev": rev, "ops": [len(code), "# end\n"]}))
+            assert _recv_until(b, "code_ack")["rev"] == rev + 2
+            assert _recv_until(a, "code_ops")["ops"] == [len(code) + 5, "# end\n"]
+            assert _recv_until(legacy, "code")["code"] == "# hi\n" + code + "# end\n"
+
+            # a revision that is no longer in the log gets a snapshot back
+            b.send_text(json.dumps({"type": "code_ops", "rev": rev + 10, "ops": ["x"]}))
+            resync = _recv_until(b, "code_snapshot")
+            assert resync == {"type": "code_snapshot", "rev": rev + 2, "code": "# hi\n" + code + "# end\n"}
+
+            # legacy full updates still work and bump the revision
+            legacy.send_text(json.dumps({"type": "code_update", "code": "print(1)"}))
+            assert _recv_until(a, "code") == {"type": "code", "code": "print(1)", "rev": rev + 3}
+        assert client.get(f"/api/rooms/{rid}").json()["code"] == "print(1)"
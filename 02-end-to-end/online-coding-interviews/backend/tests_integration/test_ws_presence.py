@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+from app.main import app
+import json
+
+def _recv_until(ws, type_: str) -> dict:
+    while True:
+        data = json.loads(ws.receive_text())
+        if data["type"] == type_:
+            return data
+
+def _recv_roster(ws, names: set[str]) -> None:
+    # legacy clients get the whole list on every change; wait for the expected one
+    while {p["name"] for p in _recv_until(ws, "participants")["participants"]} != names:
+        pass
+
+def test_presence_diffs_and_legacy_roster():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms").json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as watcher, \
+                client.websocket_connect(f"/ws/rooms/{rid}") as legacy:
+            watcher.send_text(json.dumps({"type": "join", "name": "Watcher", "features": ["presence"]}))
+            first = _recv_until(watcher, "participants")
+            assert [p["name"] for p in first["participants"]] == ["Watcher"]
+            _recv_until(watcher, "me")
+
+            legacy.send_text(json.dumps({"type": "join", "name": "Legacy"}))
+            _recv_roster(legacy, {"Watcher", "Legacy"})
+            joined = _recv_until(watcher, "participant_joined")["participant"]
+            assert joined["name"] == "Legacy"
+
+            with client.websocket_connect(f"/ws/rooms/{rid}") as guest:
+                guest.send_text(json.dumps({"type": "join", "name": "Guest", "features": ["presence"]}))
+                gid = _recv_until(guest, "me")["id"]
+                assert _recv_until(watcher, "participant_joined")["participant"]["id"] == gid
+                _recv_roster(legacy, {"Watcher", "Legacy", "Guest1"})
+            assert _recv_until(watcher, "participant_left") == {"type": "participant_left", "id": gid}
+            _recv_roster(legacy, {"Watcher", "Legacy"})
+        assert client.get(f"/api/rooms/{rid}/participants").json() == []
@@ -0,0 +1,96 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.resume import sessions
+import json
+import time
+
+def _recv_until(ws, type_: str) -> dict:
+    while True:
+        data = json.loads(ws.receive_text())
+        if data["type"] == type_:
+            return data
+
+def _recv_chat(ws, text: str) -> list[str]:
+    # frame types seen up to and including the chat with this text
+    seen = []
+    while True:
+        data = json.loads(ws.receive_text())
+        seen.append(data["type"])
+        if data["type"] == "chat" and data["text"] == text:
+            return seen
+
+def _join(ws, name: str) -> dict:
+    ws.send_text(json.dumps({"type": "join", "name": name, "features": ["presence", "resume"]}))
+    return _recv_until(ws, "me")
+
+def test_resume_replays_missed_frames_without_presence_churn():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms").json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as peer:
+            _join(peer, "Peer")
+            with client.websocket_connect(f"/ws/rooms/{rid}") as flaky:
+                me = _join(flaky, "Flaky")
+                _recv_until(peer, "participant_joined")
+                last = _recv_until(flaky, "chat")["seq"]  # its own "joined"
+            # dropped: the peer types and chats while the client is away
+            for i in range(5):
+                peer.send_text(json.dumps({"type": "code_update", "code": f"x = {i}"}))
+            peer.send_text(json.dumps({"type": "chat_message", "text": "still there?"}))
+            seen = _recv_chat(peer, "still there?")
+
+            with client.websocket_connect(f"/ws/rooms/{rid}") as back:
+                back.send_text(json.dumps({"type": "resume", "token": me["resumeToken"], "lastSeq": last}))
+                frames = []
+                while (f := json.loads(back.receive_text()))["type"] != "resumed":
+                    frames.append(f)
+                # superseded code states collapse to the latest one
+                assert [f["type"] for f in frames] == ["code", "chat"]
+                assert frames[0]["code"] == "x = 4" and frames[1]["text"] == "still there?"
+                assert f["replayed"] == 2 and not f["full"]
+                members = client.get(f"/api/rooms/{rid}/participants").json()
+                assert sorted(p["name"] for p in members) == ["Flaky", "Peer"]
+                # the peer never saw it leave
+                peer.send_text(json.dumps({"type": "chat_message", "text": "ping"}))
+                seen += _recv_chat(peer, "ping")
+                assert "participant_left" not in seen and "participant_joined" not in seen
+                assert sessions.stats()["resumed"] >= 1
+
+def test_expired_session_leaves_and_resume_fails(monkeypatch):
+    monkeypatch.setattr(sessions, "grace", 0.1)
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms").json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as peer:
+            _join(peer, "Peer")
+            with client.websocket_connect(f"/ws/rooms/{rid}") as flaky:
+                me = _join(flaky, "Flaky")
+            assert _recv_until(peer, "participant_left")["id"] == me["id"]
+            time.sleep(0.1)
+            with client.websocket_connect(f"/ws/rooms/{rid}") as back:
+                back.send_text(json.dumps({"type": "resume", "token": me["resumeToken"], "lastSeq": 0}))
+                assert _recv_until(back, "resume_failed") == {"type": "resume_failed"}
+
+def test_resume_takes_over_a_socket_not_yet_seen_to_drop():
+    with TestClient(app) as client:
+        rid = client.post("/api/rooms").json()["id"]
+        with client.websocket_connect(f"/ws/rooms/{rid}") as peer:
+            _join(peer, "Peer")
+            with client.websocket_connect(f"/ws/rooms/{rid}") as stale:
+                me = _join(stale, "Flaky")
+                _recv_until(peer, "participant_joined")
+                last = _recv_until(stale, "chat")["seq"]
+                # the network moved; the server still thinks "stale" is fine
+                with client.websocket_connect(f"/ws/rooms/{rid}") as back:
+                    back.send_text(json.dumps({"type": "resume", "token": me["resumeToken"], "lastSeq": last}))
+                    f = _recv_until(back, "resumed")
+                    assert not f["full"]
+                    while (closed := stale.receive())["type"] != "websocket.close":
+                        pass
+                    assert closed["code"] == 4000
+                    members = client.get(f"/api/rooms/{rid}/participants").json()
+                    assert sorted(p["name"] for p in members) == ["Flaky", "Peer"]
+                    peer.send_text(json.dumps({"type": "chat_message", "text": "ping"}))
+                    seen = _recv_chat(peer, "ping")
+                    assert "participant_left" not in seen and "participant_joined" not in seen
+                    # the session is on the new socket now
+                    back.send_text(json.dumps({"type": "chat_message", "text": "back"}))
+                    assert _recv_until(peer, "chat")["userName"] == "Flaky"